@@ -11,6 +11,7 @@ class CheckArgs(object):
          parser.add_argument("-n", "--normal", help = "Require at least n reads supporting a variant for it to be emitted")
          parser.add_argument("-v", "--verbose", help = "Verbose mode", action = 'store_true')
          parser.add_argument("-t", "--tumor", help = "Filename for output of target list.  This puts the program into tumor sample mode.")
+         parser.add_argument("-w", "--workers", help = "Number of worker processes.  More than one will merge each contig separately and in parallel.", type = int, default = 1)
          rawArgs = parser.parse_args()
          if rawArgs.tumor:
             if os.path.isfile(rawArgs.tumor):
@@ -30,11 +31,17 @@ class CheckArgs(object):
          if self.outputFile == self.tumor or self.outputFile == self.normal:
             raise RuntimeError("Error: Input and output files cannot be the same.")
          self.verbose = rawArgs.verbose
+         if rawArgs.workers < 1:
+            raise RuntimeError("Workers must be a positive integer.")
+         self.workers = rawArgs.workers
          
 class VariantDataLine(object):
    
    def __init__(self, line, delimiter = "\t"):
-      self.lineList = line.split("\t")
+      if type(line) == list:  #rows from a columnar file come already split
+         self.lineList = line
+      else:
+         self.lineList = line.split("\t")
       self.mutantReadCount = int(self.lineList[0])
       self.coverage = int(self.lineList[1])
       self.mutantPercent = float(self.lineList[2])
@@ -123,126 +130,64 @@ class UnsupportedDataLine(VariantDataLine):
    
 class ExtractedVariantFile(object):
    
-   def __init__(self, fileHandle, dataType = "input"):
+   def __init__(self, fileHandle, dataType = "input", contigTuple = None):
       self.fileHandle = fileHandle
-      self.currentLine = False
-      self.nextLine = False
-      self.completed = False
       self.dataType = dataType
-      self.buildContigTuple()
+      if contigTuple is None:
+         self.buildContigTuple()
+      else:  #already known, such as when reading just one contig's range of the file
+         self.contigTuple = tuple(contigTuple)
    
    def buildContigTuple(self):
+      import pileupIndex
+      contigManifest = pileupIndex.readContigManifest(self.fileHandle.name)  #written by extractVariants, saves reading the whole file twice
+      if contigManifest:
+         self.contigTuple = contigManifest.contigTuple()
+         return
       if args.verbose:
          print("Building contig list for the %s file." %(self.dataType))
       self.contigTuple = list()
-      line = self.fileHandle.readline().strip()
+      line = self.readDataLine()
       while line:
-         if line.startswith("#"):
-            line = self.fileHandle.readline().strip()
-            continue
          contig = line.split("\t")[3]
          if not contig in self.contigTuple:
             self.contigTuple.append(contig)
-         line = self.fileHandle.readline().strip()
+         line = self.readDataLine()
       self.fileHandle.seek(0)
       self.contigTuple = tuple(self.contigTuple)
       
-   def subsequentLineMatches(self):
-      self.nextLine = False
-      nextLine = self.fileHandle.readline().strip()
-      if not nextLine:
-         self.completed = True
-         return False
-      while nextLine.startswith("#"):
-         nextLine = self.fileHandle.readline().strip()
-         if not nextLine:
-            self.completed = True
+   def readDataLine(self):
+      #next line that is not a comment or blank, or False at the end of the data.  Only an empty read is the end of the file, a blank line is just skipped.
+      while True:
+         rawLine = self.fileHandle.readline()
+         if not rawLine:
             return False
-      self.nextLine = VariantDataLine(nextLine)
-      if self.nextLine.locus == self.currentLine.locus:
-         return True
-      else:
-         return False
+         line = rawLine.strip()
+         if line and not line.startswith("#"):
+            return line
       
-   def loadNextLine(self):
-      if self.nextLine:
-         self.currentLine = self.nextLine
-         self.nextLine = False
-      else:
-         currentLine = self.fileHandle.readline().strip()
-         if not currentLine:
-            self.completed = True
-            return False
-         while currentLine.startswith("#"):
-            currentLine = self.fileHandle.readline().strip()
-            if not currentLine:
-               self.completed = True
-               return False
-         self.currentLine = VariantDataLine(currentLine)
+   def records(self):
+      #(contig, position, VariantDataLine) for each data line, for sortedMergeJoin
+      line = self.readDataLine()
+      while line:
+         variantLine = VariantDataLine(line)
+         yield (variantLine.contig, variantLine.position, variantLine)
+         line = self.readDataLine()
       
-   def searchForMatchedLocus(self, searchLocus, tumorContigList):
-      if self.currentLine and self.currentLine.locus == searchLocus:  #woohoo, already there!
-         return True
-      searchContig, searchPosition = searchLocus
-      while not self.currentLine and not self.completed:  #handler for when we don't have a currentLine loaded already
-         self.loadNextLine()
-      if self.completed:
-         return False
-      if self.currentLine.locus == searchLocus:
-         return True
-      searchContigIndex = tumorContigList.index(searchLocus[0])
-      currentContigIndex = tumorContigList.index(self.currentLine.contig)
-      while currentContigIndex < searchContigIndex and not self.completed:  #race ahead to the contig of interest if not already there
-         self.loadNextLine()
-         try:
-            currentContigIndex = tumorContigList.index(self.currentLine.contig)
-         except ValueError:
-            continue  #if the current contig we are looking at doesn't even exist in the tumor sample, we continue to iterate over it without doing anything to it until we reach a shard contig
-            #raise RuntimeError("Unable to find contig %s in tumorContigList." %(self.currentLine.contig))
-      if self.completed:
-         return False
-      if currentContigIndex > searchContigIndex:  #went past the contig of interest without finding it
-         return False
-      if self.currentLine.position > searchPosition:  #if we have already passed the point of interest
-         return False
-      while not self.currentLine.locus == searchLocus and not self.completed:  #keep running this until we hit the end of file or our match (traps for other stop conditions will be included in the loop)
-         self.loadNextLine()  #we can do this because we already know we are not on the correct locus
-         while not self.currentLine or self.completed:  #catch for completion or empty lines
-            if self.completed:
-               return False
-            self.loadNextLine
-         if self.currentLine.locus == searchLocus:  #woohoo, found it
-            break
-         if tumorContigList.index(self.currentLine.contig) > searchContigIndex: #went to a contig past the one of interest
-            return False
-         if self.currentLine.position > searchPosition:  #went past the position on the same contig without finding it
-            return False
-      if self.completed:  #in theory, this should have dropped out during the loop
-         return False
-      if self.currentLine.locus == searchLocus:
-         return True
-   
-   def getMatchedLocusTable(self, locus, tumorContigList):
-      if self.searchForMatchedLocus(locus, tumorContigList):
-         locusVarTable = {self.currentLine.variant : self.currentLine}
-         while self.subsequentLineMatches():
-            self.loadNextLine()
-            locusVarTable[self.currentLine.variant] = self.currentLine
-         return locusVarTable
-      else:
-         return False
+class ColumnarExtractedVariantFile(ExtractedVariantFile):
+   #same interface, reading rows from a memory mapped variantColumns file instead of text lines
    
-   def getNextLocusTable(self):
-      if self.completed:
-         return False
-      self.loadNextLine()
-      if self.completed:
-         return False
-      locusVarTable = {self.currentLine.variant : self.currentLine}
-      while self.subsequentLineMatches():
-         self.loadNextLine()
-         locusVarTable[self.currentLine.variant] = self.currentLine
-      return locusVarTable
+   def __init__(self, fileName, dataType = "input"):
+      import variantColumns
+      self.columnarFile = variantColumns.ColumnarVariantFile(fileName)
+      self.rows = self.columnarFile.rows()
+      ExtractedVariantFile.__init__(self, None, dataType)
+      
+   def buildContigTuple(self):
+      self.contigTuple = self.columnarFile.contigOrder()
+      
+   def readDataLine(self):
+      return next(self.rows, False)
       
 class OutputLine(object):
    
@@ -289,45 +234,122 @@ def validContigLists(tumorContigTuple, normalContigTuple):   #checking to make s
    else:
       return False
 
+titleLine = "\t".join(["#locus", "ref", "var", "varType", "tumorVarSupport", "tumorCoverage", "normalVarSupport", "normalCoverage", "tumorStrands", "normalStrands", "varSeq", "tumorVarSup", "tumorCov", "tumorMutPercent", "tumorContig", "tumorPosition", "tumorRef", "tumorVar", "tumorVarType", "tumorStrand", "tumorPileup", "normalVarSup", "normalCov", "normalMutPercent", "normalContig", "normalPosition", "normalRef", "normalVar", "normalVarType", "normalStrand", "normalPileup"])
+
+def makeOutputLines(tumorLocusVariantTable, matchedNormalVariantTable, locus):
+   #pairs each tumor variant at a locus with whatever the normal had there
+   outputLines = []
+   for variant in list(tumorLocusVariantTable.keys()):
+      if not matchedNormalVariantTable:  #we get false if the line was uncovered
+         uncoveredNormalLine = UncoveredDataLine(locus, variant, tumorLocusVariantTable[variant].variantType)
+         outputLines.append(OutputLine(tumorLocusVariantTable[variant], uncoveredNormalLine))
+      elif not variant in matchedNormalVariantTable:  #the tumor variant was not in the normal, but there was locus data returned (either a different variant or "None" if no variant was found in normal)
+         normalDataGetter = list(matchedNormalVariantTable.keys())[0]
+         unsupportedNormalLine = UnsupportedDataLine(matchedNormalVariantTable[normalDataGetter], variant, tumorLocusVariantTable[variant].variantType)
+         outputLines.append(OutputLine(tumorLocusVariantTable[variant], unsupportedNormalLine))
+      else:
+         outputLines.append(OutputLine(tumorLocusVariantTable[variant], matchedNormalVariantTable[variant]))
+   return outputLines
+
+def combineVariantFiles(tumor, normal, outputFile, verbose = False):
+   #merges two opened ExtractedVariantFiles (or ColumnarExtractedVariantFiles), writing a line for every tumor variant.  Returns the number of tumor loci.
+   import sortedMergeJoin
+   if not validContigLists(tumor.contigTuple, normal.contigTuple):  #input validation is magic and lets us confirm that the contigs are not in some kind of different order between the two sample sets
+      raise RuntimeError("Tumor and normal files do not appear to have been sorted in the same order.\nTumor contigs: %s\nNormal contigs: %s" %(tumor.contigTuple, normal.contigTuple))
+   locusCount = 0
+   for contig, position, (tumorLines, normalLines) in sortedMergeJoin.mergeJoin([tumor.records(), normal.records()], tumor.contigTuple, names = [tumor.dataType, normal.dataType]):
+      if verbose:
+         if locusCount % 100 == 0:
+            print("Comparing locus %s" %(locusCount), end = '\r')
+      locusCount += 1
+      tumorLocusVariantTable = dict([(line.variant, line) for line in tumorLines])
+      matchedNormalVariantTable = dict([(line.variant, line) for line in normalLines]) or False  #makeOutputLines takes False for a locus the normal did not cover
+      for outputLine in makeOutputLines(tumorLocusVariantTable, matchedNormalVariantTable, (contig, position)):
+         print(outputLine, file = outputFile)
+   return locusCount
+
+def contigByteRanges(fileName):
+   #contig ranges of an extracted variant file, from its manifest if extractVariants left one and otherwise found with a binary search over the file
+   import pileupIndex
+   contigManifest = pileupIndex.readContigManifest(fileName)
+   if contigManifest:
+      return contigManifest.ranges()
+   return pileupIndex.findContigByteRanges(fileName, contigColumn = 3)
+
+def combineShard(shard):
+   #worker for parallel runs, merges one contig into its own file.  The normal range is None when the normal has nothing on the contig.
+   import pileupIndex
+   tumorFileName, tumorRange, normalFileName, normalRange, shardFileName = shard
+   tumor = ExtractedVariantFile(pileupIndex.ByteRangeLineReader(tumorFileName, tumorRange.start, tumorRange.end), "tumor", (tumorRange.contig,))
+   if normalRange:
+      normal = ExtractedVariantFile(pileupIndex.ByteRangeLineReader(normalFileName, normalRange.start, normalRange.end), "normal", (normalRange.contig,))
+   else:
+      normal = ExtractedVariantFile(pileupIndex.ByteRangeLineReader(normalFileName, 0, 0), "normal", ())
+   shardFile = open(shardFileName, 'w')
+   locusCount = combineVariantFiles(tumor, normal, shardFile)
+   shardFile.close()
+   tumor.fileHandle.close()
+   normal.fileHandle.close()
+   return locusCount
+
+def combineVariantFilesParallel(tumorFileName, normalFileName, outputFile, outputFileName, workers, verbose = False):
+   #splits both files at contig boundaries and merges each contig in a process pool.  Shards are stitched back together in the tumor's contig order.
+   import multiprocessing
+   import os
+   import shutil
+   import sys
+   tumorRanges = contigByteRanges(tumorFileName)
+   normalRanges = contigByteRanges(normalFileName)
+   tumorContigTuple = tuple([contigRange.contig for contigRange in tumorRanges])
+   normalContigTuple = tuple([contigRange.contig for contigRange in normalRanges])
+   if not validContigLists(tumorContigTuple, normalContigTuple):
+      raise RuntimeError("Tumor and normal files do not appear to have been sorted in the same order.\nTumor contigs: %s\nNormal contigs: %s" %(tumorContigTuple, normalContigTuple))
+   normalRangeTable = dict([(contigRange.contig, contigRange) for contigRange in normalRanges])
+   shards = []
+   for index, contigRange in enumerate(tumorRanges):
+      shards.append((tumorFileName, contigRange, normalFileName, normalRangeTable.get(contigRange.contig), "%s.shard%s" %(outputFileName, index)))
+   locusCount = 0
+   pool = multiprocessing.Pool(min(workers, max(len(shards), 1)))
+   for shard, shardLocusCount in zip(shards, pool.imap(combineShard, shards)):
+      shardFileName = shard[4]
+      shardFile = open(shardFileName, 'r')
+      outputFile.flush()
+      shutil.copyfileobj(shardFile, outputFile)
+      shardFile.close()
+      os.remove(shardFileName)
+      locusCount += shardLocusCount
+      if verbose:
+         print("Compared %s loci" %(locusCount), file = sys.stderr, end = "\r")
+   pool.close()
+   pool.join()
+   return locusCount
+
 if __name__=="__main__":
-   titleLine = "\t".join(["#locus", "ref", "var", "varType", "tumorVarSupport", "tumorCoverage", "normalVarSupport", "normalCoverage", "tumorStrands", "normalStrands", "varSeq", "tumorVarSup", "tumorCov", "tumorMutPercent", "tumorContig", "tumorPosition", "tumorRef", "tumorVar", "tumorVarType", "tumorStrand", "tumorPileup", "normalVarSup", "normalCov", "normalMutPercent", "normalContig", "normalPosition", "normalRef", "normalVar", "normalVarType", "normalStrand", "normalPileup"])
    import datetime
+   import sys
    startTime = datetime.datetime.now()
    global args
    args = CheckArgs()
-   tumorFile = open(args.tumor, 'r')
-   normalFile = open(args.normal, 'r')
-   tumor = ExtractedVariantFile(tumorFile, "tumor")
-   normal = ExtractedVariantFile(normalFile, "normal")
+   import variantColumns
+   columnarInput = variantColumns.isColumnarFile(args.tumor) or variantColumns.isColumnarFile(args.normal)
    outputFile = open(args.outputFile, 'w')
    print(titleLine, file = outputFile)
-   if not validContigLists(tumor.contigTuple, normal.contigTuple):  #input validation is magic and lets us confirm that the contigs are not in some kind of different order between the two sample sets
-      raise RuntimeError("Tumor and normal files do not appear to have been sorted in the same order.\nTumor contigs: %s\nNormal contigs: %s" %(tumor.contigTuple, normal.contigTuple))
-   locusCount = 0
-   while not tumor.completed:
-      if args.verbose:
-         if locusCount % 100 == 0:
-            print("Comparing locus %s" %(locusCount), end = '\r')
-      locusCount += 1
-      tumorLocusVariantTable = tumor.getNextLocusTable()
-      if not tumorLocusVariantTable:
-         break
-      matchedNormalVariantTable = normal.getMatchedLocusTable(tumor.currentLine.locus, tumor.contigTuple)
-      for variant in list(tumorLocusVariantTable.keys()):
-         if not matchedNormalVariantTable:  #we get false if the line was uncovered
-            uncoveredNormalLine = UncoveredDataLine(tumor.currentLine.locus, variant, tumorLocusVariantTable[variant].variantType)
-            outputLine = OutputLine(tumorLocusVariantTable[variant], uncoveredNormalLine)
-            print(outputLine, file = outputFile)
-         elif not variant in matchedNormalVariantTable:  #the tumor variant was not in the normal, but there was locus data returned (either a different variant or "None" if no variant was found in normal)
-            normalDataGetter = list(matchedNormalVariantTable.keys())[0]
-            unsupportedNormalLine = UnsupportedDataLine(matchedNormalVariantTable[normalDataGetter], variant, tumorLocusVariantTable[variant].variantType)
-            outputLine = OutputLine(tumorLocusVariantTable[variant], unsupportedNormalLine)
-            print(outputLine, file = outputFile)
+   if args.workers > 1 and columnarInput:
+      print("Columnar input cannot be split by byte range, running with a single worker.", file = sys.stderr)
+   if args.workers > 1 and not columnarInput:
+      locusCount = combineVariantFilesParallel(args.tumor, args.normal, outputFile, args.outputFile, args.workers, args.verbose)
+   else:
+      inputFiles = []
+      for fileName, dataType in [(args.tumor, "tumor"), (args.normal, "normal")]:
+         if variantColumns.isColumnarFile(fileName):
+            inputFiles.append(ColumnarExtractedVariantFile(fileName, dataType))
          else:
-            outputLine = OutputLine(tumorLocusVariantTable[variant], matchedNormalVariantTable[variant])
-            print(outputLine, file = outputFile)
-   tumorFile.close()
-   normalFile.close()
+            inputFiles.append(ExtractedVariantFile(open(fileName, 'r'), dataType))
+      tumor, normal = inputFiles
+      locusCount = combineVariantFiles(tumor, normal, outputFile, args.verbose)
+      for inputFile in inputFiles:
+         if inputFile.fileHandle:
+            inputFile.fileHandle.close()
    outputFile.close()
    if args.verbose:
       print("Compared %s loci in %s" %(locusCount, datetime.datetime.now() - startTime))
\ No newline at end of file
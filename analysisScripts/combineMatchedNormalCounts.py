@@ -1,5 +1,5 @@
+import os
 import sys
-from pileupToVcf import updateStrands, parsePileupString
 
 SUBSTITUTION = "Substitution"
 INDEL = "Indel"
@@ -24,58 +24,93 @@ def readVariantCounts(fname):
       if line.startswith("#"): continue
       cols = line.strip().split("\t")
       chromNum = cols[3]
-      loc = long(cols[4])
+      loc = int(cols[4])
       chroms[chromNum] = chroms.get(chromNum, 0) + 1
    f.close()
    return chroms
 
-def readVariants(fname, theChromNum=None):
-   variants = {}
-   f = open(fname)
-   for line in f:
+def readLines(fname, contigRange=None):
+   # every line of the file, or just the ones in a pileupIndex.ContigByteRange
+   import pileupIndex
+   if contigRange:
+      f = pileupIndex.ByteRangeLineReader(fname, contigRange.start, contigRange.end)
+   else:
+      f = open(fname)
+   line = f.readline()
+   while line:
+      yield line
+      line = f.readline()
+   f.close()
+
+def chromosomeRanges(fname, contigColumn):
+   # byte range of each chromosome, found with a binary search over the file, or None if the file does not keep each chromosome's lines together
+   import pileupIndex
+   try:
+      return dict([(contigRange.contig, contigRange) for contigRange in pileupIndex.findContigByteRanges(fname, contigColumn)])
+   except RuntimeError:
+      return None
+
+def readVariants(fname, theChromNum=None, contigRange=None):
+   # yields (chromNum, loc, (tumorIsIndel, normalIsIndel, line)) for each variant line, in file order
+   for line in readLines(fname, contigRange):
       if line.startswith("#"): continue
       cols = line.strip().split("\t")
       chromNum = cols[3]
       if theChromNum and (chromNum != theChromNum): continue
-      loc = long(cols[4])
+      loc = int(cols[4])
       tumorVarInfo = parseInfoString(cols[10])
       normalVarInfo = parseInfoString(cols[23])
       tumorVarCts = cols[0]
       normalVarCts = cols[13]
       if tumorVarCts == "NA": tumorVarInfo["INDEL"] = "NA"
       if normalVarCts == "NA": normalVarInfo["INDEL"] = "NA"
-      variants[(chromNum, loc)] = (tumorVarInfo.get("INDEL", False), normalVarInfo.get("INDEL", False), line.strip())
-   f.close()
-   return variants
+      yield (chromNum, loc, (tumorVarInfo.get("INDEL", False), normalVarInfo.get("INDEL", False), line.strip()))
 
-def readPositionalCounts(fname, theChromNum=None):
-   cts = {}
-   f = open(fname)
-   for line in f:
-      cols = line.strip().split("\t")
+def readPileupLines(fname, theChromNum=None, contigRange=None):
+   # yields (chromNum, loc, line) for each pileup line, in file order
+   for line in readLines(fname, contigRange):
+      cols = line.strip().split("\t", 4)
+      if len(cols) < 4 or line.startswith("#"): continue
       chromNum = cols[0]
       if theChromNum and (chromNum != theChromNum): continue
-      loc = long(cols[1])
-      if len(cols) == 4:
-         line = line.strip() + "\t--\t--"
+      yield (chromNum, int(cols[1]), line)
+
+def readPositionalCounts(lines):
+   # the pileup lines get tokenized together in one batch, returns (line, pileupDesc, pileupStrands) for each
+   import pileupParser
+   batch = pileupParser.PileupBatch(lines)
+   cts = []
+   for line, readTokens in zip(batch.rawLines, batch.tokens()):
+      (pileupDesc, plusStrand, minusStrand, variantCount) = readTokens
+      if len(line.split("\t")) == 4:
+         line = line + "\t--\t--"
          (pileupDesc, pileupStrands) = ({}, {})
       else:
-         (pileupDesc, pileupStrands) = parsePileupString(cols[4], cols[2].upper())
-      cts[(chromNum, loc)] = (line.strip(), pileupDesc, pileupStrands)
-   f.close()
+         pileupStrands = dict([(var, pileupParser.strandString(plusStrand[var], minusStrand[var])) for var in pileupDesc])
+      cts.append((line, pileupDesc, pileupStrands))
    return cts
 
-def processVariants(tumorAndNormalVars, tumorCts, matchedNormalCts, chromNum):
+def processVariants(joinedLoci, outputFile=sys.stdout, batchSize = 5000):
+   # joinedLoci gives (chromNum, loc, (variants, tumorLines, normalLines)) from sortedMergeJoin.  The pileup lines are parsed a batch of loci at a time.
+   batch = []
+   for locus in joinedLoci:
+      batch.append(locus)
+      if len(batch) >= batchSize:
+         processVariantBatch(batch, outputFile)
+         batch = []
+   processVariantBatch(batch, outputFile)
+
+def processVariantBatch(batch, outputFile=sys.stdout):
       missingVarString = "NA\tNA\tNA\t0\t--\t--"
-      locs = []
-      for (c, loc) in tumorAndNormalVars:
-         if c == chromNum:
-            locs.append(loc)
-      locs.sort()
-      for loc in locs:
-         (tumorIsIndel, normalIsIndel, inf) = tumorAndNormalVars[(chromNum, loc)]
-         (tumorInf, tumorPileupDesc, tumorPileupStrands) = tumorCts.get((chromNum, loc), (missingVarString, {}, {}))
-         (normalInf, normalPileupDesc, normalPileupStrands) = matchedNormalCts.get((chromNum, loc), (missingVarString, {}, {}))
+      countTables = []
+      for column in (1, 2):
+         pileupLines = [groups[column][-1] for (chromNum, loc, groups) in batch if groups[column]]  # the last line at a locus is the one that counts
+         cts = iter(readPositionalCounts(pileupLines))
+         countTables.append([next(cts) if groups[column] else (missingVarString, {}, {}) for (chromNum, loc, groups) in batch])
+      for (chromNum, loc, groups), tumorCounts, normalCounts in zip(batch, countTables[0], countTables[1]):
+         (tumorIsIndel, normalIsIndel, inf) = groups[0][-1]
+         (tumorInf, tumorPileupDesc, tumorPileupStrands) = tumorCounts
+         (normalInf, normalPileupDesc, normalPileupStrands) = normalCounts
          # check pileup description?  get the variant at least.
          if tumorIsIndel == SUBSTITUTION:
             infCols = inf.strip().split("\t")
@@ -97,7 +132,7 @@ def processVariants(tumorAndNormalVars, tumorCts, matchedNormalCts, chromNum):
                chromName = str(infCols[3])
                if not chromName.startswith("chr"):
                   chromName = "chr" + chromName
-               print("%s:%ld\t%s\t%s\t%s\t%d\t%s\t%d\t%s\t%s\t%s\t%s\t%s\t%s\t%s" % (chromName, long(infCols[4]), oldBase, newBase, "Substitution", newBaseCount, tumorCov, newNormalBaseCount, normalCov, tumorPileupStrands.get(newBase, "None"), normalPileupStrands.get(newBase, "None"), newBase, inf, tumorInf, normalInf))
+               print("%s:%ld\t%s\t%s\t%s\t%d\t%s\t%d\t%s\t%s\t%s\t%s\t%s\t%s\t%s" % (chromName, int(infCols[4]), oldBase, newBase, "Substitution", newBaseCount, tumorCov, newNormalBaseCount, normalCov, tumorPileupStrands.get(newBase, "None"), normalPileupStrands.get(newBase, "None"), newBase, inf, tumorInf, normalInf), file = outputFile)
          else:
             infCols = inf.strip().split("\t")
             # use the most likely indel
@@ -123,18 +158,78 @@ def processVariants(tumorAndNormalVars, tumorCts, matchedNormalCts, chromNum):
                chromName = str(infCols[3])
                if not chromName.startswith("chr"):
                   chromName = "chr" + chromName
-               print("%s:%ld\t%s\t%s\t%s\t%d\t%s\t%d\t%s\t%s\t%s\t%s\t%s\t%s\t%s" % (chromName, long(infCols[4]), oldBase, newBaseStr, "Indel", newBaseCount, tumorCov, newNormalBaseCount, normalCov, tumorPileupStrands.get(newBase, "None"), normalPileupStrands.get(newBase, "None"), newBaseChars, inf, tumorInf, normalInf))
+               print("%s:%ld\t%s\t%s\t%s\t%d\t%s\t%d\t%s\t%s\t%s\t%s\t%s\t%s\t%s" % (chromName, int(infCols[4]), oldBase, newBaseStr, "Indel", newBaseCount, tumorCov, newNormalBaseCount, normalCov, tumorPileupStrands.get(newBase, "None"), normalPileupStrands.get(newBase, "None"), newBaseChars, inf, tumorInf, normalInf), file = outputFile)
             # print "%s\t%s\t%s\t%s\t%s" % (inf, tumorIsIndel, tumorInf, normalIsIndel, normalInf)
 
+def processChromosome(job):
+   # merges one chromosome, reading just its range of each file when there is one.  A range table of None means that file has to be scanned.
+   import sortedMergeJoin
+   (chromNum, variantFile, variantRanges, tumorFile, tumorRanges, normalFile, normalRanges, outputFileName) = job
+   streams = [readVariants(variantFile, chromNum, fileRange(variantRanges, chromNum))]
+   for pileupFile, pileupRanges in ((tumorFile, tumorRanges), (normalFile, normalRanges)):
+      if pileupRanges is not None and not chromNum in pileupRanges:  # nothing on this chromosome
+         streams.append([])
+      else:
+         streams.append(readPileupLines(pileupFile, chromNum, fileRange(pileupRanges, chromNum)))
+   if outputFileName:
+      outputFile = open(outputFileName, 'w')
+   else:
+      outputFile = sys.stdout
+   processVariants(sortedMergeJoin.mergeJoin(streams, [chromNum], names = [variantFile, tumorFile, normalFile]), outputFile)
+   if outputFileName:
+      outputFile.close()
+   return outputFileName
+
+def fileRange(ranges, chromNum):
+   if ranges is None:
+      return None
+   return ranges.get(chromNum)
+
+class CheckArgs(object):
+
+   def __init__(self):
+      import argparse
+      parser = argparse.ArgumentParser(description = "Counts the tumor and matched normal pileup reads at each variant.  Output goes to stdout.")
+      parser.add_argument("variants", help = "Variant file")
+      parser.add_argument("tumorPileup", help = "Tumor pileup")
+      parser.add_argument("normalPileup", help = "Matched normal pileup")
+      parser.add_argument("-w", "--workers", help = "Number of worker processes, each handling one chromosome at a time", type = int, default = 1)
+      rawArgs = parser.parse_args()
+      self.variants = rawArgs.variants
+      self.tumorPileup = rawArgs.tumorPileup
+      self.normalPileup = rawArgs.normalPileup
+      if rawArgs.workers < 1:
+         raise RuntimeError("Workers must be a positive integer.")
+      self.workers = rawArgs.workers
+
 if __name__=="__main__":
-   variantCounts = readVariantCounts(sys.argv[1])
+   args = CheckArgs()
+   variantCounts = readVariantCounts(args.variants)
    chromNums = set(variantCounts.keys())
    chromNums = list(chromNums)
    chromNums.sort()
    for chromNum in chromNums:
-      print >> sys.stderr, "# Read ", variantCounts[chromNum], " variants on chrom ", chromNum, " from ", sys.argv[1]
-   for chromNum in chromNums:
-      tumorAndNormalVars = readVariants(sys.argv[1], chromNum)
-      tumorCts = readPositionalCounts(sys.argv[2], chromNum)
-      matchedNormalCts = readPositionalCounts(sys.argv[3], chromNum)      
-      processVariants(tumorAndNormalVars, tumorCts, matchedNormalCts, chromNum)
+      print("# Read ", variantCounts[chromNum], " variants on chrom ", chromNum, " from ", args.variants, file = sys.stderr)
+   # sorted files get read one chromosome range at a time instead of being rescanned for every chromosome
+   variantRanges = chromosomeRanges(args.variants, 3)
+   tumorRanges = chromosomeRanges(args.tumorPileup, 0)
+   normalRanges = chromosomeRanges(args.normalPileup, 0)
+   if args.workers > 1:
+      import multiprocessing
+      import shutil
+      import tempfile
+      tempDir = tempfile.mkdtemp(prefix = "combineMatchedNormalCounts")
+      jobs = [(chromNum, args.variants, variantRanges, args.tumorPileup, tumorRanges, args.normalPileup, normalRanges, os.path.join(tempDir, "shard%s" % index)) for index, chromNum in enumerate(chromNums)]
+      pool = multiprocessing.Pool(min(args.workers, max(len(jobs), 1)))
+      for shardFileName in pool.imap(processChromosome, jobs):  # shards come back in chromosome order
+         shardFile = open(shardFileName, 'r')
+         sys.stdout.flush()
+         shutil.copyfileobj(shardFile, sys.stdout)
+         shardFile.close()
+         os.remove(shardFileName)
+      pool.close()
+      pool.join()
+      shutil.rmtree(tempDir)
+   else:
+      for chromNum in chromNums:
+         processChromosome((chromNum, args.variants, variantRanges, args.tumorPileup, tumorRanges, args.normalPileup, normalRanges, None))
@@ -1,37 +1,37 @@
-
 import sys
 import os
 if not os.getcwd() in sys.path:
    sys.path.append(os.getcwd())
 
-def readVariants(fname):
-   variants = {}
-   f = open(fname)
-   for line in f:
-      if line.startswith("#"): continue
-      cols = line.strip().split("\t")
-      if len(cols) < 4: continue
-      chromNum = cols[3]
-      loc = long(cols[4])
-      variants[(chromNum, loc)] = line.strip()
+def readVariants(fname, contigRange):
+   # yields (contig, position, line) for the lines of an extracted variant file in one contig's byte range
+   import pileupIndex
+   f = pileupIndex.ByteRangeLineReader(fname, contigRange.start, contigRange.end)
+   line = f.readline()
+   while line:
+      if not line.startswith("#"):
+         cols = line.strip().split("\t")
+         if len(cols) >= 5:
+            yield (cols[3], int(cols[4]), line.strip())
+      line = f.readline()
    f.close()
-   return variants
 
 if __name__=="__main__":
-   tumorVars = readVariants(sys.argv[1])
-   normalVars = readVariants(sys.argv[2])
+   import combineExtractedVariants
+   import sortedMergeJoin
    missingVarString = "NA\tNA\tNA\tNA\tNA\tNA\tNA\tNA\tNA\tNA\tNA\tNA\tNA"
-   chromNums = set([chromNum for (chromNum, loc) in tumorVars])
-   chromNums = list(chromNums)
-   chromNums.sort()
-   for chromNum in chromNums:
-      locs = []
-      for (c, loc) in tumorVars:
-         if c == chromNum:
-            locs.append(loc)
-      locs.sort()
-      for loc in locs:
-         if normalVars.has_key((chromNum, loc)):
-            print("%s\t%s" % (tumorVars[(chromNum, loc)], normalVars[(chromNum, loc)]))
+   tumorRanges = combineExtractedVariants.contigByteRanges(sys.argv[1])
+   normalRanges = dict([(contigRange.contig, contigRange) for contigRange in combineExtractedVariants.contigByteRanges(sys.argv[2])])
+   # contigs go out in name order, each one streamed from its own range of both files
+   for tumorRange in sorted(tumorRanges, key = lambda contigRange: contigRange.contig):
+      streams = [readVariants(sys.argv[1], tumorRange)]
+      if tumorRange.contig in normalRanges:
+         streams.append(readVariants(sys.argv[2], normalRanges[tumorRange.contig]))
+      else:
+         streams.append([])
+      for chromNum, loc, (tumorLines, normalLines) in sortedMergeJoin.mergeJoin(streams, [tumorRange.contig], names = sys.argv[1:3]):
+         # the last line at a locus is the one that counts
+         if normalLines:
+            print("%s\t%s" % (tumorLines[-1], normalLines[-1]))
          else:
-            print("%s\t%s" % (tumorVars[(chromNum, loc)], missingVarString))
+            print("%s\t%s" % (tumorLines[-1], missingVarString))
@@ -15,9 +15,13 @@ class CheckArgs(object):
          parser.add_argument("-v", "--verbose", help = "Verbose mode", action = 'store_true')
          parser.add_argument("-m", "--matchingTargets", help = "Pass a target list for a normal pileup to match with a tumor. This puts the program into normal sample mode.")
          parser.add_argument("-t", "--targetOutput", help = "Filename for output of target list.  This puts the program into tumor sample mode.")
+         parser.add_argument("-w", "--workers", help = "Number of worker processes.  More than one will split the input by contig and process the contigs in parallel.", type = int, default = 1)
+         parser.add_argument("-c", "--columnar", help = "Write the binary columnar format (see variantColumns.py, which can also export it back to text) instead of text", action = 'store_true')
+         parser.add_argument("-R", "--noRawLines", help = "With columnar output, do not keep the raw pileup lines in a sidecar file", action = 'store_true')
+         parser.add_argument("-x", "--targetsOnly", help = "In normal sample mode, only emit lines at the tumor targets and skip variants found only in the normal.  If the input is bgzipped with a tabix index next to it, only the target loci get read.", action = 'store_true')
          rawArgs = parser.parse_args()
          if rawArgs.inputFile:
-            if os.path.isfile(rawArgs.inputFile):
+            if os.path.exists(rawArgs.inputFile):  #not isfile, the input can be a named pipe from a pileup stream
                 self.inputFile = rawArgs.inputFile
             else:
                 raise RuntimeError("Input file not found: " + rawArgs.inputFile)
@@ -46,9 +50,33 @@ class CheckArgs(object):
             raise RuntimeError("Matching targets file and target output file cannot both be specified.")
          elif not self.matchingTargets and not self.targetOutput:
             raise RuntimeError("Either matching targets file or target output file must be specified.")
+         self.workers = rawArgs.workers
+         if self.workers < 1:
+            raise RuntimeError("Number of workers must be at least 1.")
+         if self.workers > 1 and not os.path.isfile(self.inputFile):
+            import sys
+            print("Input is not a regular file and cannot be split by contig, running with a single worker.", file = sys.stderr)
+            self.workers = 1
+         if self.workers > 1:
+            import pileupIndex
+            if pileupIndex.isGzipped(self.inputFile):
+               import sys
+               print("Input is compressed and cannot be split by contig, running with a single worker.", file = sys.stderr)
+               self.workers = 1
+         self.targetsOnly = rawArgs.targetsOnly
+         self.columnar = rawArgs.columnar
+         self.rawLines = not rawArgs.noRawLines
+         if self.columnar and self.outputFile.upper() == "STDOUT":
+            raise RuntimeError("Columnar output has to go to a file.")
+         if self.targetsOnly and not self.matchingTargets:
+            raise RuntimeError("Targets only mode needs a matching targets file.")
    
+titleLine = "\t".join(["#mutCount","coverage","mutPercent","contig","position","ref","alt","type","strand","rawPileUpLine"])
+
 class MPileupLine(object):
    
+   __slots__ = ["delimiter", "minReadRequirement", "requireDoubleStranded", "minPercentageRequirement", "rawLine", "lineList", "isValidLine", "contig", "position", "referenceBase", "readsCovering", "isCovered", "readBases", "readMod", "readQuality", "hasVariant", "counts", "plusStrand", "minusStrand", "variantCount", "variantLineLists", "qualifiedVariants", "variantLineStrings", "variantString", "hasQualifiedVariants"]
+   
    def __init__(self, line, minReadRequirement = 0, minPercentageRequirement = 0, requireDoubleStranded = False, delimiter = "\t", autoparse = True):
       import re
       self.delimiter = delimiter
@@ -81,68 +109,16 @@ class MPileupLine(object):
          else:
             self.createNullOutputs()
       
-   def parsePileupString(self, overrideRequirements = False):
-      import sys
+   def parsePileupString(self, overrideRequirements = False, readTokens = None):
       if not self.isCovered:
          self.makeUncoveredLines()
       elif not self.hasVariant:
          self.makeNonvariantLines()
       else:
-         counts = {}
-         strands = {}
-         position = 0
-         varType = None
-         self.variantCount = 0
-         while position < len(self.readBases):
-            character = self.readBases[position]
-            if character == "*":
-               position += 1
-               continue
-            if character in "$^":
-               position += 1
-               if character == "^":
-                  position += 1
-               continue
-            elif character in "atgcnATGCN.,":
-               if self.referenceBase and not self.referenceBase in "Nn":
-                  if character in ".,":
-                     if character == ".":
-                        character = self.referenceBase.upper()
-                     elif character == ",":
-                        character = self.referenceBase.lower()
-                  else:
-                     self.variantCount += 1
-               variant = character.upper()
-               position += 1
-               if position < len(self.readBases):
-                  checkNext = self.readBases[position]
-                  if checkNext in "+-":
-                     varType = checkNext
-                     position += 1
-                     numberEnd = position + 1
-                     while numberEnd < len(self.readBases) and self.readBases[numberEnd].isdigit():
-                        numberEnd += 1
-                     indelSize = int(self.readBases[position : numberEnd])
-                     position = numberEnd
-                     indelSequence = self.readBases[position : position + indelSize]
-                     position = position + indelSize
-                     variant = (character.upper(), varType, indelSize, indelSequence.upper())
-               if variant in counts:
-                  counts[variant] += 1
-               else:
-                  counts[variant] = 1
-                  strands[variant] = ""  #initialize this now so we don't have to do it later.  Assumption is that any variant in counts should also be going into strands at the same time
-               if character.isupper():
-                  strand = "+"
-               elif character.islower():
-                  strand = "-"
-               else:
-                  raise RuntimeError("Picked up an unhandled valid character %s analyzing line %s" %(character, self.line))
-               strands[variant] += strand
-            else:
-               print("Skipping invalid character %s on line %s" %(character, self.line), file = sys.stdout)
-         self.counts = counts
-         self.strands = strands
+         if not readTokens:  #lines parsed on their own are tokenized as a batch of one
+            import pileupParser
+            readTokens = pileupParser.tokenizeReadBases([self.readBases], [self.referenceBase])[0]
+         self.counts, self.plusStrand, self.minusStrand, self.variantCount = readTokens
          self.makeQualifiedVariantLines(overrideRequirements)
       
    def varToString(self, variant):
@@ -158,13 +134,7 @@ class MPileupLine(object):
          return falseReturn
    
    def makeStrandString(self, variant):
-      strandString = ""
-      for strand in ["+", "-"]:
-         if variant in self.strands:
-            strandString += strand + str(self.strands[variant].count(strand))
-         else:
-            strandString += strand + "0"
-      return strandString
+      return "+%s-%s" %(self.plusStrand.get(variant, 0), self.minusStrand.get(variant, 0))
    
    def makeNonvariantStrandString(self):
       strandString = ""
@@ -184,13 +154,15 @@ class MPileupLine(object):
                continue
             if not self.counts[key] >= self.minReadRequirement:
                continue
-            if self.requireDoubleStranded and not set(self.strands[key]) == set('+', '-'):
+            if self.requireDoubleStranded and not (self.plusStrand[key] and self.minusStrand[key]):
                continue
          self.qualifiedVariants.append(key)
          indelFlag = self.isIndel(key, "I", "S")   #will flag indel with I and substitution as S
          thisVariantLineList = [self.counts[key], self.readsCovering, round(readPercentage, 4), self.contig, self.position, self.referenceBase, self.varToString(key), indelFlag, self.makeStrandString(key), "|".join(self.lineList)]
          self.variantLineLists.append(thisVariantLineList)
-      if not self.variantLineLists:
+      if not self.variantLineLists and overrideRequirements:  #a target locus whose reads all match the reference (some written as the reference base itself) is still covered, so it gets the nonvariant line rather than nothing
+         self.makeNonvariantLines(self.makeStrandString(self.referenceBase))
+      elif not self.variantLineLists:
          self.variantLineStrings = []
          self.variantString = ""
          self.hasQualifiedVariants = False
@@ -202,8 +174,10 @@ class MPileupLine(object):
          self.variantString = "\n".join(self.variantLineStrings)
          self.hasQualifiedVariants = True
    
-   def makeNonvariantLines(self):
-      self.variantLineLists = [self.readsCovering, self.readsCovering, 1.0000, self.contig, self.position, self.referenceBase, "None", "N", self.makeNonvariantStrandString(), "|".join(self.lineList)]
+   def makeNonvariantLines(self, strandString = None):
+      if not strandString:
+         strandString = self.makeNonvariantStrandString()
+      self.variantLineLists = [self.readsCovering, self.readsCovering, 1.0000, self.contig, self.position, self.referenceBase, "None", "N", strandString, "|".join(self.lineList)]
       self.variantLineStrings = [[str(item) for item in self.variantLineLists]]
       self.variantLineLists = [self.variantLineLists]
       self.variantLineStrings = [self.delimiter.join(item) for item in self.variantLineStrings]
@@ -228,80 +202,285 @@ class MPileupLine(object):
       return self.variantString
       
 
+def parsePileupBatch(pileupLines, overrideRequirements):
+   #parses a batch of MPileupLine objects (created without autoparse) with a single tokenizer pass over all the lines that actually have variants to count
+   import pileupParser
+   needTokens = [line for line in pileupLines if line.isCovered and line.hasVariant]
+   tokens = pileupParser.tokenizeReadBases([line.readBases for line in needTokens], [line.referenceBase for line in needTokens])
+   tokenTable = dict(zip([id(line) for line in needTokens], tokens))
+   for line, override in zip(pileupLines, overrideRequirements):
+      line.parsePileupString(overrideRequirements = override, readTokens = tokenTable.get(id(line)))
+
+
+class LineCounter(object):
+   
+   __slots__ = ["lines", "verbose"]
+   
+   def __init__(self, verbose = False):
+      self.lines = 0
+      self.verbose = verbose
+      
+   def count(self, lineBlocks):
+      import sys
+      for block in lineBlocks:
+         self.lines += block.count(b"\n")
+         if self.verbose:
+            print("Processed %s lines." %(self.lines), file = sys.stderr, end = "\r")
+         yield block
+
+nonReferenceByteTable = bytes([0 if character in b".,$*" else 1 for character in range(256)])  #translate table flagging anything that is not a reference match, read end or gap
+
+def findCandidateLines(block, targetPositions = None, targetsOnly = False):
+   #Vectorized prefilter over a block of newline-terminated pileup lines (targetPositions should be sorted and unique).  Returns line starts, line ends and the indices of lines that might produce output: anything with a read column character other than reference matches, read ends and gaps (after taking out read start carets and their mapping qualities), anything at a target position, and anything that does not look like a regular six column line so it can get a closer look.  With targetsOnly, only the target positions and irregular lines count.
+   import numpy
+   import variantTargets
+   buffer = numpy.frombuffer(block, dtype = numpy.uint8)
+   lineEnds = numpy.flatnonzero(buffer == 10)
+   lineCount = len(lineEnds)
+   lineStarts = numpy.zeros(lineCount, dtype = numpy.int64)
+   lineStarts[1:] = lineEnds[:-1] + 1
+   tabs = numpy.flatnonzero(buffer == 9)
+   tabLines = numpy.searchsorted(lineEnds, tabs)
+   firstTab = numpy.searchsorted(tabLines, numpy.arange(lineCount))
+   tabCounts = numpy.bincount(tabLines, minlength = lineCount)
+   regular = (tabCounts >= 5) & (buffer[lineStarts] != 35)  #lines starting with # are comments
+   regularLines = numpy.flatnonzero(regular)
+   candidate = ~regular
+   if not targetsOnly:  #only lines at targets are wanted, so nothing else needs to be looked at
+      nonReference = numpy.frombuffer(bytearray(block.translate(nonReferenceByteTable)), dtype = bool)
+      #carets are sparse, so work out which ones start reads (every other caret in a run, see pileupParser.ReadBaseScan) from their positions alone
+      carets = numpy.flatnonzero(buffer == 94)
+      if len(carets):
+         caretRunStart = numpy.ones(len(carets), dtype = bool)
+         caretRunStart[1:] = carets[1:] != carets[:-1] + 1
+         caretIndices = numpy.arange(len(carets))
+         caretRunOffset = caretIndices - numpy.maximum.accumulate(numpy.where(caretRunStart, caretIndices, 0))
+         readStarts = carets[caretRunOffset % 2 == 0]
+         nonReference[readStarts] = False
+         nonReference[numpy.minimum(readStarts + 1, len(buffer) - 1)] = False
+      if len(regularLines):
+         columnStarts = tabs[firstTab[regularLines] + 3] + 1
+         columnEnds = tabs[firstTab[regularLines] + 4]
+         columnBounds = numpy.empty(2 * len(regularLines), dtype = numpy.int64)
+         columnBounds[0::2] = columnStarts
+         columnBounds[1::2] = columnEnds
+         hasNonReference = numpy.logical_or.reduceat(nonReference, columnBounds)[0::2] & (columnEnds > columnStarts)
+         candidate[regularLines[hasNonReference]] = True
+   if targetPositions is not None and len(regularLines):
+      positionStarts = tabs[firstTab[regularLines]] + 1
+      positionLengths = tabs[firstTab[regularLines] + 1] - positionStarts
+      positions = numpy.zeros(len(regularLines), dtype = numpy.int64)
+      for offset in range(min(positionLengths.max(), 18)):
+         digits = buffer[positionStarts + numpy.minimum(offset, positionLengths - 1)].astype(numpy.int64) - 48
+         reading = offset < positionLengths
+         positions[reading] = positions[reading] * 10 + digits[reading]
+      candidate[regularLines[variantTargets.sortedContains(targetPositions, positions) | (positionLengths > 18)]] = True
+   return (lineStarts, lineEnds, numpy.flatnonzero(candidate))
+
+def classifyPileupLines(lineBlocks, targetTable = None, targetsOnly = False):
+   #Works on blocks of raw bytes and only yields (line, variantInTumor) for lines that could produce output.  Lines whose read column is nothing but reference matches, read ends and gaps never get split or turned into objects.
+   import re
+   import numpy
+   caretPair = re.compile(b"\\^.", re.DOTALL)  #read start caret plus its mapping quality character
+   targetPositions = None
+   if targetTable is not None:
+      targetPositions = targetTable.allPositions()
+   for block in lineBlocks:
+      lineStarts, lineEnds, candidates = findCandidateLines(block, targetPositions, targetsOnly)
+      lines = []
+      for lineStart, lineEnd in zip(lineStarts[candidates].tolist(), lineEnds[candidates].tolist()):
+         line = block[lineStart : lineEnd]
+         if line and not line.startswith(b"#"):
+            lines.append((line, line.split(b"\t", 5)))
+      if targetTable is not None:  #look up the whole block's candidates at once
+         targetLines = [index for index, (line, fields) in enumerate(lines) if len(fields) > 1 and fields[1].isdigit()]
+         atTarget = numpy.zeros(len(lines), dtype = bool)
+         atTarget[targetLines] = targetTable.containsLoci([lines[index][1][0].decode() for index in targetLines], [int(lines[index][1][1]) for index in targetLines])
+         atTarget = atTarget.tolist()
+      else:
+         atTarget = [False] * len(lines)
+      for (line, fields), variantInTumor in zip(lines, atTarget):
+         if variantInTumor:
+            yield (line, True)
+            continue
+         if targetsOnly or len(fields) < 5:
+            continue
+         remainder = fields[4].translate(None, b".,$*")
+         if not remainder:
+            continue
+         if b"^" in remainder:
+            if not caretPair.sub(b"", fields[4]).translate(None, b".,$*"):
+               continue
+         yield (line, False)
+
+def extractVariantLines(lineBlocks, outputFile, minReadRequirement = 0, minPercentageRequirement = 0, requireDoubleStranded = False, targetTable = None, verbose = False, batchSize = 5000, targetsOnly = False, contigManifest = None):
+   #Takes blocks of raw newline-terminated lines (see pileupIndex.readLineBlocks).  With no target table this is tumor mode and the qualified variants get returned as a new target table (variantTargets.TargetTableBuilder).  With one (variantTargets.TargetTable), this is normal mode and every line at a tumor target is written out regardless of support.
+   #Text output gets its contigs recorded in contigManifest (pileupIndex.ContigManifest) if one is given.
+   import variantTargets
+   targets = variantTargets.TargetTableBuilder()
+   lineCounter = LineCounter(verbose)
+   batch = []  #lines are collected into batches so the read bases can be tokenized together
+   batchOverrides = []
+   for rawLine, variantInTumor in classifyPileupLines(lineCounter.count(lineBlocks), targetTable, targetsOnly):
+      line = MPileupLine(rawLine.decode(), minReadRequirement, minPercentageRequirement, requireDoubleStranded, autoparse = False)
+      if not line.isValidLine:
+         continue
+      if variantInTumor or (line.isCovered and line.hasVariant):
+         batch.append(line)
+         batchOverrides.append(variantInTumor)
+      if len(batch) >= batchSize:
+         writeExtractedBatch(batch, batchOverrides, outputFile, targets, targetTable is None, contigManifest)
+         batch = []
+         batchOverrides = []
+   writeExtractedBatch(batch, batchOverrides, outputFile, targets, targetTable is None, contigManifest)
+   return (targets, lineCounter.lines)
+
+def readInputLineBlocks(inputFileName, targetTable = None, targetsOnly = False):
+   #blocks of raw lines from a plain or gzipped pileup.  When only target lines are wanted from a bgzipped pileup with a tabix index, just the target loci get read.
+   import gzip
+   import os
+   import pileupIndex
+   if not os.path.isfile(inputFileName) or not pileupIndex.isGzipped(inputFileName):
+      inputFile = open(inputFileName, 'rb')
+   elif targetsOnly and os.path.isfile(inputFileName + ".tbi"):
+      targetPositions = {}
+      for contig in targetTable.contigs:
+         targetPositions[contig] = targetTable.contigPositions(contig).tolist()
+      for block in pileupIndex.readTargetLineBlocks(inputFileName, targetPositions):
+         yield block
+      return
+   else:
+      inputFile = gzip.open(inputFileName, 'rb')
+   for block in pileupIndex.readLineBlocks(inputFile):
+      yield block
+   inputFile.close()
+
+def writeExtractedBatch(batch, batchOverrides, outputFile, targets, collectTargets, contigManifest = None):
+   #outputFile can be a text file or a variantColumns.ColumnarVariantWriter
+   parsePileupBatch(batch, batchOverrides)
+   columnar = hasattr(outputFile, "addRows")
+   for line, variantInTumor in zip(batch, batchOverrides):
+      if variantInTumor or line.hasQualifiedVariants:
+         if columnar:
+            outputFile.addRows(line.variantLineLists)
+         else:
+            text = str(line) + "\n"
+            outputFile.write(text)
+            if contigManifest:
+               contigManifest.add(line.contig, len(text.encode()), text.count("\n"))
+         if collectTargets:
+            targets.add(line.contig, line.position, line.qualifiedVariants)
+
+def extractShard(shard):
+   #worker for parallel runs, writes one contig's output to its own file and hands back the targets (and the contig manifest for text output)
+   import pileupIndex
+   inputFileName, start, end, shardFileName, requirements, targetTable, targetsOnly, columnar, rawLines = shard
+   inputFile = open(inputFileName, 'rb')
+   inputFile.seek(start)
+   if columnar:
+      import variantColumns
+      shardFile = variantColumns.ColumnarVariantWriter(shardFileName, rawLines)
+      contigManifest = None
+   else:
+      shardFile = open(shardFileName, 'w')
+      contigManifest = pileupIndex.ContigManifest()
+   minReadRequirement, minPercentageRequirement, requireDoubleStranded = requirements
+   targets, progress = extractVariantLines(pileupIndex.readLineBlocks(inputFile, end), shardFile, minReadRequirement, minPercentageRequirement, requireDoubleStranded, targetTable = targetTable, targetsOnly = targetsOnly, contigManifest = contigManifest)
+   shardFile.close()
+   inputFile.close()
+   return (targets, progress, contigManifest)
+
+def extractVariantsParallel(inputFileName, outputFile, outputFileName, workers, requirements, targetTable = None, verbose = False, targetsOnly = False, rawLines = True, contigManifest = None):
+   #splits the input at contig boundaries and runs each contig in a process pool.  Shards are stitched back together in the original contig order.
+   import multiprocessing
+   import os
+   import shutil
+   import sys
+   import pileupIndex
+   import variantTargets
+   contigRanges = pileupIndex.findContigByteRanges(inputFileName)
+   columnar = hasattr(outputFile, "addRows")
+   shards = []
+   for index, contigRange in enumerate(contigRanges):
+      if targetTable is None:
+         shardTargets = None
+      else:
+         shardTargets = targetTable.contigTable(contigRange.contig)
+      if targetsOnly and not len(shardTargets):  #nothing this contig could contribute
+         continue
+      shards.append((inputFileName, contigRange.start, contigRange.end, "%s.shard%s" %(outputFileName, index), requirements, shardTargets, targetsOnly, columnar, rawLines))
+   targets = variantTargets.TargetTableBuilder()
+   progress = 0
+   pool = multiprocessing.Pool(min(workers, max(len(shards), 1)))
+   for shard, result in zip(shards, pool.imap(extractShard, shards)):
+      shardTargets, shardProgress, shardManifest = result
+      targets.update(shardTargets)
+      progress += shardProgress
+      shardFileName = shard[3]
+      if columnar:
+         import variantColumns
+         shardFile = variantColumns.ColumnarVariantFile(shardFileName)
+         outputFile.addColumnarFile(shardFile)
+         shardFile.close()
+         if rawLines:
+            os.remove(variantColumns.rawLineSidecarName(shardFileName))
+      else:
+         shardFile = open(shardFileName, 'r')
+         outputFile.flush()
+         shutil.copyfileobj(shardFile, outputFile)
+         shardFile.close()
+         if contigManifest:
+            contigManifest.update(shardManifest)
+      os.remove(shardFileName)
+      if verbose:
+         print("Processed %s lines." %(progress), file = sys.stderr, end = "\r")
+   pool.close()
+   pool.join()
+   return (targets, progress)
 
 if __name__=="__main__":
    import datetime
    startTime = datetime.datetime.now()
    import sys
-   import pickle
+   import pileupIndex
+   import variantTargets
    args = CheckArgs()
    inputFileName = args.inputFile
    outputFileName = args.outputFile
-   inputFile = open(inputFileName, 'r')
-   if args.outputFile.upper == "STDOUT":
+   if args.columnar:
+      import variantColumns
+      usingStdout = False
+      outputFile = variantColumns.ColumnarVariantWriter(outputFileName, args.rawLines)
+   elif args.outputFile.upper() == "STDOUT":
       usingStdout = True
       outputFile = sys.stdout
    else:
       usingStdout = False
       outputFile = open(outputFileName, 'w')
-   inputLine = inputFile.readline().strip()
-   print("\t".join(["#mutCount","coverage","mutPercent","contig","position","ref","alt","type","strand","rawPileUpLine"]), file = outputFile)
+   if not args.columnar:
+      print(titleLine, file = outputFile)
+   if args.columnar or usingStdout:
+      contigManifest = None
+   else:
+      contigManifest = pileupIndex.ContigManifest(len(titleLine.encode()) + 1)  #lets combineExtractedVariants skip scanning the whole file for its contigs
+   if args.matchingTargets:
+      targetTable = variantTargets.loadTargetTable(args.matchingTargets)
+   else:
+      targetTable = None
+   requirements = (args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded)
+   if args.workers > 1:
+      targets, progress = extractVariantsParallel(inputFileName, outputFile, outputFileName, args.workers, requirements, targetTable, args.verbose, args.targetsOnly, args.rawLines, contigManifest)
+   else:
+      targets, progress = extractVariantLines(readInputLineBlocks(inputFileName, targetTable, args.targetsOnly), outputFile, args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded, targetTable, args.verbose, targetsOnly = args.targetsOnly, contigManifest = contigManifest)
    if args.targetOutput:
-      targets = {}
-      progress = 0
-      while inputLine:
-         if args.verbose:
-            if progress % 10000 == 0:
-               print("Processed %s lines." %(progress), file = sys.stderr, end = "\r")
-         progress += 1
-         if inputLine.startswith("#"):
-            inputLine = inputFile.readline().strip()
-            continue
-         line = MPileupLine(inputLine, args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded)
-         if line.hasQualifiedVariants:
-            print(line, file = outputFile)
-            if not line.contig in targets:
-               targets[line.contig] = {}
-            targets[line.contig][line.position] = line.qualifiedVariants
-         inputLine = inputFile.readline().strip()
-      targetFile = open(args.targetOutput, 'wb')
-      pickle.dump(targets, targetFile)
-      targetFile.close()
-   elif args.matchingTargets:
-      import pickle
-      targetFileName = args.matchingTargets
-      targetFile = open(targetFileName, 'rb')
-      targetTable = pickle.load(targetFile)
-      targetFile.close()
-      progress = 0
-      while inputLine:
-         if args.verbose:
-            if progress % 10000 == 0:
-               print("Processed %s lines." %(progress), file = sys.stderr, end = "\r")
-         progress += 1
-         if inputLine.startswith("#"):
-            inputLine = inputFile.readline().strip()
-            continue
-         line = MPileupLine(inputLine, args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded, autoparse = False)
-         try:
-            if targetTable[line.contig][line.position]:
-               variantInTumor = True
-            else:
-               variantInTumor = False
-         except KeyError:
-            variantInTumor = False
-         if variantInTumor:
-            line.parsePileupString(overrideRequirements = True)
-            print(line, file = outputFile)
-         elif line.isCovered and line.hasVariant:
-            line.parsePileupString()
-            if line.hasQualifiedVariants:
-               print(line, file = outputFile)
-         inputLine = inputFile.readline().strip()
+      targets.write(args.targetOutput)
    if not usingStdout:
       outputFile.close()
-   inputFile.close()
+   if contigManifest:
+      contigManifest.write(outputFileName)
    if args.verbose:
+      import resource
+      runTime = datetime.datetime.now() - startTime
+      peakMemory = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
       print("Processed %s lines." %(progress), file = sys.stderr)
-      print("Completed in %s" %(datetime.datetime.now() - startTime), file = sys.stderr)
-         
\ No newline at end of file
+      print("Completed in %s (%s lines per second, peak memory %sMB)" %(runTime, int(progress / max(runTime.total_seconds(), 0.001)), round(peakMemory / 1024, 1)), file = sys.stderr)
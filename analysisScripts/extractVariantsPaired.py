@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+
+class CheckArgs(object):
+
+   def __init__(self):
+         import argparse
+         import os
+         parser = argparse.ArgumentParser()
+         parser.add_argument("-t", "--tumor", help = "Tumor pileup file")
+         parser.add_argument("-n", "--normal", help = "Normal pileup file")
+         parser.add_argument("-o", "--outputFile", help = "Output file for the combined tumor versus normal table.")
+         parser.add_argument("-r", "--reference", help = "Reference genome fasta (with a .fai or .dict next to it) or its index to take the contig order from.  If not given, the order is read from the pileups themselves.")
+         parser.add_argument("-s", "--minReadRequirement", help = "Require at least n reads supporting a variant in the tumor for it to be emitted", type = int, default = 0)
+         parser.add_argument("-p", "--minPercentageRequirement", help = "Require a tumor variant to be supported by at least this percent of the reads", type = float, default = 0)
+         parser.add_argument("-d", "--requireDoubleStranded", help = "Require a tumor variant to be read on both strands to be emitted", action = 'store_true')
+         parser.add_argument("-v", "--verbose", help = "Verbose mode", action = 'store_true')
+         rawArgs = parser.parse_args()
+         for sample in ["tumor", "normal"]:
+            fileName = getattr(rawArgs, sample)
+            if not fileName:
+               raise RuntimeError("No %s pileup specified." %(sample))
+            if not os.path.exists(fileName):
+               raise RuntimeError("%s pileup file not found: %s" %(sample.capitalize(), fileName))
+            setattr(self, sample, fileName)
+         if self.tumor == self.normal:
+            raise RuntimeError("Tumor and normal pileups cannot be the same file.")
+         if not rawArgs.outputFile:
+            raise RuntimeError("No output file specified.")
+         self.outputFile = rawArgs.outputFile
+         if self.outputFile in [self.tumor, self.normal]:
+            raise RuntimeError("Error: Input and output files cannot be the same.")
+         self.reference = rawArgs.reference
+         if self.reference:
+            import genomeCoordinates
+            genomeCoordinates.referenceIndexFile(self.reference)  #raises FileNotFoundError if there is no index
+         elif not (os.path.isfile(self.tumor) and os.path.isfile(self.normal)):
+            raise RuntimeError("A reference index is required to get the contig order when reading a pileup from a pipe.")
+         self.minReadRequirement = rawArgs.minReadRequirement
+         self.minPercentageRequirement = rawArgs.minPercentageRequirement
+         if self.minPercentageRequirement >= 1 or self.minPercentageRequirement < 0:
+            raise RuntimeError("Percentage requirement must less than 1 and greater than or equal to 0")
+         self.requireDoubleStranded = rawArgs.requireDoubleStranded
+         self.verbose = rawArgs.verbose
+
+class PileupLocusReader(object):
+
+   def __init__(self, fileHandle, contigRanks):
+      self.fileHandle = fileHandle
+      self.contigRanks = contigRanks
+      self.completed = False
+      self.currentLine = ""
+      self.currentKey = None
+      self.loadNextLine()
+
+   def loadNextLine(self):
+      #only splits off contig and position here, full parsing only happens for lines we actually want
+      while True:
+         line = self.fileHandle.readline()
+         if not line:
+            self.completed = True
+            self.currentLine = ""
+            self.currentKey = None
+            return False
+         if line.startswith("#") or not line.strip():
+            continue
+         lineList = line.split("\t", 2)
+         if len(lineList) < 3:
+            continue
+         contig = lineList[0]
+         if not contig in self.contigRanks:  #contigs that are not in the tumor can never match anything
+            continue
+         self.currentLine = line
+         self.currentKey = (self.contigRanks[contig], int(lineList[1]))
+         return True
+
+   def lineAtLocus(self, locusKey):
+      #advances to the locus (given as contig rank and position) and returns its raw line, or an empty string if the file has nothing there
+      while not self.completed and self.currentKey < locusKey:
+         self.loadNextLine()
+      if not self.completed and self.currentKey == locusKey:
+         return self.currentLine
+      return ""
+
+def getReferenceContigOrder(referenceFileName):
+   import genomeCoordinates
+   return list(genomeCoordinates.readContigOrder(referenceFileName).contigs)
+
+def getPileupContigOrder(tumorFileName, normalFileName):
+   #without a reference index, take the order from the pileups and make sure they agree
+   import pileupIndex
+   import combineExtractedVariants
+   tumorContigs = tuple([contigRange.contig for contigRange in pileupIndex.findContigByteRanges(tumorFileName)])
+   normalContigs = tuple([contigRange.contig for contigRange in pileupIndex.findContigByteRanges(normalFileName)])
+   if not combineExtractedVariants.validContigLists(tumorContigs, normalContigs):
+      raise RuntimeError("Tumor and normal pileups do not appear to have been sorted in the same order.\nTumor contigs: %s\nNormal contigs: %s" %(tumorContigs, normalContigs))
+   return list(tumorContigs)
+
+def makeLocusVariantTable(variantLineStrings):
+   import combineExtractedVariants
+   locusVariantTable = {}
+   for variantLineString in variantLineStrings:
+      variantLine = combineExtractedVariants.VariantDataLine(variantLineString)
+      locusVariantTable[variantLine.variant] = variantLine
+   return locusVariantTable
+
+def writePairedBatch(tumorLines, normalReader, outputFile, requirements):
+   #tumorLines are already parsed tumor MPileupLines in file order, the normal gets pulled along to the same loci and parsed in one batch
+   import extractVariants
+   import combineExtractedVariants
+   minReadRequirement, minPercentageRequirement, requireDoubleStranded = requirements
+   tumorLines = [line for line in tumorLines if line.hasQualifiedVariants]
+   normalLines = []
+   for tumorLine in tumorLines:
+      normalRawLine = normalReader.lineAtLocus((normalReader.contigRanks[tumorLine.contig], tumorLine.position))
+      if normalRawLine:
+         normalLine = extractVariants.MPileupLine(normalRawLine, minReadRequirement, minPercentageRequirement, requireDoubleStranded, autoparse = False)
+         if not normalLine.isValidLine:
+            normalLine = None
+      else:
+         normalLine = None
+      normalLines.append(normalLine)
+   normalToParse = [line for line in normalLines if line]
+   extractVariants.parsePileupBatch(normalToParse, [True] * len(normalToParse))
+   outputLineCount = 0
+   for tumorLine, normalLine in zip(tumorLines, normalLines):
+      tumorLocusVariantTable = makeLocusVariantTable(tumorLine.variantLineStrings)
+      if normalLine:
+         matchedNormalVariantTable = makeLocusVariantTable(normalLine.variantLineStrings)
+      else:
+         matchedNormalVariantTable = False
+      for outputLine in combineExtractedVariants.makeOutputLines(tumorLocusVariantTable, matchedNormalVariantTable, (tumorLine.contig, tumorLine.position)):
+         print(outputLine, file = outputFile)
+         outputLineCount += 1
+   return outputLineCount
+
+def extractPaired(tumorFile, normalFile, outputFile, contigOrder, requirements, verbose = False, batchSize = 5000):
+   #tumorFile should be opened in binary mode, it is read in large blocks
+   import sys
+   import extractVariants
+   import pileupIndex
+   import combineExtractedVariants
+   import genomeCoordinates
+   minReadRequirement, minPercentageRequirement, requireDoubleStranded = requirements
+   contigRanks = genomeCoordinates.ContigOrder(contigOrder).ranks
+   normalReader = PileupLocusReader(normalFile, contigRanks)
+   print(combineExtractedVariants.titleLine, file = outputFile)
+   batch = []
+   outputLineCount = 0
+   lastKey = None
+   lineCounter = extractVariants.LineCounter()
+   for rawLine, variantInTumor in extractVariants.classifyPileupLines(lineCounter.count(pileupIndex.readLineBlocks(tumorFile))):
+      line = extractVariants.MPileupLine(rawLine.decode(), minReadRequirement, minPercentageRequirement, requireDoubleStranded, autoparse = False)
+      if not line.isValidLine:
+         continue
+      if not line.contig in contigRanks:
+         raise RuntimeError("Contig %s from the tumor pileup was not found in the contig order." %(line.contig))
+      lineKey = (contigRanks[line.contig], line.position)
+      if lastKey and lineKey < lastKey:
+         raise RuntimeError("Tumor pileup is not sorted in the same order as the reference.  Found %s:%s after a later locus." %(line.contig, line.position))
+      lastKey = lineKey
+      if line.isCovered and line.hasVariant:
+         batch.append(line)
+      if len(batch) >= batchSize:
+         extractVariants.parsePileupBatch(batch, [False] * len(batch))
+         outputLineCount += writePairedBatch(batch, normalReader, outputFile, requirements)
+         batch = []
+         if verbose:
+            print("Processed %s tumor lines." %(lineCounter.lines), file = sys.stderr, end = "\r")
+   extractVariants.parsePileupBatch(batch, [False] * len(batch))
+   outputLineCount += writePairedBatch(batch, normalReader, outputFile, requirements)
+   return (lineCounter.lines, outputLineCount)
+
+if __name__ == "__main__":
+   import datetime
+   import sys
+   startTime = datetime.datetime.now()
+   args = CheckArgs()
+   if args.reference:
+      contigOrder = getReferenceContigOrder(args.reference)
+   else:
+      contigOrder = getPileupContigOrder(args.tumor, args.normal)
+   tumorFile = open(args.tumor, 'rb')
+   normalFile = open(args.normal, 'r')
+   outputFile = open(args.outputFile, 'w')
+   progress, outputLineCount = extractPaired(tumorFile, normalFile, outputFile, contigOrder, (args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded), args.verbose)
+   tumorFile.close()
+   normalFile.close()
+   outputFile.close()
+   if args.verbose:
+      print("Processed %s tumor lines and wrote %s paired lines in %s" %(progress, outputLineCount, datetime.datetime.now() - startTime), file = sys.stderr)
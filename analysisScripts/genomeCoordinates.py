@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+#Contig order (and lengths) for a reference genome, read once from its .fai or .dict index.  Contig names get interned to small integer ranks, so a locus
+#becomes a single integer sort key (the rank shifted up past any position, plus the position) and sorting or merging by locus never goes back to the
+#names.  Without a reference, the standard human contigs (1-22, X, Y, M, MT, with or without chr) are used.  Contigs that are not in an order sort after
+#the ones that are, by name.
+
+positionBits = 32  #no contig is anywhere near 2^32 bases long
+numpySortLimit = 100000  #lists of loci shorter than this get sorted in plain python, longer ones by their keys in numpy
+standardContigs = tuple([str(number) for number in range(1, 23)] + ["X", "Y", "M", "MT"])
+loadedOrders = {}  #orders already read, by index file (None for the standard one)
+
+class ContigOrder(object):
+
+   def __init__(self, contigs, lengths = None, ignoreChrPrefix = False):
+      #with ignoreChrPrefix, chr1 and 1 (and CHR1) both get the rank of 1
+      self.contigs = []
+      self.lengths = {}
+      self.ranks = {}
+      self.ignoreChrPrefix = ignoreChrPrefix
+      self.namedRanks = {}  #contigs that are not in the order, ranked after it
+      if lengths is None:
+         lengths = [None] * len(contigs)
+      for contig, length in zip(contigs, lengths):
+         if contig in self.ranks:
+            continue
+         self.ranks[contig] = len(self.contigs)
+         self.contigs.append(contig)
+         if length is not None:
+            self.lengths[contig] = int(length)
+
+   def __contains__(self, contig):
+      return self.rank(contig) is not None
+
+   def __len__(self):
+      return len(self.contigs)
+
+   def rank(self, contig):
+      #None for a contig that is not in the order
+      rank = self.ranks.get(contig)
+      if rank is None and self.ignoreChrPrefix:
+         if contig[:3].lower() == "chr":
+            rank = self.ranks.get(contig[3:])
+         if rank is not None:
+            self.ranks[contig] = rank  #so the next lookup is a single dictionary hit
+      return rank
+
+   def length(self, contig):
+      rank = self.rank(contig)
+      if rank is None:
+         return None
+      return self.lengths.get(self.contigs[rank])
+
+   def contigKey(self, contig):
+      #a sort key for one contig at a time: (rank, "") for contigs in the order, (number of contigs, name) for the rest
+      rank = self.rank(contig)
+      if rank is None:
+         return (len(self.contigs), contig)
+      return (rank, "")
+
+   def rankAll(self, contigs):
+      #a rank for every contig given, with the ones not in the order ranked after it by name.  Those ranks are kept, so later calls agree with earlier ones.
+      ranks = {}
+      unranked = set()
+      for contig in set(contigs):
+         rank = self.rank(contig)
+         if rank is None:
+            rank = self.namedRanks.get(contig)
+         if rank is None:
+            unranked.add(contig)
+         else:
+            ranks[contig] = rank
+      for contig in sorted(unranked):
+         rank = len(self.contigs) + len(self.namedRanks)
+         self.namedRanks[contig] = rank
+         ranks[contig] = rank
+      return ranks
+
+   def locusKey(self, contig, position):
+      #None for a contig that is not in the order
+      rank = self.rank(contig)
+      if rank is None:
+         return None
+      return (rank << positionBits) | position
+
+   def sortLoci(self, loci, contigIndex = 0, positionIndex = 1):
+      #sorts a list of tuples (such as variant hashes) in place by contig and position.  The sort is stable, so tuples at the same locus keep their order.
+      rankedContigs = self.rankAll([locus[contigIndex] for locus in loci])
+      shiftedRanks = dict([(contig, rank << positionBits) for contig, rank in rankedContigs.items()])
+      if len(loci) < numpySortLimit:
+         loci.sort(key = lambda locus: shiftedRanks[locus[contigIndex]] + locus[positionIndex])
+      else:
+         import numpy
+         locusKeys = numpy.fromiter((shiftedRanks[locus[contigIndex]] + locus[positionIndex] for locus in loci), dtype = numpy.int64, count = len(loci))
+         loci[:] = [loci[index] for index in numpy.argsort(locusKeys, kind = "stable").tolist()]
+      return loci
+
+def referenceIndexFile(fileName):
+   #the .fai or .dict index for a reference fasta, or the index itself if that is what was given
+   import os
+   if fileName.endswith(".fai") or fileName.endswith(".dict"):
+      candidates = [fileName]
+   else:
+      candidates = [fileName + ".fai", os.path.splitext(fileName)[0] + ".dict", fileName + ".dict"]
+   for candidate in candidates:
+      if os.path.isfile(candidate):
+         return candidate
+   raise FileNotFoundError("Unable to find a reference index (.fai or .dict) for %s" %(fileName))
+
+def readContigOrder(fileName):
+   #contig order and lengths from a reference fasta's .fai or .dict (or either index directly), read once per run
+   import os
+   indexFile = os.path.abspath(referenceIndexFile(fileName))
+   if not indexFile in loadedOrders:
+      contigs = []
+      lengths = []
+      file = open(indexFile, 'r')
+      if indexFile.endswith(".dict"):
+         for line in file:
+            if not line.startswith("@SQ"):
+               continue
+            tags = dict([field.split(":", 1) for field in line.rstrip("\n").split("\t")[1:] if ":" in field])
+            contigs.append(tags["SN"])
+            lengths.append(int(tags["LN"]))
+      else:
+         for line in file:
+            fields = line.rstrip("\n").split("\t")
+            if not fields[0]:
+               continue
+            contigs.append(fields[0])
+            lengths.append(int(fields[1]))
+      file.close()
+      loadedOrders[indexFile] = ContigOrder(contigs, lengths)
+   return loadedOrders[indexFile]
+
+def standardContigOrder():
+   if not None in loadedOrders:
+      loadedOrders[None] = ContigOrder(standardContigs, ignoreChrPrefix = True)
+   return loadedOrders[None]
+
+def contigOrder(reference = None):
+   #the reference's contig order if one is given, the standard human order otherwise
+   if reference:
+      return readContigOrder(reference)
+   return standardContigOrder()
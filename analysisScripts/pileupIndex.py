@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+
+class ContigByteRange(object):
+
+   def __init__(self, contig, start, end):
+      self.contig = contig
+      self.start = start
+      self.end = end
+
+   def __str__(self):
+      return "%s:%s-%s" %(self.contig, self.start, self.end)
+
+class ContigBoundaryFinder(object):
+
+   def __init__(self, fileName, contigColumn = 0, delimiter = "\t", commentCharacter = "#"):
+      import os
+      self.fileName = fileName
+      self.contigColumn = contigColumn
+      self.delimiter = delimiter.encode()
+      self.commentCharacter = commentCharacter.encode()
+      self.fileSize = os.path.getsize(fileName)
+      self.file = open(fileName, 'rb')
+
+   def contigOfLine(self, line):
+      return line.split(self.delimiter)[self.contigColumn].decode().strip()
+
+   def firstLineAtOrAfter(self, offset):
+      #returns the start offset and contig of the first complete line starting at or after the given byte offset
+      if offset <= 0:
+         self.file.seek(0)
+      else:
+         self.file.seek(offset - 1)
+         self.file.readline()  #finishes off whatever line we landed in (or just the newline if we landed right after one)
+      lineStart = self.file.tell()
+      line = self.file.readline()
+      if not line:
+         return (self.fileSize, None)
+      return (lineStart, self.contigOfLine(line))
+
+   def findDataStart(self):
+      self.file.seek(0)
+      lineStart = 0
+      line = self.file.readline()
+      while line and (line.startswith(self.commentCharacter) or not line.strip()):
+         lineStart = self.file.tell()
+         line = self.file.readline()
+      return lineStart
+
+   def findContigEnd(self, contig, contigStart):
+      #binary search for the first line that is not on this contig, relies on each contig's lines being together in the file (as they are in any sorted pileup)
+      low = contigStart
+      high = self.fileSize
+      while low < high:
+         middle = (low + high) // 2
+         lineStart, lineContig = self.firstLineAtOrAfter(middle)
+         if lineContig == contig:
+            low = middle + 1
+         else:
+            high = middle
+      return self.firstLineAtOrAfter(low)[0]
+
+   def findRanges(self):
+      ranges = []
+      seenContigs = set()
+      lineStart, contig = self.firstLineAtOrAfter(self.findDataStart())
+      while contig is not None:
+         if contig in seenContigs:
+            raise RuntimeError("Contig %s appears in more than one block in %s.  Input must be grouped by contig to be split into shards." %(contig, self.fileName))
+         seenContigs.add(contig)
+         contigEnd = self.findContigEnd(contig, lineStart)
+         ranges.append(ContigByteRange(contig, lineStart, contigEnd))
+         lineStart, contig = self.firstLineAtOrAfter(contigEnd)
+      return ranges
+
+   def close(self):
+      self.file.close()
+
+def findContigByteRanges(fileName, contigColumn = 0, delimiter = "\t"):
+   finder = ContigBoundaryFinder(fileName, contigColumn, delimiter)
+   ranges = finder.findRanges()
+   finder.close()
+   return ranges
+
+class ByteRangeLineReader(object):
+   #readline over just the lines between two byte offsets of a text file, such as one contig's ContigByteRange
+
+   def __init__(self, fileName, start, end):
+      self.name = fileName
+      self.file = open(fileName, 'rb')
+      self.file.seek(start)
+      self.remaining = end - start
+
+   def readline(self):
+      if self.remaining <= 0:
+         return ""
+      line = self.file.readline(self.remaining)
+      self.remaining -= len(line)
+      return line.decode()
+
+   def close(self):
+      self.file.close()
+
+def contigManifestName(fileName):
+   return fileName + ".contigs"
+
+class ContigManifest(object):
+   #contigs of a sorted text file in the order they appear, each with the byte offset of its first line, the offset just past its last line and its line count.
+   #Built up as the file gets written and saved next to it (see contigManifestName) along with the file size, so readers can get the contig order and
+   #ranges without scanning the whole file.
+
+   def __init__(self, dataStart = 0):
+      self.contigs = []
+      self.offset = dataStart
+      self.contiguous = True
+      self.seenContigs = set()
+
+   def add(self, contig, byteCount, lineCount = 1):
+      if not self.contigs or self.contigs[-1][0] != contig:
+         if contig in self.seenContigs:  #came back to a contig, so ranges would not cover it
+            self.contiguous = False
+         self.seenContigs.add(contig)
+         self.contigs.append([contig, self.offset, self.offset, 0])
+      self.contigs[-1][2] += byteCount
+      self.contigs[-1][3] += lineCount
+      self.offset += byteCount
+
+   def update(self, other):
+      #appends another manifest's contigs (such as one for a shard that got copied onto the end of the file)
+      for contig, start, end, lineCount in other.contigs:
+         self.add(contig, end - start, lineCount)
+
+   def contigTuple(self):
+      return tuple([contig for contig, start, end, lineCount in self.contigs])
+
+   def ranges(self):
+      return [ContigByteRange(contig, start, end) for contig, start, end, lineCount in self.contigs]
+
+   def lineCount(self):
+      return sum([lineCount for contig, start, end, lineCount in self.contigs])
+
+   def write(self, fileName):
+      #saves the manifest for fileName, which should already be closed.  A file with contigs split across more than one block gets no manifest (and loses any old one) since readers could not trust the ranges.
+      import json
+      import os
+      manifestName = contigManifestName(fileName)
+      if not self.contiguous:
+         if os.path.isfile(manifestName):
+            os.remove(manifestName)
+         return False
+      manifestFile = open(manifestName, 'w')
+      json.dump({"fileSize" : os.path.getsize(fileName), "contigs" : self.contigs}, manifestFile)
+      manifestFile.close()
+      return True
+
+def readContigManifest(fileName):
+   #returns the ContigManifest saved for fileName, or None if there is none or the file has changed size since it was written
+   import json
+   import os
+   manifestName = contigManifestName(fileName)
+   if not os.path.isfile(manifestName):
+      return None
+   manifestFile = open(manifestName, 'r')
+   try:
+      data = json.load(manifestFile)
+   except ValueError:
+      return None
+   finally:
+      manifestFile.close()
+   if data.get("fileSize") != os.path.getsize(fileName):
+      return None
+   manifest = ContigManifest()
+   for contig, start, end, lineCount in data["contigs"]:
+      manifest.contigs.append([contig, start, end, lineCount])
+      manifest.seenContigs.add(contig)
+   if manifest.contigs:
+      manifest.offset = manifest.contigs[-1][2]
+   return manifest
+
+def readLineBlocks(fileHandle, end = None, chunkSize = 1048576):
+   #reads a binary file handle in large chunks and yields blocks of complete newline-terminated lines, stopping before byte offset end if given
+   remainder = b""
+   if end is not None:
+      position = fileHandle.tell()
+   while True:
+      readSize = chunkSize
+      if end is not None:
+         readSize = min(chunkSize, end - position)
+         if readSize <= 0:
+            break
+      chunk = fileHandle.read(readSize)
+      if not chunk:
+         break
+      if end is not None:
+         position += len(chunk)
+      lastNewline = chunk.rfind(b"\n")
+      if lastNewline == -1:
+         remainder += chunk
+         continue
+      yield remainder + chunk[:lastNewline + 1]
+      remainder = chunk[lastNewline + 1:]
+   if remainder:
+      yield remainder + b"\n"
+
+def isGzipped(fileName):
+   gzipFile = open(fileName, 'rb')
+   magic = gzipFile.read(2)
+   gzipFile.close()
+   return magic == b"\x1f\x8b"
+
+class BgzfReader(object):
+   #bgzip files are a series of independent gzip blocks of at most 64kb each, addressed by virtual offsets (compressed block start << 16 | offset into the uncompressed block)
+
+   def __init__(self, fileName):
+      self.fileName = fileName
+      self.file = open(fileName, 'rb')
+
+   def readBlock(self, blockOffset):
+      #returns the uncompressed block at the given compressed offset and the compressed offset of the next block, or an empty block and None at the end of the file
+      import struct
+      import zlib
+      self.file.seek(blockOffset)
+      header = self.file.read(12)
+      if len(header) < 12:
+         return (b"", None)
+      if header[:4] != b"\x1f\x8b\x08\x04":
+         raise RuntimeError("%s does not appear to be a bgzip file (bad block header at %s)." %(self.fileName, blockOffset))
+      extraLength = struct.unpack("<H", header[10:12])[0]
+      extra = self.file.read(extraLength)
+      blockSize = None
+      position = 0
+      while position + 4 <= len(extra):
+         subfieldLength = struct.unpack("<H", extra[position + 2 : position + 4])[0]
+         if extra[position : position + 2] == b"BC":
+            blockSize = struct.unpack("<H", extra[position + 4 : position + 6])[0] + 1
+         position += 4 + subfieldLength
+      if blockSize is None:
+         raise RuntimeError("%s does not appear to be a bgzip file (no block size at %s)." %(self.fileName, blockOffset))
+      compressed = self.file.read(blockSize - 12 - extraLength - 8)
+      self.file.read(8)  #crc and uncompressed size
+      return (zlib.decompress(compressed, -15), blockOffset + blockSize)
+
+   def close(self):
+      self.file.close()
+
+class TabixIndex(object):
+
+   def __init__(self, indexFileName):
+      import gzip
+      import struct
+      indexFile = gzip.open(indexFileName, 'rb')
+      data = indexFile.read()
+      indexFile.close()
+      if data[:4] != b"TBI\x01":
+         raise RuntimeError("%s does not appear to be a tabix index." %(indexFileName))
+      referenceCount, self.format, self.sequenceColumn, self.beginColumn, self.endColumn, meta, self.skip, namesLength = struct.unpack("<8i", data[4:36])
+      self.metaCharacter = chr(meta)
+      self.contigs = [name.decode() for name in data[36 : 36 + namesLength].split(b"\x00") if name]
+      position = 36 + namesLength
+      self.linearIndex = {}
+      self.contigStarts = {}
+      for contig in self.contigs[:referenceCount]:
+         binCount = struct.unpack("<i", data[position : position + 4])[0]
+         position += 4
+         chunkStarts = []
+         for binNumber in range(binCount):
+            binID, chunkCount = struct.unpack("<Ii", data[position : position + 8])
+            position += 8
+            chunks = struct.unpack("<%sQ" %(2 * chunkCount), data[position : position + 16 * chunkCount])
+            position += 16 * chunkCount
+            if binID != 37450:  #newer tabix versions put metadata in this pseudo-bin
+               chunkStarts += chunks[0::2]
+         intervalCount = struct.unpack("<i", data[position : position + 4])[0]
+         position += 4
+         self.linearIndex[contig] = struct.unpack("<%sQ" %(intervalCount), data[position : position + 8 * intervalCount])
+         position += 8 * intervalCount
+         if chunkStarts:
+            self.contigStarts[contig] = min(chunkStarts)
+
+   def minimumOffset(self, contig, position):
+      #virtual offset at or before the first line that could be at this 1-based position, or None if the contig is not in the file.  Every line at the position is guaranteed to start at or after this offset.
+      if not contig in self.contigStarts:
+         return None
+      intervals = self.linearIndex[contig]
+      window = min((position - 1) >> 14, len(intervals) - 1)
+      while window >= 0:
+         if intervals[window]:
+            return max(intervals[window], self.contigStarts[contig])
+         window -= 1
+      return self.contigStarts[contig]
+
+class BgzfLineCursor(object):
+   #keeps the uncompressed text from the current position (start) to the end of the last block read, so lines that run over block boundaries come out whole
+
+   def __init__(self, reader):
+      self.reader = reader
+      self.pending = b""
+      self.start = 0
+      self.currentBlock = None
+      self.nextBlock = None
+
+   def seek(self, virtualOffset):
+      self.currentBlock = virtualOffset >> 16
+      data, self.nextBlock = self.reader.readBlock(self.currentBlock)
+      self.pending = data
+      self.start = virtualOffset & 0xFFFF
+
+   def extend(self, start = None):
+      #drops everything before start and adds the next block to pending, returns False once there is nothing left to read
+      if start is None:
+         start = self.start
+      if self.nextBlock is None:
+         return False
+      self.currentBlock = self.nextBlock
+      data, self.nextBlock = self.reader.readBlock(self.currentBlock)
+      self.pending = self.pending[start:] + data
+      self.start = 0
+      if self.nextBlock is None and self.pending and not self.pending.endswith(b"\n"):
+         self.pending += b"\n"
+      return True
+
+def readTargetLineBlocks(fileName, targetPositions, indexFileName = None, blockSize = 1048576):
+   #yields blocks of newline-terminated lines from a bgzipped, tabix indexed pileup at the given positions (dict of contig to integer positions), skipping the rest of the file.  Contigs come out in the order of the file.
+   if not indexFileName:
+      indexFileName = fileName + ".tbi"
+   index = TabixIndex(indexFileName)
+   if index.sequenceColumn != 1 or index.beginColumn != 2:
+      raise RuntimeError("Index %s is not for a pileup.  Pileups should be indexed with contig in column 1 and position in column 2 (tabix -s 1 -b 2 -e 2)." %(indexFileName))
+   reader = BgzfReader(fileName)
+   cursor = BgzfLineCursor(reader)
+   output = []
+   outputSize = 0
+   for contig in index.contigs:
+      if not contig in targetPositions or not targetPositions[contig]:
+         continue
+      contigBytes = contig.encode()
+      targets = sorted(set(targetPositions[contig]))
+      targetIndex = 0
+      positioned = False
+      while targetIndex < len(targets):
+         target = targets[targetIndex]
+         seekOffset = index.minimumOffset(contig, target)
+         if seekOffset is None:
+            break
+         if not positioned or (seekOffset >> 16) > cursor.currentBlock:  #nothing we have read so far can be at the target, jump straight there
+            cursor.seek(seekOffset)
+            positioned = True
+         pending = cursor.pending
+         lastNewline = pending.rfind(b"\n")
+         if lastNewline < cursor.start:
+            if not cursor.extend():
+               break
+            continue
+         #if the last complete line we have is still short of the target, none of the lines before it matter
+         lastLineStart = max(pending.rfind(b"\n", cursor.start, lastNewline) + 1, cursor.start)
+         lastFields = pending[lastLineStart : lastNewline].split(b"\t", 2)
+         if len(lastFields) > 2 and lastFields[0] == contigBytes and int(lastFields[1]) < target:
+            if not cursor.extend(lastNewline + 1):
+               break
+            continue
+         #otherwise the target is in what we have or it is not in the file at all
+         prefix = contigBytes + b"\t" + str(target).encode() + b"\t"
+         if pending.startswith(prefix, cursor.start):
+            lineStart = cursor.start
+         else:
+            lineStart = pending.find(b"\n" + prefix, cursor.start, lastNewline)
+            if lineStart != -1:
+               lineStart += 1
+         if lineStart != -1:
+            lineEnd = pending.index(b"\n", lineStart) + 1
+            output.append(pending[lineStart : lineEnd])
+            outputSize += lineEnd - lineStart
+            cursor.start = lineEnd
+            if outputSize >= blockSize:
+               yield b"".join(output)
+               output = []
+               outputSize = 0
+         targetIndex += 1
+   reader.close()
+   if output:
+      yield b"".join(output)
+
+def pileupBinIndexName(fileName):
+   return fileName + ".binIndex"
+
+class PileupBinIndex(object):
+   #byte offsets into a plain text pileup: each contig's range and, inside it, where the first line of every binSize bin of positions starts.  Built in one
+   #pass of large block reads and saved next to the pileup (see pileupBinIndexName) along with its path, size and modification time so later runs can reuse it.
+
+   def __init__(self, binSize = 16384):
+      self.binSize = binSize
+      self.contigs = []
+      self.contigRanges = {}
+      self.bins = {}
+      self.binOffsets = {}
+
+   def build(self, fileName):
+      import os
+      inputFile = open(fileName, 'rb')
+      self.currentContig = None
+      blockStart = 0
+      for block in readLineBlocks(inputFile):
+         self.indexBlock(block, blockStart)
+         blockStart += len(block)
+      inputFile.close()
+      if self.currentContig is not None:
+         self.contigRanges[self.currentContig][1] = min(blockStart, os.path.getsize(fileName))
+      del self.currentContig
+
+   def indexBlock(self, block, blockStart):
+      #adds the lines of one block of complete lines that starts at byte offset blockStart.  Works on the whole block with numpy and only looks at contig names with a binary search for where they change.
+      import numpy
+      buffer = numpy.frombuffer(block, dtype = numpy.uint8)
+      lineEnds = numpy.flatnonzero(buffer == 10)
+      lineStarts = numpy.concatenate([[0], lineEnds[:-1] + 1]).astype(numpy.int64)
+      tabs = numpy.flatnonzero(buffer == 9)
+      if not len(tabs):
+         return
+      firstTabs = tabs[numpy.minimum(numpy.searchsorted(tabs, lineStarts), len(tabs) - 1)]
+      secondTabs = tabs[numpy.minimum(numpy.searchsorted(tabs, firstTabs + 1), len(tabs) - 1)]
+      valid = (lineStarts < lineEnds) & (buffer[numpy.minimum(lineStarts, len(buffer) - 1)] != 35) & (firstTabs < secondTabs) & (secondTabs < lineEnds)  #drops blank lines, comments and anything without a position column
+      lineStarts = lineStarts[valid]
+      firstTabs = firstTabs[valid]
+      secondTabs = secondTabs[valid]
+      lineCount = len(lineStarts)
+      if not lineCount:
+         return
+      positions = numpy.zeros(lineCount, dtype = numpy.int64)
+      digitCounts = secondTabs - firstTabs - 1
+      for digit in range(int(digitCounts.max())):
+         reading = digit < digitCounts
+         positions[reading] = positions[reading] * 10 + buffer[firstTabs[reading] + 1 + digit] - 48
+      contigOf = lambda line: bytes(block[lineStarts[line] : firstTabs[line]]).decode()
+      segmentStart = 0
+      while segmentStart < lineCount:
+         contig = contigOf(segmentStart)
+         if contigOf(lineCount - 1) == contig:
+            segmentEnd = lineCount
+         else:  #each contig's lines are together, so the first line on another contig can be found by bisection
+            low = segmentStart
+            high = lineCount - 1
+            while low < high:
+               middle = (low + high) // 2
+               if contigOf(middle) == contig:
+                  low = middle + 1
+               else:
+                  high = middle
+            segmentEnd = low
+         self.addSegment(contig, positions[segmentStart : segmentEnd], lineStarts[segmentStart : segmentEnd] + blockStart)
+         segmentStart = segmentEnd
+
+   def addSegment(self, contig, positions, offsets):
+      import numpy
+      if contig != self.currentContig:
+         if contig in self.contigRanges:
+            raise RuntimeError("Contig %s appears in more than one block.  Pileups must be sorted to be indexed." %(contig))
+         if self.currentContig is not None:
+            self.contigRanges[self.currentContig][1] = int(offsets[0])
+         self.currentContig = contig
+         self.contigs.append(contig)
+         self.contigRanges[contig] = [int(offsets[0]), None]
+         self.bins[contig] = []
+         self.binOffsets[contig] = []
+      bins = positions // self.binSize
+      previousBins = numpy.concatenate([[self.bins[contig][-1] if self.bins[contig] else -1], bins[:-1]])
+      if (bins < previousBins).any():
+         raise RuntimeError("Positions on contig %s are not sorted.  Pileups must be sorted to be indexed." %(contig))
+      newBins = bins != previousBins
+      self.bins[contig].extend(bins[newBins].tolist())
+      self.binOffsets[contig].extend(offsets[newBins].tolist())
+
+   def lociByteRanges(self, contig, positions):
+      #merged [start, end] byte ranges covering the bins that hold any of the given positions on a contig
+      import bisect
+      if not contig in self.contigRanges:
+         return []
+      bins = self.bins[contig]
+      offsets = self.binOffsets[contig]
+      contigEnd = self.contigRanges[contig][1]
+      ranges = []
+      for binNumber in sorted(set([position // self.binSize for position in positions])):
+         index = bisect.bisect_left(bins, binNumber)
+         if index == len(bins) or bins[index] != binNumber:  #no lines in that bin
+            continue
+         start = offsets[index]
+         if index + 1 < len(bins):
+            end = offsets[index + 1]
+         else:
+            end = contigEnd
+         if ranges and ranges[-1][1] == start:
+            ranges[-1][1] = end
+         else:
+            ranges.append([start, end])
+      return ranges
+
+   def contigByteRanges(self):
+      return [ContigByteRange(contig, self.contigRanges[contig][0], self.contigRanges[contig][1]) for contig in self.contigs]
+
+   def write(self, fileName):
+      #saves the index for the pileup at fileName, going through a temporary file so parallel jobs never see half of one
+      import json
+      import os
+      indexName = pileupBinIndexName(fileName)
+      temporaryName = "%s.%s.tmp" %(indexName, os.getpid())
+      indexFile = open(temporaryName, 'w')
+      json.dump({"path" : os.path.abspath(fileName),
+                 "fileSize" : os.path.getsize(fileName),
+                 "modified" : os.path.getmtime(fileName),
+                 "binSize" : self.binSize,
+                 "contigs" : [[contig, self.contigRanges[contig][0], self.contigRanges[contig][1], self.bins[contig], self.binOffsets[contig]] for contig in self.contigs]}, indexFile)
+      indexFile.close()
+      os.replace(temporaryName, indexName)
+
+def readPileupBinIndex(fileName, binSize = 16384):
+   #returns the saved PileupBinIndex for fileName, or None if there is none or the pileup has changed since it was saved
+   import json
+   import os
+   indexName = pileupBinIndexName(fileName)
+   if not os.path.isfile(indexName):
+      return None
+   indexFile = open(indexName, 'r')
+   try:
+      data = json.load(indexFile)
+   except ValueError:
+      return None
+   finally:
+      indexFile.close()
+   if data.get("path") != os.path.abspath(fileName) or data.get("fileSize") != os.path.getsize(fileName) or data.get("modified") != os.path.getmtime(fileName) or data.get("binSize") != binSize:
+      return None
+   index = PileupBinIndex(binSize)
+   for contig, start, end, bins, binOffsets in data["contigs"]:
+      index.contigs.append(contig)
+      index.contigRanges[contig] = [start, end]
+      index.bins[contig] = bins
+      index.binOffsets[contig] = binOffsets
+   return index
+
+def loadPileupBinIndex(fileName, binSize = 16384):
+   #the saved index for a plain text pileup if it is still current, otherwise a new one (saved for next time if the directory is writable)
+   index = readPileupBinIndex(fileName, binSize)
+   if index:
+      return index
+   index = PileupBinIndex(binSize)
+   index.build(fileName)
+   try:
+      index.write(fileName)
+   except OSError:
+      pass
+   return index
+
+def pileupContigRanges(fileName, binSize = 16384):
+   #the contigs of a pileup in file order as ContigByteRanges.  Plain pileups get byte offsets from their (cached) PileupBinIndex, bgzipped ones with a tabix
+   #index get the virtual offset of each contig's first block and no end, and anything else is read through once for the contig names alone.
+   import gzip
+   import os
+   if os.path.isfile(fileName) and not isGzipped(fileName):
+      return loadPileupBinIndex(fileName, binSize).contigByteRanges()
+   if os.path.isfile(fileName) and os.path.isfile(fileName + ".tbi"):
+      index = TabixIndex(fileName + ".tbi")
+      return [ContigByteRange(contig, index.contigStarts.get(contig), None) for contig in index.contigs]
+   if os.path.isfile(fileName):
+      inputFile = gzip.open(fileName, 'rb')
+   else:
+      inputFile = open(fileName, 'rb')
+   contigs = []
+   lastContig = None
+   for block in readLineBlocks(inputFile):
+      if lastContig and block.startswith(lastContig + b"\t"):
+         lastLineStart = block.rfind(b"\n", 0, len(block) - 1) + 1
+         if block.startswith(lastContig + b"\t", lastLineStart):  #lines are grouped by contig, so a block that starts and ends on the last one has no others
+            continue
+      for line in block.split(b"\n")[:-1]:
+         contig = line.split(b"\t", 1)[0]
+         if contig != lastContig and line and not line.startswith(b"#"):
+            contigs.append(ContigByteRange(contig.decode(), None, None))
+            lastContig = contig
+   inputFile.close()
+   return contigs
+
+def findLocusLines(block, contig, sortedPositions):
+   #the lines of a block of complete lines on contig at any of the sorted positions, joined back into a block.  Each line is found with a plain substring search, so the lines in between never get looked at one by one.
+   import bisect
+   lastLineStart = block.rfind(b"\n", 0, len(block) - 1) + 1
+   firstFields = block[: block.find(b"\n")].split(b"\t", 2)
+   lastFields = block[lastLineStart:].split(b"\t", 2)
+   try:
+      firstPosition = int(firstFields[1])
+      lastPosition = int(lastFields[1])
+   except (IndexError, ValueError):  #odd lines at either end, so just check every position
+      firstPosition = sortedPositions[0]
+      lastPosition = sortedPositions[-1]
+   contigBytes = contig.encode()
+   lines = []
+   searchStart = 0
+   for position in sortedPositions[bisect.bisect_left(sortedPositions, firstPosition) : bisect.bisect_right(sortedPositions, lastPosition)]:
+      prefix = contigBytes + b"\t" + str(position).encode() + b"\t"
+      if searchStart == 0 and block.startswith(prefix):
+         lineStart = 0
+      else:
+         lineStart = block.find(b"\n" + prefix, max(searchStart - 1, 0))
+         if lineStart == -1:
+            continue
+         lineStart += 1
+      lineEnd = block.index(b"\n", lineStart) + 1
+      lines.append(block[lineStart : lineEnd])
+      searchStart = lineEnd
+   return b"".join(lines)
+
+def readLociLineBlocks(fileName, targetPositions, binSize = 16384):
+   #yields blocks of newline-terminated lines from a pileup holding the lines at the given positions (dict of contig to integer positions).  Bgzipped
+   #pileups use their tabix index and plain pileups a PileupBinIndex.  Anything that cannot be indexed (gzip without a tabix index, a pipe) is read end to
+   #end, so callers still need to check each line.
+   import gzip
+   import os
+   if not os.path.isfile(fileName):
+      inputFile = open(fileName, 'rb')
+   elif isGzipped(fileName):
+      if os.path.isfile(fileName + ".tbi"):
+         for block in readTargetLineBlocks(fileName, targetPositions):
+            yield block
+         return
+      inputFile = gzip.open(fileName, 'rb')
+   else:
+      index = loadPileupBinIndex(fileName, binSize)
+      inputFile = open(fileName, 'rb')
+      for contig in index.contigs:
+         if not targetPositions.get(contig):
+            continue
+         targets = sorted(set(targetPositions[contig]))
+         for start, end in index.lociByteRanges(contig, targets):
+            inputFile.seek(start)
+            for block in readLineBlocks(inputFile, end):
+               lines = findLocusLines(block, contig, targets)
+               if lines:
+                  yield lines
+      inputFile.close()
+      return
+   for block in readLineBlocks(inputFile):
+      yield block
+   inputFile.close()
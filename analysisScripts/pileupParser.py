@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+
+#Shared parsing for samtools mpileup read base columns.  Everything here works on a whole batch of lines at once with numpy, so the per character work
+#never happens in python.  tokenizeReadBases gives the allele counts as dictionaries the way MPileupLine uses them, countBases gives plain arrays of
+#A, C, G, T and N counts per locus, and PileupBatch splits whole pileup lines up and hands out either.
+
+baseOrder = "ACGTN"
+
+class ReadBaseScan(object):
+   #Result of one pass over the read base columns for a batch of lines.  Every read is at readPositions in the joined buffer, with its line in readLines,
+   #the character as written in readCharacters and the (uppercased, reference substituted) base in readCodes.  Indels are the +/- markers not inside
+   #anything else, with their lengths and where their sequences are in the buffer.
+
+   def __init__(self, readBasesList, referenceBases):
+      import numpy
+      import sys
+      self.lineCount = len(readBasesList)
+      if self.lineCount and type(readBasesList[0]) == bytes:
+         self.rawBuffer = b"\n".join(readBasesList) + b"\n"
+      else:
+         self.rawBuffer = ("\n".join(readBasesList) + "\n").encode()
+      buffer = numpy.frombuffer(self.rawBuffer, dtype = numpy.uint8)
+      self.buffer = buffer
+      bufferLength = len(buffer)
+      readBaseTable = numpy.zeros(256, dtype = bool)
+      readBaseTable[list(b"atgcnATGCN.,")] = True
+      upperCaseTable = numpy.arange(256, dtype = numpy.int64)
+      upperCaseTable[list(b"atgcn")] = list(b"ATGCN")
+      indices = numpy.arange(bufferLength)
+      lineIndex = numpy.cumsum(buffer == 10)  #newlines separate the lines, so this gives the line each character belongs to
+      #a caret is followed by a mapping quality character that can be anything (including another caret), so only every other caret in a run of them starts a read
+      isCaret = buffer == 94
+      caretRunStart = isCaret.copy()
+      caretRunStart[1:] &= ~isCaret[:-1]
+      caretRunOffset = indices - numpy.maximum.accumulate(numpy.where(caretRunStart, indices, 0))
+      readStart = isCaret & (caretRunOffset % 2 == 0)
+      mappingQuality = numpy.zeros(bufferLength, dtype = bool)
+      mappingQuality[1:] = readStart[:-1]
+      isGap = (buffer == 42) & ~mappingQuality
+      self.gapCounts = numpy.bincount(lineIndex[isGap], minlength = self.lineCount)[:self.lineCount]  #previously counted deletions, which samtools includes in the depth
+      skipped = readStart | mappingQuality | (buffer == 36) | isGap  #read starts and their mapping qualities, read ends ($) and gaps (*)
+      #indels are a +/- followed by a length and then that many bases
+      indelMarkers = numpy.flatnonzero(((buffer == 43) | (buffer == 45)) & ~skipped)
+      indelLengths = numpy.zeros(len(indelMarkers), dtype = numpy.int64)
+      digitCounts = numpy.zeros(len(indelMarkers), dtype = numpy.int64)
+      stillReading = numpy.ones(len(indelMarkers), dtype = bool)
+      offset = 1
+      while stillReading.any():
+         probe = numpy.minimum(indelMarkers + offset, bufferLength - 1)
+         digits = buffer[probe].astype(numpy.int64) - 48
+         stillReading &= (digits >= 0) & (digits <= 9) & (indelMarkers + offset < bufferLength)
+         indelLengths[stillReading] = indelLengths[stillReading] * 10 + digits[stillReading]
+         digitCounts += stillReading
+         offset += 1
+      self.indelMarkers = indelMarkers
+      self.indelLengths = indelLengths
+      self.indelSequenceStarts = indelMarkers + 1 + digitCounts
+      self.indelSequenceEnds = numpy.minimum(self.indelSequenceStarts + indelLengths, bufferLength)
+      indelCoverage = numpy.zeros(bufferLength + 1, dtype = numpy.int64)
+      numpy.add.at(indelCoverage, indelMarkers, 1)
+      numpy.add.at(indelCoverage, self.indelSequenceEnds, -1)
+      skipped |= numpy.cumsum(indelCoverage[:-1]) > 0
+      isRead = readBaseTable[buffer] & ~skipped
+      self.isRead = isRead
+      invalid = numpy.flatnonzero(~isRead & ~skipped & (buffer != 10))
+      for position in invalid.tolist():
+         print("Skipping invalid character %s on line %s" %(chr(buffer[position]), readBasesList[lineIndex[position]]), file = sys.stderr)
+      #matches to the reference (. and ,) take on the reference base, everything else is an uppercased base
+      referenceCodes = numpy.zeros(self.lineCount, dtype = numpy.int64)
+      for index, referenceBase in enumerate(referenceBases):
+         if referenceBase and not referenceBase in "Nn":
+            referenceCodes[index] = ord(referenceBase[0].upper())
+      self.readPositions = numpy.flatnonzero(isRead)
+      self.readCharacters = buffer[self.readPositions]
+      self.readLines = lineIndex[self.readPositions]
+      readReferenceCodes = referenceCodes[self.readLines]
+      isMatch = (self.readCharacters == 46) | (self.readCharacters == 44)
+      if (isMatch & (readReferenceCodes == 0)).any():
+         badLine = self.readLines[isMatch & (readReferenceCodes == 0)][0]
+         raise RuntimeError("Picked up a reference match with no usable reference base analyzing line %s" %(readBasesList[badLine]))
+      self.readCodes = numpy.where(isMatch, readReferenceCodes, upperCaseTable[self.readCharacters])
+      self.variantCounts = numpy.bincount(self.readLines[~isMatch & (readReferenceCodes > 0)], minlength = self.lineCount)[:self.lineCount]
+
+   def plusStrandReads(self):
+      #1 for each read on the plus strand (uppercase or .), 0 for the minus strand
+      import numpy
+      readPlusStrandTable = numpy.zeros(256, dtype = numpy.int64)
+      readPlusStrandTable[list(b"ATGCN.")] = 1
+      return readPlusStrandTable[self.readCharacters]
+
+   def tokens(self):
+      #a (counts, plusStrand, minusStrand, variantCount) tuple for each line with alleles in order of first appearance, same as walking the string one character at a time.  A base with an indel after it is counted as the indel allele (base, +/-, length, sequence) instead of as the base.
+      import numpy
+      if not self.lineCount:
+         return []
+      #indels get attached to the read base that comes right before them and are interned as codes above the byte values
+      characterCodes = numpy.zeros(len(self.buffer), dtype = numpy.int64)
+      characterCodes[self.readPositions] = self.readCodes
+      indelAlleles = []
+      indelCodes = {}
+      for marker, sequenceStart, sequenceEnd, indelLength in zip(self.indelMarkers.tolist(), self.indelSequenceStarts.tolist(), self.indelSequenceEnds.tolist(), self.indelLengths.tolist()):
+         if marker == 0 or not self.isRead[marker - 1]:
+            continue
+         variant = (chr(characterCodes[marker - 1]), chr(self.buffer[marker]), indelLength, self.rawBuffer[sequenceStart : sequenceEnd].decode().upper())
+         if not variant in indelCodes:
+            indelCodes[variant] = 256 + len(indelAlleles)
+            indelAlleles.append(variant)
+         characterCodes[marker - 1] = indelCodes[variant]
+      readCodes = characterCodes[self.readPositions]
+      codeSpace = 256 + len(indelAlleles)
+      alleleKeys = self.readLines.astype(numpy.int64) * codeSpace + readCodes
+      uniqueKeys, firstSeen, keyIndex = numpy.unique(alleleKeys, return_index = True, return_inverse = True)
+      alleleCounts = numpy.bincount(keyIndex, minlength = len(uniqueKeys))
+      plusCounts = numpy.bincount(keyIndex, weights = self.plusStrandReads(), minlength = len(uniqueKeys)).astype(numpy.int64)
+      minusCounts = alleleCounts - plusCounts
+      uniqueLines = uniqueKeys // codeSpace
+      order = numpy.lexsort((firstSeen, uniqueLines))
+      tokens = [({}, {}, {}, count) for count in self.variantCounts.tolist()]
+      for line, code, count, plus, minus in zip(uniqueLines[order].tolist(), (uniqueKeys % codeSpace)[order].tolist(), alleleCounts[order].tolist(), plusCounts[order].tolist(), minusCounts[order].tolist()):
+         if code < 256:
+            variant = chr(code)
+         else:
+            variant = indelAlleles[code - 256]
+         counts, plusStrand, minusStrand, variantCount = tokens[line]
+         counts[variant] = count
+         plusStrand[variant] = plus
+         minusStrand[variant] = minus
+      return tokens
+
+   def baseCounts(self):
+      #arrays of read counts and plus strand read counts with a row per line and a column per base in baseOrder.  Reference matches count as the reference base (N if it is not one of ACGTN) and every read counts as its base whether or not an indel follows it.
+      import numpy
+      baseColumns = numpy.full(256, baseOrder.index("N"), dtype = numpy.int64)  #reference matches at an ambiguity code (R, Y, M...) count as N rather than landing in the A column
+      baseColumns[list(baseOrder.encode())] = numpy.arange(len(baseOrder))
+      cells = self.readLines.astype(numpy.int64) * len(baseOrder) + baseColumns[self.readCodes]
+      cellCount = self.lineCount * len(baseOrder)
+      counts = numpy.bincount(cells, minlength = cellCount)[:cellCount].reshape(self.lineCount, len(baseOrder))
+      plusCounts = numpy.bincount(cells, weights = self.plusStrandReads(), minlength = cellCount)[:cellCount].astype(numpy.int64).reshape(self.lineCount, len(baseOrder))
+      return (counts, plusCounts)
+
+def tokenizeReadBases(readBasesList, referenceBases):
+   #Tokenizes the read base columns for a whole batch of pileup lines at once (see ReadBaseScan.tokens)
+   return ReadBaseScan(readBasesList, referenceBases).tokens()
+
+def countBases(readBasesList, referenceBases):
+   #A, C, G, T and N counts for a whole batch of pileup lines at once (see ReadBaseScan.baseCounts)
+   return ReadBaseScan(readBasesList, referenceBases).baseCounts()
+
+def variantString(variant):
+   #a base stays as it is, an indel becomes something like +2AC
+   if type(variant) == tuple:
+      return "%s%d%s" %(variant[1], variant[2], variant[3])
+   else:
+      return variant
+
+def strandString(plus, minus):
+   #which strands an allele was read on, as "+", "-" or "+-"
+   if plus and minus:
+      return "+-"
+   elif plus:
+      return "+"
+   elif minus:
+      return "-"
+   return ""
+
+class PileupBatch(object):
+   #A batch of pileup lines (a list of lines, or a block of newline separated lines, as str or bytes) split into columns.  Lines with fewer than four columns and comment lines are dropped.  Lines with no read column get an empty one.
+
+   def __init__(self, lines):
+      import numpy
+      if type(lines) in (bytes, bytearray):
+         lines = bytes(lines).decode().split("\n")
+      elif type(lines) == str:
+         lines = lines.split("\n")
+      self.rawLines = []
+      self.contigs = []
+      positions = []
+      depths = []
+      self.referenceBases = []
+      self.readBases = []
+      for line in lines:
+         if type(line) == bytes:
+            line = line.decode()
+         line = line.strip()
+         if not line or line.startswith("#"):
+            continue
+         lineList = line.split("\t")
+         if len(lineList) < 4:
+            continue
+         self.rawLines.append(line)
+         self.contigs.append(lineList[0])
+         positions.append(int(lineList[1]))
+         self.referenceBases.append(lineList[2].upper())
+         depths.append(int(lineList[3]))
+         if len(lineList) > 4:
+            self.readBases.append(lineList[4])
+         else:
+            self.readBases.append("")
+      self.positions = numpy.array(positions, dtype = numpy.int64)
+      self.depths = numpy.array(depths, dtype = numpy.int64)
+      self.scan = None
+
+   def __len__(self):
+      return len(self.rawLines)
+
+   def readBaseScan(self):
+      if not self.scan:
+         self.scan = ReadBaseScan(self.readBases, self.referenceBases)
+      return self.scan
+
+   def tokens(self):
+      return self.readBaseScan().tokens()
+
+   def baseCounts(self):
+      return self.readBaseScan().baseCounts()
+
+   def coverage(self):
+      #depth with the gaps from deletions further up taken back out
+      return self.depths - self.readBaseScan().gapCounts
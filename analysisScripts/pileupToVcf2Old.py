@@ -63,63 +63,11 @@ class MPileupLine(object):
          else:
             self.createNullOutputs()
       
-   def parsePileupString(self):
-      import sys
-      counts = {}
-      strands = {}
-      position = 0
-      varType = None
-      self.variantCount = 0
-      while position < len(self.readBases):
-         character = self.readBases[position]
-         if character == "*":
-            position += 1
-            continue
-         if character in "$^":
-            position += 1
-            if character == "^":
-               position += 1
-            continue
-         elif character in "atgcnATGCN.,":
-            if self.referenceBase and not self.referenceBase in "Nn":
-               if character in ".,":
-                  if character == ".":
-                     character = self.referenceBase.upper()
-                  elif character == ",":
-                     character = self.referenceBase.lower()
-               else:
-                  self.variantCount += 1
-            variant = character.upper()
-            position += 1
-            if position < len(self.readBases):
-               checkNext = self.readBases[position]
-               if checkNext in "+-":
-                  varType = checkNext
-                  position += 1
-                  numberEnd = position + 1
-                  while numberEnd < len(self.readBases) and self.readBases[numberEnd].isdigit():
-                     numberEnd += 1
-                  indelSize = int(self.readBases[position : numberEnd])
-                  position = numberEnd
-                  indelSequence = self.readBases[position : position + indelSize]
-                  position = position + indelSize
-                  variant = (character.upper(), varType, indelSize, indelSequence.upper())
-            if variant in counts:
-               counts[variant] += 1
-            else:
-               counts[variant] = 1
-               strands[variant] = ""  #initialize this now so we don't have to do it later.  Assumption is that any variant in counts should also be going into strands at the same time
-            if character.isupper():
-               strand = "+"
-            elif character.islower():
-               strand = "-"
-            else:
-               raise RuntimeError("Picked up an unhandled valid character %s analyzing line %s" %(character, self.line))
-            strands[variant] += strand
-         else:
-            print("Skipping invalid character %s on line %s" %(character, self.line), file = sys.stdout)
-      self.counts = counts
-      self.strands = strands
+   def parsePileupString(self, readTokens = None):
+      if not readTokens:  #lines parsed on their own are tokenized as a batch of one
+         import pileupParser
+         readTokens = pileupParser.tokenizeReadBases([self.readBases], [self.referenceBase])[0]
+      self.counts, self.plusStrand, self.minusStrand, self.variantCount = readTokens
       self.makeQualifiedVariantLines()
       
    def varToString(self, variant):
@@ -144,7 +92,7 @@ class MPileupLine(object):
             continue
          if not self.counts[key] >= self.minReadRequirement:
             continue
-         if self.requireDoubleStranded and not set(self.strands[key]) == set('+', '-'):
+         if self.requireDoubleStranded and not (self.plusStrand[key] and self.minusStrand[key]):
             continue
          indelFlag = self.isIndel(key, "INDEL;", "") + "NA=NA"
          thisVariantLineList = [self.counts[key], self.readsCovering, round(readPercentage, 4), self.contig, self.position, ".", self.referenceBase, self.varToString(key), "0", ".", indelFlag, "NA", "NA"]
@@ -170,6 +118,14 @@ class MPileupLine(object):
    def __str__(self):
       return self.variantString
       
+def parsePileupBatch(pileupLines):
+   #parses a batch of MPileupLine objects (created without autoparse) with a single tokenizer pass over the lines that have variants to count
+   import pileupParser
+   needTokens = [line for line in pileupLines if line.isValidLine and line.isCovered and line.hasVariant]
+   tokens = pileupParser.tokenizeReadBases([line.readBases for line in needTokens], [line.referenceBase for line in needTokens])
+   for line, readTokens in zip(needTokens, tokens):
+      line.parsePileupString(readTokens)
+   return needTokens
 
 
 if __name__=="__main__":
@@ -188,6 +144,7 @@ if __name__=="__main__":
       outputFile = open(outputFileName, 'w')
    inputLine = inputFile.readline().strip()
    progress = 0
+   batch = []  #lines are collected into batches so the read bases can be tokenized together
    while inputLine:
       if args.verbose:
          if progress % 10000 == 0:
@@ -196,10 +153,16 @@ if __name__=="__main__":
       if inputLine.startswith("#"):
          inputLine = inputFile.readline().strip()
          continue
-      line = MPileupLine(inputLine, args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded)
+      batch.append(MPileupLine(inputLine, args.minReadRequirement, args.minPercentageRequirement, args.requireDoubleStranded, autoparse = False))
+      if len(batch) >= 5000:
+         for line in parsePileupBatch(batch):
+            if line.hasQualifiedVariants:
+               print(line, file = outputFile)
+         batch = []
+      inputLine = inputFile.readline().strip()
+   for line in parsePileupBatch(batch):
       if line.hasQualifiedVariants:
          print(line, file = outputFile)
-      inputLine = inputFile.readline().strip()
    if not usingStdout:
       outputFile.close()
    inputFile.close()
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+
+#Streaming merge-join over coordinate sorted tables.  Each input is an iterable of (contig, position, item) records sorted by contig (in a known order) and
+#then position.  Records at the same locus are grouped, and the groups from every input are lined up by locus one at a time, so memory stays at one locus
+#per input no matter how big the files are.  Contigs are compared by their integer rank in a genomeCoordinates.ContigOrder instead of searching a contig
+#list for every line.
+
+def locusGroups(records, contigRanks, name = "input"):
+   #groups consecutive records at the same locus, yielding (contigRank, position, contig, items).  contigRanks is a genomeCoordinates.ContigOrder.  Records on contigs missing from it are skipped, and anything out of order raises a RuntimeError since the merge would quietly miss matches otherwise.
+   ranks = contigRanks.ranks
+   lastKey = None
+   contig = None
+   items = []
+   for recordContig, position, item in records:
+      rank = ranks.get(recordContig)
+      if rank is None:
+         continue
+      key = (rank, position)
+      if key != lastKey:
+         if lastKey is not None:
+            if key < lastKey:
+               raise RuntimeError("%s is not sorted: %s:%s came after %s:%s" %(name, recordContig, position, contig, lastKey[1]))
+            yield (lastKey[0], lastKey[1], contig, items)
+         lastKey = key
+         contig = recordContig
+         items = []
+      items.append(item)
+   if lastKey is not None:
+      yield (lastKey[0], lastKey[1], contig, items)
+
+def mergeJoin(streams, contigRanks, outer = False, names = None):
+   #Joins sorted record streams by locus, yielding (contig, position, groups) where groups has the list of items from each stream at that locus (empty where
+   #a stream has nothing there).  By default this is a left join on the first stream, so only its loci come out and the others are read only as far as
+   #needed.  With outer set, every locus in any stream comes out.  contigRanks can be a genomeCoordinates.ContigOrder or a sequence of contigs in sort order.
+   import genomeCoordinates
+   if not isinstance(contigRanks, genomeCoordinates.ContigOrder):
+      contigRanks = genomeCoordinates.ContigOrder(contigRanks)
+   if not names:
+      names = ["input %s" %(index + 1) for index in range(len(streams))]
+   iterators = [locusGroups(stream, contigRanks, name) for stream, name in zip(streams, names)]
+   heads = [next(iterator, None) for iterator in iterators]
+   streamIndices = range(len(iterators))
+   while True:
+      if outer:
+         liveKeys = [head[:2] for head in heads if head is not None]
+         if not liveKeys:
+            return
+         key = min(liveKeys)
+      else:
+         if heads[0] is None:
+            return
+         key = heads[0][:2]
+      contig = None
+      groups = []
+      for index in streamIndices:
+         head = heads[index]
+         while head is not None and head[:2] < key:  #only happens to streams that are not driving the join
+            head = next(iterators[index], None)
+         if head is not None and head[:2] == key:
+            contig = head[2]
+            groups.append(head[3])
+            head = next(iterators[index], None)
+         else:
+            groups.append([])
+         heads[index] = head
+      yield (contig, key[1], groups)
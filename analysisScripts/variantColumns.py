@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+#Binary columnar version of the extracted variant (.variants) text format.  Layout is a magic line, an 8 byte header length, a JSON header and then one
+#array per column, each starting on a 64 byte boundary so they can be memory mapped straight into numpy.  Contigs and alleles are stored as codes into
+#lists in the header.  The raw pileup lines can go in a sidecar text file, with each row holding the byte offset of its line there.
+
+magic = b"VERATCOLUMNS1\n"
+columnTypes = [("contig", "<i4"),
+               ("position", "<i4"),
+               ("reference", "<i4"),
+               ("variant", "<i4"),
+               ("variantType", "u1"),
+               ("mutantReadCount", "<i4"),
+               ("coverage", "<i4"),
+               ("plusStrand", "<i4"),
+               ("minusStrand", "<i4"),
+               ("rawLineOffset", "<i8")]
+arrayTypeCodes = {"<i4" : "i", "u1" : "B", "<i8" : "q"}
+
+class CheckArgs(object):
+
+   def __init__(self):
+      import argparse
+      import os
+      parser = argparse.ArgumentParser(description = "Exports a columnar extracted variant file to the text format.")
+      parser.add_argument("-f", "--inputFile", help = "Columnar input file")
+      parser.add_argument("-o", "--outputFile", help = "Text output file.")
+      rawArgs = parser.parse_args()
+      if not rawArgs.inputFile:
+         raise RuntimeError("No input file specified.")
+      if not os.path.isfile(rawArgs.inputFile):
+         raise RuntimeError("Input file not found: " + rawArgs.inputFile)
+      if not isColumnarFile(rawArgs.inputFile):
+         raise RuntimeError("%s is not a columnar variant file." %(rawArgs.inputFile))
+      self.inputFile = rawArgs.inputFile
+      if not rawArgs.outputFile:
+         raise RuntimeError("No output file specified.")
+      self.outputFile = rawArgs.outputFile
+      if self.outputFile == self.inputFile:
+         raise RuntimeError("Error: Input and output files cannot be the same.")
+
+def hasMagic(fileName, fileMagic):
+   columnarFile = open(fileName, 'rb')
+   start = columnarFile.read(len(fileMagic))
+   columnarFile.close()
+   return start == fileMagic
+
+def isColumnarFile(fileName):
+   return hasMagic(fileName, magic)
+
+def writeAlignedColumns(fileName, fileMagic, header, columns):
+   #writes the magic line, an 8 byte header length, the JSON header and then each column (given as name, dtype and anything numpy can take as an array) starting on a 64 byte boundary.  Column offsets get added to the header.
+   import json
+   import struct
+   import numpy
+   columns = [(name, dtype, numpy.asarray(values).astype(dtype, copy = False)) for name, dtype, values in columns]
+   headerBytes = b""
+   dataStart = 0
+   for attempt in range(2):  #the header length barely depends on the offsets, so work them out once and pad
+      dataStart = len(fileMagic) + 8 + len(headerBytes) + 64
+      dataStart += -dataStart % 64
+      header["columns"] = []
+      offset = dataStart
+      for name, dtype, values in columns:
+         header["columns"].append([name, dtype, offset, len(values)])
+         offset += values.nbytes + (-values.nbytes % 64)
+      headerBytes = json.dumps(header).encode()
+   padding = dataStart - len(fileMagic) - 8 - len(headerBytes)
+   if padding < 0:
+      raise RuntimeError("Columnar header grew while being written.")
+   outputFile = open(fileName, 'wb')
+   outputFile.write(fileMagic + struct.pack("<Q", len(headerBytes)) + headerBytes + b" " * padding)
+   for (name, dtype, values), (headerName, headerType, offset, length) in zip(columns, header["columns"]):
+      if outputFile.tell() != offset:
+         outputFile.write(b"\0" * (offset - outputFile.tell()))
+      outputFile.write(values.tobytes())
+   outputFile.close()
+
+def readAlignedColumns(fileName, fileMagic):
+   #memory maps a file from writeAlignedColumns and returns its header and a dictionary of the columns as numpy arrays backed by the file
+   import json
+   import struct
+   import numpy
+   data = numpy.memmap(fileName, dtype = numpy.uint8, mode = 'r')
+   if bytes(data[:len(fileMagic)]) != fileMagic:
+      raise RuntimeError("%s is not a %s file." %(fileName, fileMagic.decode().strip()))
+   headerLength = struct.unpack("<Q", bytes(data[len(fileMagic) : len(fileMagic) + 8]))[0]
+   header = json.loads(bytes(data[len(fileMagic) + 8 : len(fileMagic) + 8 + headerLength]).decode())
+   columns = {}
+   for name, dtype, offset, length in header["columns"]:
+      dtype = numpy.dtype(dtype)
+      columns[name] = data[offset : offset + length * dtype.itemsize].view(dtype)
+   return (header, columns)
+
+def rawLineSidecarName(fileName):
+   return fileName + ".raw"
+
+class ColumnarVariantWriter(object):
+   #collects rows (as the lists in MPileupLine.variantLineLists) in compact arrays and writes everything out on close
+
+   def __init__(self, fileName, rawLines = True):
+      import array
+      self.fileName = fileName
+      self.contigCodes = {}
+      self.alleleCodes = {}
+      self.columns = {}
+      for name, dtype in columnTypes:
+         self.columns[name] = array.array(arrayTypeCodes[dtype])
+      self.rawLineFile = None
+      self.rawLineOffset = 0
+      self.lastRawLine = None
+      self.lastRawLineOffset = -1
+      if rawLines:
+         self.rawLineFile = open(rawLineSidecarName(fileName), 'wb')
+
+   def code(self, table, value):
+      if not value in table:
+         table[value] = len(table)
+      return table[value]
+
+   def addRows(self, variantLineLists):
+      columns = self.columns
+      for mutantReadCount, coverage, mutantPercent, contig, position, reference, variant, variantType, strandString, rawLine in variantLineLists:
+         plusReads, minusReads = strandString[1:].split("-")
+         columns["contig"].append(self.code(self.contigCodes, contig))
+         columns["position"].append(int(position))
+         columns["reference"].append(self.code(self.alleleCodes, reference))
+         columns["variant"].append(self.code(self.alleleCodes, variant))
+         columns["variantType"].append(ord(variantType))
+         columns["mutantReadCount"].append(int(mutantReadCount))
+         columns["coverage"].append(int(coverage))
+         columns["plusStrand"].append(int(plusReads))
+         columns["minusStrand"].append(int(minusReads))
+         if self.rawLineFile:
+            if rawLine != self.lastRawLine:  #rows from the same pileup line share one copy
+               self.lastRawLineOffset = self.rawLineOffset
+               self.rawLineOffset += self.rawLineFile.write(rawLine.encode() + b"\n")
+               self.lastRawLine = rawLine
+            columns["rawLineOffset"].append(self.lastRawLineOffset)
+         else:
+            columns["rawLineOffset"].append(-1)
+
+   def addColumnarFile(self, columnarFile):
+      #appends everything from a ColumnarVariantFile (such as a shard from a parallel run), translating its codes into ours
+      import numpy
+      if not columnarFile.rowCount:
+         return
+      contigMap = numpy.array([self.code(self.contigCodes, contig) for contig in columnarFile.contigs], dtype = numpy.int32)
+      alleleMap = numpy.array([self.code(self.alleleCodes, allele) for allele in columnarFile.alleles], dtype = numpy.int32)
+      for name, dtype in columnTypes:
+         values = columnarFile.columns[name]
+         if name == "contig":
+            values = contigMap[values]
+         elif name in ["reference", "variant"]:
+            values = alleleMap[values]
+         elif name == "rawLineOffset":
+            if self.rawLineFile and columnarFile.rawLines is not None:
+               values = numpy.where(values >= 0, values + self.rawLineOffset, -1)
+            else:
+               values = numpy.full(columnarFile.rowCount, -1, dtype = numpy.int64)
+         self.columns[name].frombytes(numpy.ascontiguousarray(values, dtype = dtype).tobytes())
+      if self.rawLineFile and columnarFile.rawLines is not None:
+         self.rawLineFile.write(columnarFile.rawLines[:])
+         self.rawLineOffset += len(columnarFile.rawLines)
+         self.lastRawLine = None
+
+   def close(self):
+      if self.rawLineFile:
+         self.rawLineFile.close()
+      header = {"rowCount" : len(self.columns["contig"]),
+                "contigs" : sorted(self.contigCodes, key = self.contigCodes.get),
+                "alleles" : sorted(self.alleleCodes, key = self.alleleCodes.get),
+                "rawLines" : bool(self.rawLineFile)}
+      writeAlignedColumns(self.fileName, magic, header, [(name, dtype, self.columns[name]) for name, dtype in columnTypes])
+
+class ColumnarVariantFile(object):
+   #memory maps a columnar variant file, columns are numpy arrays backed by the file
+
+   def __init__(self, fileName):
+      import os
+      self.fileName = fileName
+      header, self.columns = readAlignedColumns(fileName, magic)
+      self.rowCount = header["rowCount"]
+      self.contigs = header["contigs"]
+      self.alleles = header["alleles"]
+      self.rawLines = None
+      self.rawLineFile = None
+      if header["rawLines"]:
+         import mmap
+         sidecar = rawLineSidecarName(fileName)
+         if not os.path.isfile(sidecar):
+            raise FileNotFoundError("Unable to find the raw pileup lines for %s at %s" %(fileName, sidecar))
+         if os.path.getsize(sidecar):
+            self.rawLineFile = open(sidecar, 'rb')
+            self.rawLines = mmap.mmap(self.rawLineFile.fileno(), 0, access = mmap.ACCESS_READ)
+         else:
+            self.rawLines = b""
+
+   def contigOrder(self):
+      #contigs in the order they first appear in the rows
+      import numpy
+      if not self.rowCount:
+         return ()
+      codes, firstRows = numpy.unique(self.columns["contig"], return_index = True)
+      return tuple([self.contigs[code] for code in codes[numpy.argsort(firstRows)].tolist()])
+
+   def rawLine(self, offset, row):
+      if offset < 0 or self.rawLines is None:  #no sidecar, give back the same sort of stand in used for uncovered lines
+         return "%s|%s|%s|%s||" %(self.contigs[self.columns["contig"][row]], self.columns["position"][row], self.alleles[self.columns["reference"][row]], self.columns["coverage"][row])
+      return self.rawLines[offset : self.rawLines.find(b"\n", offset)].decode()
+
+   def rows(self, chunkSize = 65536):
+      #yields each row as a list laid out like the text format's columns (numbers as numbers), pulling the columns in chunks to keep this quick
+      contigs = self.contigs
+      alleles = self.alleles
+      lastRawLineOffset = None
+      for chunkStart in range(0, self.rowCount, chunkSize):
+         chunkEnd = min(chunkStart + chunkSize, self.rowCount)
+         chunk = [self.columns[name][chunkStart : chunkEnd].tolist() for name, dtype in columnTypes]
+         for row, (contig, position, reference, variant, variantType, mutantReadCount, coverage, plusReads, minusReads, rawLineOffset) in enumerate(zip(*chunk), chunkStart):
+            if coverage:
+               mutantPercent = round(mutantReadCount / coverage, 4)
+            else:
+               mutantPercent = 0.0
+            if rawLineOffset < 0 or rawLineOffset != lastRawLineOffset:  #rows for the same pileup line point to the same raw line
+               rawLine = self.rawLine(rawLineOffset, row)
+               lastRawLineOffset = rawLineOffset
+            yield [mutantReadCount, coverage, mutantPercent, contigs[contig], position, alleles[reference], alleles[variant], chr(variantType), "+%s-%s" %(plusReads, minusReads), rawLine]
+
+   def textLines(self):
+      for row in self.rows():
+         yield "\t".join([str(item) for item in row])
+
+   def close(self):
+      del self.columns
+      if self.rawLineFile:
+         self.rawLines.close()
+         self.rawLineFile.close()
+      self.rawLines = None
+
+def exportText(inputFileName, outputFile):
+   import extractVariants
+   columnarFile = ColumnarVariantFile(inputFileName)
+   print(extractVariants.titleLine, file = outputFile)
+   for line in columnarFile.textLines():
+      print(line, file = outputFile)
+   rowCount = columnarFile.rowCount
+   columnarFile.close()
+   return rowCount
+
+if __name__ == "__main__":
+   args = CheckArgs()
+   outputFile = open(args.outputFile, 'w')
+   exportText(args.inputFile, outputFile)
+   outputFile.close()
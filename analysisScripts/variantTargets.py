@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+#Target table handed from a tumor extraction to its matched normal: every locus where the tumor had qualified variants and which variants they were.  Stored as one
+#sorted int32 position array per contig (all contigs back to back in a single column) with the variants as codes into an allele list, using the same aligned
+#column layout as variantColumns so it can be memory mapped instead of unpickled.  Older pickled dict of dicts target files can still be loaded.
+
+magic = b"VERATTARGETS1\n"
+
+def variantString(variant):
+   #same as MPileupLine.varToString, qualified variants can be strings or tuples
+   if type(variant) == tuple:
+      return "%s%d%s" %(variant[1], variant[2], variant[3])
+   else:
+      return variant
+
+def sortedContains(sortedValues, values):
+   #boolean array of which values are in sortedValues, using a binary search instead of sorting both sides like numpy.isin would
+   import numpy
+   values = numpy.asarray(values)
+   if not len(sortedValues) or not len(values):
+      return numpy.zeros(len(values), dtype = bool)
+   indices = numpy.minimum(numpy.searchsorted(sortedValues, values), len(sortedValues) - 1)
+   return sortedValues[indices] == values
+
+class TargetTableBuilder(object):
+   #collects targets in compact arrays as the tumor gets extracted.  Small enough to hand back from a worker process.
+
+   def __init__(self):
+      self.contigs = []
+      self.positions = {}
+      self.variantCounts = {}
+      self.variantCodes = {}
+      self.alleleCodes = {}
+
+   def __len__(self):
+      return sum([len(positions) for positions in self.positions.values()])
+
+   def code(self, allele):
+      if not allele in self.alleleCodes:
+         self.alleleCodes[allele] = len(self.alleleCodes)
+      return self.alleleCodes[allele]
+
+   def addContig(self, contig):
+      import array
+      if not contig in self.positions:
+         self.contigs.append(contig)
+         self.positions[contig] = array.array("i")
+         self.variantCounts[contig] = array.array("i")
+         self.variantCodes[contig] = array.array("i")
+
+   def add(self, contig, position, qualifiedVariants):
+      if not qualifiedVariants:  #nothing to target here
+         return
+      self.addContig(contig)
+      self.positions[contig].append(int(position))
+      self.variantCounts[contig].append(len(qualifiedVariants))
+      self.variantCodes[contig].extend([self.code(variantString(variant)) for variant in qualifiedVariants])
+
+   def update(self, other):
+      #adds everything from another builder (such as one from a shard of a parallel run), translating its allele codes into ours
+      alleles = sorted(other.alleleCodes, key = other.alleleCodes.get)
+      codeMap = [self.code(allele) for allele in alleles]
+      for contig in other.contigs:
+         self.addContig(contig)
+         self.positions[contig].extend(other.positions[contig])
+         self.variantCounts[contig].extend(other.variantCounts[contig])
+         self.variantCodes[contig].extend([codeMap[code] for code in other.variantCodes[contig]])
+
+   def columns(self):
+      #returns the header and the columns for a TargetTable, with each contig's positions sorted
+      import numpy
+      contigRanges = []
+      positionList = []
+      variantCountList = []
+      variantCodeList = []
+      start = 0
+      for contig in self.contigs:
+         positions = numpy.asarray(self.positions[contig], dtype = numpy.int32)
+         variantCounts = numpy.asarray(self.variantCounts[contig], dtype = numpy.int32)
+         variantCodes = numpy.asarray(self.variantCodes[contig], dtype = numpy.int32)
+         if len(positions) > 1 and (positions[1:] < positions[:-1]).any():  #pileups come sorted, so this is almost never needed
+            order = numpy.argsort(positions, kind = "mergesort")
+            variantStarts = numpy.concatenate([[0], numpy.cumsum(variantCounts)[:-1]])
+            variantCodes = numpy.concatenate([variantCodes[variantStarts[index] : variantStarts[index] + variantCounts[index]] for index in order.tolist()])
+            positions = positions[order]
+            variantCounts = variantCounts[order]
+         contigRanges.append([contig, start, start + len(positions)])
+         start += len(positions)
+         positionList.append(positions)
+         variantCountList.append(variantCounts)
+         variantCodeList.append(variantCodes)
+      variantCounts = numpy.concatenate(variantCountList + [numpy.zeros(0, dtype = numpy.int32)])
+      variantStarts = numpy.zeros(len(variantCounts) + 1, dtype = numpy.int64)
+      numpy.cumsum(variantCounts, out = variantStarts[1:])
+      header = {"contigs" : contigRanges,
+                "alleles" : sorted(self.alleleCodes, key = self.alleleCodes.get)}
+      columns = {"position" : numpy.concatenate(positionList + [numpy.zeros(0, dtype = numpy.int32)]),
+                 "variantStart" : variantStarts,
+                 "variantCode" : numpy.concatenate(variantCodeList + [numpy.zeros(0, dtype = numpy.int32)])}
+      return (header, columns)
+
+   def table(self):
+      header, columns = self.columns()
+      return TargetTable(header, columns)
+
+   def write(self, fileName):
+      import variantColumns
+      header, columns = self.columns()
+      variantColumns.writeAlignedColumns(fileName, magic, header, [("position", "<i4", columns["position"]), ("variantStart", "<i8", columns["variantStart"]), ("variantCode", "<i4", columns["variantCode"])])
+
+class TargetTable(object):
+   #read only target table.  Positions for a contig are a slice of one sorted array, so membership for a whole batch of loci is a searchsorted per contig.
+
+   def __init__(self, header, columns):
+      self.contigs = [contig for contig, start, end in header["contigs"]]
+      self.contigRanges = {}
+      for contig, start, end in header["contigs"]:
+         self.contigRanges[contig] = (start, end)
+      self.alleles = header["alleles"]
+      self.positions = columns["position"]
+      self.variantStarts = columns["variantStart"]
+      self.variantCodes = columns["variantCode"]
+      self.uniquePositions = None
+
+   def __len__(self):
+      return len(self.positions)
+
+   def __contains__(self, contig):
+      start, end = self.contigRanges.get(contig, (0, 0))
+      return end > start
+
+   def contigPositions(self, contig):
+      start, end = self.contigRanges.get(contig, (0, 0))
+      return self.positions[start : end]
+
+   def allPositions(self):
+      #every target position regardless of contig, sorted and unique, for prefiltering lines before their contig is looked at
+      import numpy
+      if self.uniquePositions is None:
+         positions = numpy.sort(self.positions)  #sort and drop repeats here rather than numpy.unique, which can be far slower and hungrier on some numpy versions
+         if len(positions):
+            positions = positions[numpy.concatenate([[True], positions[1:] != positions[:-1]])]
+         self.uniquePositions = positions
+      return self.uniquePositions
+
+   def containsLoci(self, contigs, positions):
+      #contigs is a list of contig names and positions a matching sequence of integer positions.  Returns a boolean array of which loci are targets.
+      import numpy
+      positions = numpy.asarray(positions, dtype = numpy.int64)
+      found = numpy.zeros(len(positions), dtype = bool)
+      contigIndices = {}
+      for index, contig in enumerate(contigs):
+         if not contig in contigIndices:
+            contigIndices[contig] = []
+         contigIndices[contig].append(index)
+      for contig, indices in contigIndices.items():
+         contigPositions = self.contigPositions(contig)
+         if len(contigPositions):
+            found[indices] = sortedContains(contigPositions, positions[indices])
+      return found
+
+   def qualifiedVariants(self, contig, position):
+      #variants the tumor had at a locus, as strings, or an empty list if it is not a target
+      import numpy
+      start, end = self.contigRanges.get(contig, (0, 0))
+      index = start + int(numpy.searchsorted(self.positions[start : end], position))
+      if index >= end or self.positions[index] != position:
+         return []
+      return [self.alleles[code] for code in self.variantCodes[self.variantStarts[index] : self.variantStarts[index + 1]].tolist()]
+
+   def contigTable(self, contig):
+      #in memory table with just one contig, for handing to a worker process
+      import numpy
+      start, end = self.contigRanges.get(contig, (0, 0))
+      header = {"contigs" : [[contig, 0, end - start]],
+                "alleles" : self.alleles}
+      variantStarts = numpy.array(self.variantStarts[start : end + 1])
+      columns = {"position" : numpy.array(self.positions[start : end]),
+                 "variantStart" : variantStarts - (variantStarts[0] if len(variantStarts) else 0),
+                 "variantCode" : numpy.array(self.variantCodes[self.variantStarts[start] : self.variantStarts[end]])}
+      return TargetTable(header, columns)
+
+def readLegacyTargets(fileName):
+   #older target files are a pickled dictionary of contig to position to qualified variants
+   import pickle
+   targetFile = open(fileName, 'rb')
+   targets = pickle.load(targetFile)
+   targetFile.close()
+   builder = TargetTableBuilder()
+   for contig in targets:
+      for position in targets[contig]:
+         builder.add(contig, position, targets[contig][position])
+   return builder.table()
+
+def loadTargetTable(fileName):
+   import variantColumns
+   if not variantColumns.hasMagic(fileName, magic):
+      return readLegacyTargets(fileName)
+   header, columns = variantColumns.readAlignedColumns(fileName, magic)
+   return TargetTable(header, columns)
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+
+import os
+benchmarkRoot = os.sep.join(os.path.abspath(__file__).split(os.sep)[:-2]) + os.sep
+
+class CheckArgs(object):
+
+    def __init__(self):
+        import argparse
+        import os
+        parser = argparse.ArgumentParser(description = "Writes a seeded synthetic data set (tumor, normal and RNA pileups plus Mutect, VarScan and VCF calls) for benchmarking.")
+        parser.add_argument("-o", "--outputDirectory", help = "Directory to write the data set to", required = True)
+        parser.add_argument("-s", "--seed", help = "Random seed", type = int, default = 1)
+        parser.add_argument("-l", "--lines", help = "Approximate number of pileup lines per sample", type = int, default = 200000)
+        parser.add_argument("-c", "--contigs", help = "Number of contigs to spread the pileup lines over", type = int, default = 4)
+        parser.add_argument("-d", "--depth", help = "Mean read depth", type = int, default = 40)
+        parser.add_argument("-r", "--variantRate", help = "Fraction of loci with a variant", type = float, default = 0.01)
+        parser.add_argument("-i", "--indelRate", help = "Fraction of reads followed by an indel", type = float, default = 0.002)
+        parser.add_argument("-e", "--errorRate", help = "Fraction of reads with a sequencing error at each locus", type = float, default = 0.005)
+        parser.add_argument("-n", "--calls", help = "Number of variant calls in the Mutect, VarScan and VCF files", type = int, default = 50000)
+        parser.add_argument("-m", "--samples", help = "Number of samples in the VCF", type = int, default = 3)
+        rawArgs = parser.parse_args()
+        self.outputDirectory = rawArgs.outputDirectory
+        if os.path.exists(self.outputDirectory) and not os.path.isdir(self.outputDirectory):
+            raise RuntimeError("Output directory %s exists and is not a directory." %(self.outputDirectory))
+        self.seed = rawArgs.seed
+        for value, name in [(rawArgs.lines, "Pileup lines"), (rawArgs.contigs, "Contigs"), (rawArgs.depth, "Depth"), (rawArgs.calls, "Variant calls")]:
+            if value < 1:
+                raise RuntimeError("%s must be a positive integer." %(name))
+        if rawArgs.samples < 2:
+            raise RuntimeError("The VCF needs at least a tumor and a normal sample.")
+        for value, name in [(rawArgs.variantRate, "Variant rate"), (rawArgs.indelRate, "Indel rate"), (rawArgs.errorRate, "Error rate")]:
+            if value < 0 or value > 1:
+                raise RuntimeError("%s must be between 0 and 1." %(name))
+        self.lines = rawArgs.lines
+        self.contigs = rawArgs.contigs
+        self.depth = rawArgs.depth
+        self.variantRate = rawArgs.variantRate
+        self.indelRate = rawArgs.indelRate
+        self.errorRate = rawArgs.errorRate
+        self.calls = rawArgs.calls
+        self.samples = rawArgs.samples
+
+def contigLayout(lines, contigs):
+    #splits the lines over the contigs roughly in proportion to human chromosome sizes, first contig biggest
+    weights = [1.0 / (index + 1) ** 0.5 for index in range(contigs)]
+    layout = []
+    for index, weight in enumerate(weights):
+        layout.append(("chr%s" %(index + 1), max(1, int(lines * weight / sum(weights)))))
+    return layout
+
+class PileupLocus(object):
+
+    __slots__ = ["contig", "position", "reference", "alternate", "germlineFraction", "indel"]
+
+    def __init__(self, contig, position, reference, alternate, germlineFraction, indel):
+        self.contig = contig
+        self.position = position
+        self.reference = reference
+        self.alternate = alternate
+        self.germlineFraction = germlineFraction
+        self.indel = indel
+
+class PileupGenerator(object):
+    #Seeded samtools mpileup style lines.  The locus layout (positions, reference bases and germline variants) depends only on the layout seed, so
+    #tumor, normal and RNA pileups written from the same generator line up.  Each sample gets its own seed for the reads themselves.
+
+    def __init__(self, seed = 1, contigs = (("chr1", 100000),), depth = 40, variantRate = 0.01, indelRate = 0.002, gapRate = 0.01, readEdgeRate = 0.05, noCoverageRate = 0.02, errorRate = 0.005):
+        self.seed = seed
+        self.contigs = contigs
+        self.depth = depth
+        self.variantRate = variantRate
+        self.indelRate = indelRate
+        self.gapRate = gapRate
+        self.readEdgeRate = readEdgeRate
+        self.noCoverageRate = noCoverageRate
+        self.errorRate = errorRate
+
+    def loci(self):
+        import random
+        layout = random.Random("layout%s" %(self.seed))
+        for contig, lineCount in self.contigs:
+            position = layout.randint(1, 10000)
+            for line in range(lineCount):
+                position += layout.choice([1, 1, 1, 1, 1, 1, 2, 3, 10, 200])
+                reference = layout.choice("ACGTACGTACGTACGTACGTN")
+                alternate = None
+                germlineFraction = 0
+                indel = None
+                if reference != "N" and layout.random() < self.variantRate / 2:  #about half the variant rate comes from germline sites shared by every sample
+                    alternate = layout.choice([base for base in "ACGT" if base != reference])
+                    germlineFraction = layout.choice([0.5, 0.5, 1.0])
+                    if layout.random() < 0.1:
+                        indel = self.makeIndel(layout)
+                yield PileupLocus(contig, position, reference, alternate, germlineFraction, indel)
+
+    def makeIndel(self, rng):
+        length = rng.choice([1, 1, 1, 2, 3, 4, 12])
+        return rng.choice("+-") + str(length) + "".join([rng.choice("ACGT") for index in range(length)])
+
+    def write(self, fileName, sampleSeed = 0, somaticRate = 0.0, depth = None, expressed = None):
+        #returns the number of lines and the somatic loci (contig, position, reference, alternate) written.  expressed can be a dictionary of (contig, position) to an alternate allele to put in at those loci, such as somatics from the tumor showing up in RNA.
+        import random
+        rng = random.Random("sample%s,%s" %(self.seed, sampleSeed))
+        if not depth:
+            depth = self.depth
+        qualityPool = "".join([chr(rng.randint(33, 74)) for index in range(65536)])
+        #each read gets at most one of these events, drawn against the per-read rates
+        startThreshold = self.readEdgeRate
+        endThreshold = startThreshold + self.readEdgeRate
+        gapThreshold = endThreshold + self.gapRate
+        indelThreshold = gapThreshold + self.indelRate
+        errorThreshold = indelThreshold + self.errorRate
+        somatics = []
+        lineCount = 0
+        outputFile = open(fileName, 'w')
+        for locus in self.loci():
+            lineCount += 1
+            readCount = int(rng.gauss(depth, depth / 4))
+            if readCount <= 0 or rng.random() < self.noCoverageRate:
+                print("%s\t%s\t%s\t0\t*\t*" %(locus.contig, locus.position, locus.reference), file = outputFile)
+                continue
+            alternate = locus.alternate
+            fraction = locus.germlineFraction
+            indel = locus.indel
+            if expressed and (locus.contig, locus.position) in expressed:
+                alternate = expressed[(locus.contig, locus.position)]
+                fraction = rng.uniform(0.05, 0.6)
+            elif not alternate and locus.reference != "N" and rng.random() < somaticRate:
+                alternate = rng.choice([base for base in "ACGT" if base != locus.reference])
+                fraction = rng.uniform(0.05, 0.5)
+                somatics.append((locus.contig, locus.position, locus.reference, alternate))
+            #start with every read matching the reference on a random strand, then work in the exceptions
+            strands = bin(rng.getrandbits(readCount) | (1 << readCount))[3:]
+            if locus.reference == "N":
+                reads = [rng.choice("ACGTacgt") for index in range(readCount)]
+            else:
+                reads = list(strands.replace("0", ",").replace("1", "."))
+            if alternate:
+                for index in rng.sample(range(readCount), int(round(readCount * fraction))):
+                    if reads[index] == ".":
+                        reads[index] = alternate
+                    else:
+                        reads[index] = alternate.lower()
+            indelReads = set()
+            if indel:
+                indelReads.update(rng.sample(range(readCount), max(1, int(round(readCount * fraction)))))
+                for index in indelReads:
+                    if reads[index] in ".ACGTN":
+                        reads[index] += indel
+                    else:
+                        reads[index] += indel.lower()
+            errorBases = [base for base in "ACGTN" if base != locus.reference]
+            for index in range(readCount):
+                roll = rng.random()
+                if roll >= errorThreshold:
+                    continue
+                if roll < startThreshold:
+                    reads[index] = "^" + chr(rng.randint(33, 126)) + reads[index]
+                elif roll < endThreshold:
+                    reads[index] += "$"
+                elif roll < gapThreshold:
+                    reads[index] = "*"
+                elif roll < indelThreshold and not index in indelReads:  #a read can only be followed by one indel, so one that already has the germline indel takes a sequencing error instead
+                    randomIndel = self.makeIndel(rng)
+                    if reads[index][-1] in ",acgtn":
+                        randomIndel = randomIndel.lower()
+                    reads[index] += randomIndel
+                elif locus.reference != "N":  #sequencing error, always a base other than the reference, on the read's own strand
+                    if reads[index][0] in ".ACGTN":
+                        reads[index] = rng.choice(errorBases)
+                    else:
+                        reads[index] = rng.choice(errorBases).lower()
+            qualityStart = rng.randint(0, len(qualityPool) - readCount)
+            print("%s\t%s\t%s\t%s\t%s\t%s" %(locus.contig, locus.position, locus.reference, readCount, "".join(reads), qualityPool[qualityStart : qualityStart + readCount]), file = outputFile)
+        outputFile.close()
+        return (lineCount, somatics)
+
+mutectColumns = ["contig", "position", "context", "ref_allele", "alt_allele", "tumor_name", "normal_name", "score", "dbsnp_site", "covered", "power", "tumor_power", "normal_power", "total_pairs", "improper_pairs", "map_Q0_reads", "t_lod_fstar", "tumor_f", "contaminant_fraction", "contaminant_lod", "t_ref_count", "t_alt_count", "t_ref_sum", "t_alt_sum", "t_ref_max_mapq", "t_alt_max_mapq", "t_ins_count", "t_del_count", "normal_best_gt", "init_n_lod", "n_ref_count", "n_alt_count", "n_ref_sum", "n_alt_sum", "judgement"]
+varScanColumns = ["chrom", "position", "ref", "var", "normal_reads1", "normal_reads2", "normal_var_freq", "normal_gt", "tumor_reads1", "tumor_reads2", "tumor_var_freq", "tumor_gt", "somatic_status", "variant_p_value", "somatic_p_value", "tumor_reads1_plus", "tumor_reads1_minus", "tumor_reads2_plus", "tumor_reads2_minus", "normal_reads1_plus", "normal_reads1_minus", "normal_reads2_plus", "normal_reads2_minus"]
+
+class CallGenerator(object):
+    #Seeded variant calls with tumor and normal read counts, written as Mutect call_stats, VarScan somatic output or a multi-sample VCF
+
+    def __init__(self, seed = 1, calls = 50000, contigs = (("chr1", 100000),), depth = 40, somaticFraction = 0.3):
+        import random
+        rng = random.Random("calls%s" %(seed))
+        self.calls = []
+        totalLength = sum([lineCount for contig, lineCount in contigs])
+        for contig, lineCount in contigs:
+            position = 0
+            for index in range(max(1, calls * lineCount // totalLength)):
+                position += rng.randint(1, 2000)
+                reference = rng.choice("ACGT")
+                alternate = rng.choice([base for base in "ACGT" if base != reference])
+                if rng.random() < 0.05:
+                    alternate = reference + "".join([rng.choice("ACGT") for length in range(rng.randint(1, 6))])
+                tumorDepth = max(0, int(rng.gauss(depth, depth / 4)))
+                normalDepth = max(0, int(rng.gauss(depth, depth / 4)))
+                if rng.random() < somaticFraction:
+                    tumorAlt = int(tumorDepth * rng.uniform(0.05, 0.5))
+                    normalAlt = int(normalDepth * rng.choice([0, 0, 0, 0.02]))
+                else:
+                    fraction = rng.choice([0.5, 0.5, 1.0])
+                    tumorAlt = int(tumorDepth * fraction)
+                    normalAlt = int(normalDepth * fraction)
+                self.calls.append((contig, position, reference, alternate, tumorDepth - tumorAlt, tumorAlt, normalDepth - normalAlt, normalAlt))
+        self.rng = rng
+
+    def writeMutect(self, fileName):
+        outputFile = open(fileName, 'w')
+        print("## muTector v1.0.47986", file = outputFile)
+        print("\t".join(mutectColumns), file = outputFile)
+        for contig, position, reference, alternate, tumorRef, tumorAlt, normalRef, normalAlt in self.calls:
+            row = dict([(column, "0") for column in mutectColumns])
+            row.update({"contig" : contig, "position" : position, "context" : "A%sA" %(reference[0]), "ref_allele" : reference, "alt_allele" : alternate, "tumor_name" : "TUMOR", "normal_name" : "NORMAL", "dbsnp_site" : "NOVEL", "covered" : "COVERED", "tumor_f" : "%.6f" %(tumorAlt / max(tumorRef + tumorAlt, 1)), "t_ref_count" : tumorRef, "t_alt_count" : tumorAlt, "n_ref_count" : normalRef, "n_alt_count" : normalAlt, "normal_best_gt" : "AA", "judgement" : self.rng.choice(["KEEP", "REJECT", "REJECT"])})
+            print("\t".join([str(row[column]) for column in mutectColumns]), file = outputFile)
+        outputFile.close()
+        return len(self.calls)
+
+    def writeVarScan(self, fileName):
+        #VarScan somatic output without its header line, which is how varScanReader (after the false positive filter) expects it
+        outputFile = open(fileName, 'w')
+        for contig, position, reference, alternate, tumorRef, tumorAlt, normalRef, normalAlt in self.calls:
+            if len(alternate) > 1:
+                alternate = "+" + alternate[1:]
+            tumorFraction = "%.2f%%" %(100 * tumorAlt / max(tumorRef + tumorAlt, 1))
+            normalFraction = "%.2f%%" %(100 * normalAlt / max(normalRef + normalAlt, 1))
+            status = self.rng.choice(["Somatic", "Germline", "LOH"])
+            row = [contig, position, reference, alternate, normalRef, normalAlt, normalFraction, reference, tumorRef, tumorAlt, tumorFraction, alternate, status, "%.4g" %(self.rng.random()), "%.4g" %(self.rng.random()), tumorRef // 2, tumorRef - tumorRef // 2, tumorAlt // 2, tumorAlt - tumorAlt // 2, normalRef // 2, normalRef - normalRef // 2, normalAlt // 2, normalAlt - normalAlt // 2]
+            print("\t".join([str(item) for item in row]), file = outputFile)
+        outputFile.close()
+        return len(self.calls)
+
+    def writeVCF(self, fileName, sampleNames = ("NORMAL", "TUMOR", "RNA")):
+        #the first two samples get the normal and tumor counts, any others get counts scattered around the tumor's
+        outputFile = open(fileName, 'w')
+        print("##fileformat=VCFv4.1", file = outputFile)
+        print('##FORMAT=<ID=GT,Number=1,Type=String,Description="Genotype">', file = outputFile)
+        print('##FORMAT=<ID=AD,Number=.,Type=Integer,Description="Allelic depths for the ref and alt alleles in the order listed">', file = outputFile)
+        print('##FORMAT=<ID=DP,Number=1,Type=Integer,Description="Approximate read depth">', file = outputFile)
+        print('##FORMAT=<ID=GQ,Number=1,Type=Integer,Description="Genotype Quality">', file = outputFile)
+        print('##FORMAT=<ID=PL,Number=G,Type=Integer,Description="Normalized, Phred-scaled likelihoods for genotypes">', file = outputFile)
+        print("\t".join(["#CHROM", "POS", "ID", "REF", "ALT", "QUAL", "FILTER", "INFO", "FORMAT"] + list(sampleNames)), file = outputFile)
+        for contig, position, reference, alternate, tumorRef, tumorAlt, normalRef, normalAlt in self.calls:
+            counts = [(normalRef, normalAlt), (tumorRef, tumorAlt)]
+            for extraSample in sampleNames[2:]:
+                counts.append((max(0, tumorRef + self.rng.randint(-5, 5)), max(0, tumorAlt + self.rng.randint(-5, 5))))
+            sampleFields = []
+            for refCount, altCount in counts:
+                if not refCount + altCount:
+                    sampleFields.append("./.")
+                    continue
+                if not altCount:
+                    genotype = "0/0"
+                elif not refCount:
+                    genotype = "1/1"
+                else:
+                    genotype = "0/1"
+                sampleFields.append("%s:%s,%s:%s:%s:%s,%s,%s" %(genotype, refCount, altCount, refCount + altCount, self.rng.randint(20, 99), self.rng.randint(0, 500), self.rng.randint(0, 60), self.rng.randint(0, 500)))
+            info = "AC=1;AF=0.500;AN=2;DP=%s" %(sum([sum(count) for count in counts]))
+            print("\t".join([contig, str(position), ".", reference, alternate, "%.2f" %(self.rng.uniform(30, 3000)), self.rng.choice(["PASS", "PASS", "PASS", "LowQual"]), info, "GT:AD:DP:GQ:PL"] + sampleFields), file = outputFile)
+        outputFile.close()
+        return len(self.calls)
+
+def writeSomaticPickle(fileName, somatics, depth = 40, seed = 1):
+    #somatic variant table in the form getRNASupportMPileup reads (variantCombine output), for the given (contig, position, reference, alternate) loci
+    import pickle
+    import random
+    import sys
+    variantReaders = benchmarkRoot + "runners" + os.sep + "variantReaders"
+    if not variantReaders in sys.path:
+        sys.path.append(variantReaders)
+    import variantDataHandler
+    rng = random.Random("somatics%s" %(seed))
+    table = {}
+    for contig, position, reference, alternate in somatics:
+        tumorDepth = max(10, int(rng.gauss(depth, depth / 4)))
+        normalDepth = max(10, int(rng.gauss(depth, depth / 4)))
+        variant = variantDataHandler.SomaticVariantData(contig, position, reference, alternate, normalDepth, 0, tumorDepth, max(1, int(tumorDepth * rng.uniform(0.05, 0.5))))
+        table[variant.hashValue] = {"combined" : variant, "hits" : 1}
+    outputFile = open(fileName, 'wb')
+    pickle.dump(table, outputFile)
+    outputFile.close()
+    return len(table)
+
+def writePeptidePickle(fileName, variants = 200, lengths = (8, 9, 10), seed = 1):
+    #fused variant layout holding just the mutant and wild type peptide sections peptideListMaker reads (getPolypeptides output)
+    import pickle
+    import random
+    rng = random.Random("peptides%s" %(seed))
+    aminoAcids = "ACDEFGHIKLMNPQRSTVWY"
+    neoepitopes = {}
+    wildtype = {}
+    for index in range(variants):
+        variantHash = ("chr1", index * 100 + 1, "A", "C")
+        neoepitopes[variantHash] = []
+        wildtype[variantHash] = []
+        for length in lengths:
+            for offset in range(length):
+                peptide = "".join([rng.choice(aminoAcids) for residue in range(length)])
+                wildtype[variantHash].append(peptide)
+                neoepitopes[variantHash].append(peptide[:offset] + rng.choice(aminoAcids.replace(peptide[offset], "")) + peptide[offset + 1:])
+    outputFile = open(fileName, 'wb')
+    pickle.dump({"fused" : {"neoepitopes" : neoepitopes, "wildtype" : wildtype}}, outputFile)
+    outputFile.close()
+    return variants
+
+def writeAthlatesCalls(fileName, molecule = "A", pairs = 4, seed = 1):
+    #an Athlates typing result for one HLA molecule, as hlaReader reads it
+    import random
+    rng = random.Random("hla%s%s" %(molecule, seed))
+    outputFile = open(fileName, 'w')
+    print("------------------------- Inferred Allelic Pairs -------------------------", file = outputFile)
+    print("", file = outputFile)
+    for pair in range(pairs):
+        alleles = ["%s*%02d:%02d:%02d" %(molecule, rng.randint(1, 80), rng.randint(1, 60), rng.randint(1, 9)) for allele in range(2)]
+        print("%s\t%s\t%.4f" %(alleles[0], alleles[1], rng.random()), file = outputFile)
+    outputFile.close()
+    return pairs
+
+class DataSet(object):
+    #file names for a generated data set, along with the line counts the runner uses for throughput
+
+    def __init__(self, directory):
+        import os
+        self.directory = os.path.abspath(directory) + os.sep
+        self.tumorPileup = self.directory + "tumor.pileup"
+        self.normalPileup = self.directory + "normal.pileup"
+        self.rnaPileup = self.directory + "rna.pileup"
+        self.somaticPickle = self.directory + "somatics.pkl"
+        self.mutect = self.directory + "mutect.call_stats.txt"
+        self.varScan = self.directory + "varscan.snp.Somatic.hc"
+        self.vcf = self.directory + "calls.vcf"
+        self.manifest = self.directory + "manifest.json"
+
+    def generate(self, seed = 1, lines = 200000, contigs = 4, depth = 40, variantRate = 0.01, indelRate = 0.002, calls = 50000, samples = 3, errorRate = 0.005):
+        import json
+        import os
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        layout = contigLayout(lines, contigs)
+        pileups = PileupGenerator(seed, layout, depth, variantRate, indelRate, errorRate = errorRate)
+        lineCount, tumorSomatics = pileups.write(self.tumorPileup, "tumor", variantRate / 2)
+        pileups.write(self.normalPileup, "normal")
+        expressed = dict([((contig, position), alternate) for contig, position, reference, alternate in tumorSomatics[::2]])  #about half of the tumor somatics are expressed
+        pileups.write(self.rnaPileup, "rna", depth = depth * 2, expressed = expressed)
+        writeSomaticPickle(self.somaticPickle, tumorSomatics, depth, seed)
+        callGenerator = CallGenerator(seed, calls, layout, depth)
+        callCount = callGenerator.writeMutect(self.mutect)
+        callGenerator.writeVarScan(self.varScan)
+        sampleNames = ["NORMAL", "TUMOR"] + ["SAMPLE%s" %(index + 3) for index in range(samples - 2)]
+        callGenerator.writeVCF(self.vcf, sampleNames)
+        manifest = {"seed" : seed, "lines" : lines, "contigs" : contigs, "depth" : depth, "variantRate" : variantRate, "indelRate" : indelRate, "errorRate" : errorRate, "calls" : calls, "samples" : samples, "pileupLines" : lineCount, "callLines" : callCount, "somatics" : len(tumorSomatics)}
+        manifestFile = open(self.manifest, 'w')
+        json.dump(manifest, manifestFile, indent = 1, sort_keys = True)
+        manifestFile.close()
+        return manifest
+
+    def load(self):
+        import json
+        manifestFile = open(self.manifest, 'r')
+        manifest = json.load(manifestFile)
+        manifestFile.close()
+        return manifest
+
+if __name__ == "__main__":
+    args = CheckArgs()
+    dataSet = DataSet(args.outputDirectory)
+    manifest = dataSet.generate(args.seed, args.lines, args.contigs, args.depth, args.variantRate, args.indelRate, args.calls, args.samples, args.errorRate)
+    print("Wrote %s pileup lines per sample and %s calls to %s" %(manifest["pileupLines"], manifest["callLines"], dataSet.directory))
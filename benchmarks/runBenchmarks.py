@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+import os
+benchmarkRoot = os.sep.join(os.path.abspath(__file__).split(os.sep)[:-2]) + os.sep
+scriptPaths = {"extractVariants" : benchmarkRoot + "analysisScripts/extractVariants.py",
+               "extractVariantsPaired" : benchmarkRoot + "analysisScripts/extractVariantsPaired.py",
+               "combineVariants" : benchmarkRoot + "analysisScripts/combineExtractedVariants.py",
+               "pileupToVcf" : benchmarkRoot + "analysisScripts/pileupToVcf.py",
+               "getRNASupportMPileup" : benchmarkRoot + "runners/variantReaders/getRNASupportMPileup.py",
+               "mutectReader" : benchmarkRoot + "runners/variantReaders/mutectReader.py",
+               "varScanReader" : benchmarkRoot + "runners/variantReaders/varScanReader.py",
+               "vcfReader" : benchmarkRoot + "runners/variantReaders/vcfReader.py",
+               "hlaReader" : benchmarkRoot + "runners/variantReaders/hlaReader.py",
+               "makeOncotatorOutput" : benchmarkRoot + "runners/variantReaders/makeOncotatorOutput.py",
+               "peptideListMaker" : benchmarkRoot + "runners/variantReaders/peptideListMaker.py",
+               "tandemVariantCombine" : benchmarkRoot + "runners/variantReaders/tandemVariantCombine.py",
+               "variantCombine" : benchmarkRoot + "runners/variantReaders/variantCombine.py"}
+benchmarkNames = ["extractVariantsTumor", "extractVariantsNormal", "combineVariants", "combineVariantsParallel", "extractVariantsTumorColumnar", "extractVariantsNormalColumnar", "combineVariantsColumnar", "extractVariantsPaired", "pileupToVcf", "getRNASupportMPileup", "mutectReader", "varScanReader", "vcfReader"]
+outputChecks = [("extractVariantsPaired", "combineVariants"), ("combineVariantsParallel", "combineVariants"), ("combineVariantsColumnar", "combineVariants")]  #benchmarks whose first output files have to be byte for byte the same when both are run
+startupTools = ["hlaReader", "makeOncotatorOutput", "mutectReader", "varScanReader", "peptideListMaker", "vcfReader", "variantCombine", "getRNASupportMPileup"]  #short pipeline steps where interpreter startup and imports are a big part of the run
+startupLines = 200  #data lines in each of the small inputs the startup runs get
+
+class CheckArgs(object):
+
+    def __init__(self):
+        import argparse
+        import os
+        parser = argparse.ArgumentParser(description = "Times the analysis scripts on a synthetic data set and saves lines per second, MB per second and peak memory as JSON.")
+        parser.add_argument("-d", "--dataDirectory", help = "Data set directory.  Generated here first if it does not have one yet.", required = True)
+        parser.add_argument("-o", "--output", help = "JSON results file", required = True)
+        parser.add_argument("-c", "--compare", help = "Earlier JSON results file to compare against")
+        parser.add_argument("-b", "--benchmarks", help = "Comma separated benchmarks to run (default is all of them: %s)" %(", ".join(benchmarkNames)))
+        parser.add_argument("-r", "--repeats", help = "Run each benchmark this many times and keep the fastest", type = int, default = 1)
+        parser.add_argument("-s", "--seed", help = "Random seed for a new data set", type = int, default = 1)
+        parser.add_argument("-l", "--lines", help = "Approximate pileup lines per sample for a new data set", type = int, default = 200000)
+        parser.add_argument("-n", "--calls", help = "Variant calls for a new data set", type = int, default = 50000)
+        parser.add_argument("-t", "--threshold", help = "Flag anything this fraction slower than the comparison run", type = float, default = 0.1)
+        parser.add_argument("-i", "--importTime", help = "Also run each benchmark once under python -X importtime and report where its import time went", action = 'store_true')
+        rawArgs = parser.parse_args()
+        self.dataDirectory = rawArgs.dataDirectory
+        self.output = rawArgs.output
+        if os.path.isdir(self.output):
+            raise RuntimeError("Output %s is a directory." %(self.output))
+        self.compare = rawArgs.compare
+        if self.compare and not os.path.isfile(self.compare):
+            raise FileNotFoundError("Unable to find comparison results at %s" %(self.compare))
+        if rawArgs.benchmarks:
+            self.benchmarks = [name.strip() for name in rawArgs.benchmarks.split(",") if name.strip()]
+            for name in self.benchmarks:
+                if not name in benchmarkNames:
+                    raise RuntimeError("Unknown benchmark %s.  Choices are: %s" %(name, ", ".join(benchmarkNames)))
+        else:
+            self.benchmarks = benchmarkNames
+        self.repeats = rawArgs.repeats
+        if self.repeats < 1:
+            raise RuntimeError("Repeats must be a positive integer.")
+        self.seed = rawArgs.seed
+        self.lines = rawArgs.lines
+        self.calls = rawArgs.calls
+        self.threshold = rawArgs.threshold
+        self.importTime = rawArgs.importTime
+
+class Benchmark(object):
+    #one script run.  Throughput is measured against the input files, and anything in requires gets run first (untimed if it was not selected) to make this one's inputs.
+
+    def __init__(self, name, command, inputFiles, outputFiles, requires = ()):
+        self.name = name
+        self.command = command
+        self.inputFiles = inputFiles
+        self.outputFiles = outputFiles
+        self.requires = requires
+
+def workDirectory(dataSet):
+    import os
+    return dataSet.directory + "work" + os.sep
+
+def benchmarkList(dataSet):
+    import sys
+    work = workDirectory(dataSet)
+    python = sys.executable
+    return [Benchmark("extractVariantsTumor", [python, scriptPaths["extractVariants"], "-f", dataSet.tumorPileup, "-o", work + "tumor.variants", "-t", work + "tumor.targets"], [dataSet.tumorPileup], [work + "tumor.variants", work + "tumor.targets"]),
+            Benchmark("extractVariantsNormal", [python, scriptPaths["extractVariants"], "-f", dataSet.normalPileup, "-o", work + "normal.variants", "-m", work + "tumor.targets"], [dataSet.normalPileup], [work + "normal.variants"], ["extractVariantsTumor"]),
+            Benchmark("combineVariants", [python, scriptPaths["combineVariants"], "-t", work + "tumor.variants", "-n", work + "normal.variants", "-o", work + "combined.variants"], [work + "tumor.variants", work + "normal.variants"], [work + "combined.variants"], ["extractVariantsTumor", "extractVariantsNormal"]),
+            Benchmark("combineVariantsParallel", [python, scriptPaths["combineVariants"], "-t", work + "tumor.variants", "-n", work + "normal.variants", "-o", work + "combined.parallel.variants", "-w", "4"], [work + "tumor.variants", work + "normal.variants"], [work + "combined.parallel.variants"], ["extractVariantsTumor", "extractVariantsNormal"]),
+            Benchmark("extractVariantsTumorColumnar", [python, scriptPaths["extractVariants"], "-f", dataSet.tumorPileup, "-o", work + "tumor.columnar", "-t", work + "tumor.columnar.targets", "-c"], [dataSet.tumorPileup], [work + "tumor.columnar", work + "tumor.columnar.targets"]),
+            Benchmark("extractVariantsNormalColumnar", [python, scriptPaths["extractVariants"], "-f", dataSet.normalPileup, "-o", work + "normal.columnar", "-m", work + "tumor.columnar.targets", "-c"], [dataSet.normalPileup], [work + "normal.columnar"], ["extractVariantsTumorColumnar"]),
+            Benchmark("combineVariantsColumnar", [python, scriptPaths["combineVariants"], "-t", work + "tumor.columnar", "-n", work + "normal.columnar", "-o", work + "combined.columnar.variants"], [work + "tumor.columnar", work + "normal.columnar"], [work + "combined.columnar.variants"], ["extractVariantsTumorColumnar", "extractVariantsNormalColumnar"]),
+            Benchmark("extractVariantsPaired", [python, scriptPaths["extractVariantsPaired"], "-t", dataSet.tumorPileup, "-n", dataSet.normalPileup, "-o", work + "paired.variants"], [dataSet.tumorPileup, dataSet.normalPileup], [work + "paired.variants"]),
+            Benchmark("pileupToVcf", [python, scriptPaths["pileupToVcf"], "-f", dataSet.tumorPileup, "-o", work + "tumor.vcfLines"], [dataSet.tumorPileup], [work + "tumor.vcfLines"]),
+            Benchmark("getRNASupportMPileup", [python, scriptPaths["getRNASupportMPileup"], "-f", dataSet.rnaPileup, "-s", dataSet.somaticPickle, "-o", work + "rnaSupport.pkl", "-p"], [dataSet.rnaPileup], [work + "rnaSupport.pkl"]),
+            Benchmark("mutectReader", [python, scriptPaths["mutectReader"], "-f", dataSet.mutect, "-o", work + "mutect.pkl"], [dataSet.mutect], [work + "mutect.pkl"]),
+            Benchmark("varScanReader", [python, scriptPaths["varScanReader"], "-f", dataSet.varScan, "-o", work + "varScan.pkl"], [dataSet.varScan], [work + "varScan.pkl"]),
+            Benchmark("vcfReader", [python, scriptPaths["vcfReader"], "-f", dataSet.vcf, "-t", "TUMOR", "-n", "NORMAL", "-o", work + "vcf.pkl"], [dataSet.vcf], [work + "vcf.pkl"])]
+
+def startupDirectory(dataSet):
+    import os
+    return workDirectory(dataSet) + "startup" + os.sep
+
+def startupBenchmarkList(dataSet):
+    #the startup tools on small inputs cut from the data set, in an order where each one's inputs have been made by the time it runs.  tandemVariantCombine only makes the fused input for makeOncotatorOutput and hlaReader.
+    import sys
+    startup = startupDirectory(dataSet)
+    python = sys.executable
+    return [Benchmark("mutectReader", [python, scriptPaths["mutectReader"], "-f", startup + "mutect.call_stats.txt", "-o", startup + "mutect.pkl"], [startup + "mutect.call_stats.txt"], [startup + "mutect.pkl"]),
+            Benchmark("varScanReader", [python, scriptPaths["varScanReader"], "-f", startup + "varscan.snp.Somatic.hc", "-o", startup + "varScan.pkl"], [startup + "varscan.snp.Somatic.hc"], [startup + "varScan.pkl"]),
+            Benchmark("vcfReader", [python, scriptPaths["vcfReader"], "-f", startup + "calls.vcf", "-t", "TUMOR", "-n", "NORMAL", "-o", startup + "vcf.pkl"], [startup + "calls.vcf"], [startup + "vcf.pkl"]),
+            Benchmark("variantCombine", [python, scriptPaths["variantCombine"], "-v", "mutect," + startup + "mutect.pkl", "-v", "varscan," + startup + "varScan.pkl", "-v", "vcf," + startup + "vcf.pkl", "-m", "1", "-o", startup + "combined.pkl"], [startup + "mutect.pkl", startup + "varScan.pkl", startup + "vcf.pkl"], [startup + "combined.pkl"]),
+            Benchmark("getRNASupportMPileup", [python, scriptPaths["getRNASupportMPileup"], "-f", startup + "rna.pileup", "-s", dataSet.somaticPickle, "-o", startup + "rnaSupport.pkl", "-p"], [startup + "rna.pileup"], [startup + "rnaSupport.pkl"]),
+            Benchmark("tandemVariantCombine", [python, scriptPaths["tandemVariantCombine"], "-f", startup + "combined.pkl", "-o", startup + "fused.pkl"], [startup + "combined.pkl"], [startup + "fused.pkl"]),
+            Benchmark("makeOncotatorOutput", [python, scriptPaths["makeOncotatorOutput"], "-f", startup + "fused.pkl", "-o", startup + "oncotator.txt"], [startup + "fused.pkl"], [startup + "oncotator.txt"]),
+            Benchmark("hlaReader", [python, scriptPaths["hlaReader"], "-c", "A:" + startup + "hlaA.athlates.txt", "-v", startup + "fused.pkl", "-o", startup + "hla.pkl"], [startup + "hlaA.athlates.txt", startup + "fused.pkl"], [startup + "hla.pkl"]),
+            Benchmark("peptideListMaker", [python, scriptPaths["peptideListMaker"], "-v", startup + "peptides.pkl", "-o", startup + "peptides"], [startup + "peptides.pkl"], [])]
+
+def copyHead(sourceFileName, outputFileName, dataLines = startupLines):
+    #the header (lines starting with #) and the first dataLines other lines of a text file
+    sourceFile = open(sourceFileName, 'r')
+    outputFile = open(outputFileName, 'w')
+    for line in sourceFile:
+        if not line.startswith("#"):
+            if not dataLines:
+                break
+            dataLines -= 1
+        outputFile.write(line)
+    sourceFile.close()
+    outputFile.close()
+
+def prepareStartupInputs(dataSet):
+    import os
+    import generators
+    startup = startupDirectory(dataSet)
+    if not os.path.isdir(startup):
+        os.makedirs(startup)
+    for sourceFileName in [dataSet.mutect, dataSet.varScan, dataSet.vcf, dataSet.rnaPileup]:
+        copyHead(sourceFileName, startup + os.path.basename(sourceFileName))
+    generators.writePeptidePickle(startup + "peptides.pkl")
+    generators.writeAthlatesCalls(startup + "hlaA.athlates.txt", "A")
+
+def countLines(fileName):
+    lines = 0
+    inputFile = open(fileName, 'rb')
+    block = inputFile.read(1048576)
+    while block:
+        lines += block.count(b"\n")
+        block = inputFile.read(1048576)
+    inputFile.close()
+    return lines
+
+def runCommand(command, logFileName):
+    #runs the command as a child process and returns its exit status, wall time in seconds and peak RSS in MB (from the child's own resource usage, so earlier runs do not leak into it)
+    import subprocess
+    import sys
+    import time
+    logFile = open(logFileName, 'w')
+    startTime = time.time()
+    process = subprocess.Popen(command, stdout = logFile, stderr = subprocess.STDOUT)
+    pid, status, usage = os.wait4(process.pid, 0)
+    seconds = time.time() - startTime
+    process.returncode = os.WEXITSTATUS(status)  #already reaped, keep Popen from trying again
+    logFile.close()
+    if sys.platform == "darwin":  #reported in bytes on macOS and kilobytes on Linux
+        peakRSS = usage.ru_maxrss / 1048576
+    else:
+        peakRSS = usage.ru_maxrss / 1024
+    return (os.WEXITSTATUS(status), seconds, peakRSS)
+
+def parseImportTimes(text, top = 5):
+    #summarizes python -X importtime output: seconds spent on top level imports (which include everything they import) and the slowest of them
+    imports = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():  #the header line
+            continue
+        if fields[2].startswith("  "):  #nested imports are indented and already counted in their parent
+            continue
+        imports.append((fields[2].strip(), int(fields[1]) / 1000000))
+    if not imports:  #pythons before 3.7 have no -X importtime
+        return {"importSeconds" : None, "slowestImports" : []}
+    imports.sort(key = lambda item: item[1], reverse = True)
+    return {"importSeconds" : round(sum([seconds for name, seconds in imports]), 4),
+            "slowestImports" : [[name, round(seconds, 4)] for name, seconds in imports[:top]]}
+
+def measureStartup(benchmark, logDirectory, repeats = 3):
+    #wall time for a tool's whole run on a small input (startup, the imports it really does and a little work), timed without import tracing.  The import time breakdown comes from a separate run under python -X importtime.
+    result = runBenchmark(benchmark, logDirectory, repeats, importTime = True)
+    startup = {"seconds" : result["seconds"], "status" : result["status"]}
+    startup.update(result.get("imports", {"importSeconds" : None, "slowestImports" : []}))
+    return startup
+
+def runBenchmark(benchmark, logDirectory, repeats = 1, importTime = False):
+    import os
+    inputLines = sum([countLines(fileName) for fileName in benchmark.inputFiles])
+    inputBytes = sum([os.path.getsize(fileName) for fileName in benchmark.inputFiles])
+    runs = []
+    for repeat in range(repeats):
+        for fileName in benchmark.outputFiles:  #some scripts refuse to overwrite
+            if os.path.exists(fileName):
+                os.remove(fileName)
+        status, seconds, peakRSS = runCommand(benchmark.command, logDirectory + benchmark.name + ".log")
+        runs.append({"status" : status, "seconds" : round(seconds, 4), "peakRSSMegabytes" : round(peakRSS, 2)})
+        if status:
+            break
+    bestRun = min(runs, key = lambda run: (run["status"] != 0, run["seconds"]))
+    result = {"command" : " ".join(benchmark.command),
+              "inputLines" : inputLines,
+              "inputBytes" : inputBytes,
+              "status" : bestRun["status"],
+              "seconds" : bestRun["seconds"],
+              "peakRSSMegabytes" : max([run["peakRSSMegabytes"] for run in runs]),
+              "runs" : runs}
+    if bestRun["seconds"] > 0:
+        result["linesPerSecond"] = round(inputLines / bestRun["seconds"], 1)
+        result["megabytesPerSecond"] = round(inputBytes / 1048576 / bestRun["seconds"], 3)
+    if importTime and not bestRun["status"]:  #a separate run, so the profiling does not count against the timings
+        for fileName in benchmark.outputFiles:
+            if os.path.exists(fileName):
+                os.remove(fileName)
+        importLog = logDirectory + benchmark.name + ".imports.log"
+        runCommand([benchmark.command[0], "-X", "importtime"] + benchmark.command[1:], importLog)
+        logFile = open(importLog, 'r')
+        result["imports"] = parseImportTimes(logFile.read())
+        logFile.close()
+    return result
+
+def checkOutputs(benchmarks, completed):
+    #for each pair in outputChecks that were both run, whether their outputs came out the same
+    import filecmp
+    import os
+    checks = {}
+    for name, otherName in outputChecks:
+        if not (name in completed and otherName in completed):
+            continue
+        fileName = benchmarks[name].outputFiles[0]
+        otherFileName = benchmarks[otherName].outputFiles[0]
+        checks[name + " = " + otherName] = os.path.isfile(fileName) and os.path.isfile(otherFileName) and filecmp.cmp(fileName, otherFileName, shallow = False)
+    return checks
+
+def gitRevision():
+    import subprocess
+    try:
+        commit = subprocess.check_output(["git", "-C", benchmarkRoot, "rev-parse", "HEAD"], stderr = subprocess.DEVNULL).decode().strip()
+        dirty = bool(subprocess.check_output(["git", "-C", benchmarkRoot, "status", "--porcelain", "--untracked-files=no"], stderr = subprocess.DEVNULL).strip())
+    except (OSError, subprocess.CalledProcessError):
+        return (None, None)
+    return (commit, dirty)
+
+def runBenchmarks(dataDirectory, selected, repeats = 1, generateArgs = None, importTime = False):
+    import datetime
+    import os
+    import platform
+    import sys
+    import generators
+    dataSet = generators.DataSet(dataDirectory)
+    if not os.path.isfile(dataSet.manifest):
+        print("Generating data set in %s" %(dataSet.directory), file = sys.stderr)
+        dataSet.generate(**(generateArgs or {}))
+    work = workDirectory(dataSet)
+    if not os.path.isdir(work):
+        os.mkdir(work)
+    benchmarks = dict([(benchmark.name, benchmark) for benchmark in benchmarkList(dataSet)])
+    commit, dirty = gitRevision()
+    report = {"commit" : commit,
+              "uncommittedChanges" : dirty,
+              "date" : datetime.datetime.now().isoformat(),
+              "python" : sys.version.split()[0],
+              "platform" : platform.platform(),
+              "dataSet" : dataSet.load(),
+              "results" : {},
+              "outputChecks" : {},
+              "startup" : {}}
+    completed = set()
+    selected = [name for name in benchmarkNames if name in selected]  #registry order, so anything that makes inputs for another runs first
+    for name in selected:
+        for requirement in benchmarks[name].requires:  #inputs made by other benchmarks that were not asked for get made without timing them
+            if not requirement in completed and not requirement in selected:
+                print("Preparing inputs with %s" %(requirement), file = sys.stderr)
+                runBenchmark(benchmarks[requirement], work)
+                completed.add(requirement)
+        print("Running %s" %(name), file = sys.stderr)
+        result = runBenchmark(benchmarks[name], work, repeats, importTime)
+        report["results"][name] = result
+        completed.add(name)
+        if result["status"]:
+            print("%s failed with status %s, see %s%s.log" %(name, result["status"], work, name), file = sys.stderr)
+    report["outputChecks"] = checkOutputs(benchmarks, completed)
+    for check, matched in sorted(report["outputChecks"].items()):
+        if not matched:
+            print("Outputs differ: %s" %(check), file = sys.stderr)
+    print("Measuring startup times", file = sys.stderr)
+    prepareStartupInputs(dataSet)
+    startup = startupDirectory(dataSet)
+    for benchmark in startupBenchmarkList(dataSet):
+        if benchmark.name in startupTools:
+            report["startup"][benchmark.name] = measureStartup(benchmark, startup, max(repeats, 3))
+            if report["startup"][benchmark.name]["status"]:
+                print("%s failed with status %s on its startup input, see %s%s.log" %(benchmark.name, report["startup"][benchmark.name]["status"], startup, benchmark.name), file = sys.stderr)
+        else:  #makes an input for a later tool without timing it
+            runBenchmark(benchmark, startup)
+    return report
+
+def compareReports(report, previous, threshold = 0.1):
+    #returns printable lines comparing throughput and memory with an earlier report, marking anything slower by more than threshold
+    lines = ["Compared with %s (%s)" %(previous.get("commit"), previous.get("date"))]
+    lines.append("%-30s %14s %14s %9s %10s %10s" %("benchmark", "lines/s", "previous", "change", "RSS MB", "previous"))
+    for name, result in sorted(report["results"].items()):
+        if not name in previous.get("results", {}) or not "linesPerSecond" in result:
+            continue
+        old = previous["results"][name]
+        if not old.get("linesPerSecond"):
+            continue
+        change = result["linesPerSecond"] / old["linesPerSecond"] - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  SLOWER"
+        lines.append("%-30s %14.1f %14.1f %+8.1f%% %10.1f %10.1f%s" %(name, result["linesPerSecond"], old["linesPerSecond"], change * 100, result["peakRSSMegabytes"], old["peakRSSMegabytes"], flag))
+    lines.append("%-30s %14s %14s %9s" %("startup", "seconds", "previous", "change"))
+    for tool, result in sorted(report.get("startup", {}).items()):
+        old = previous.get("startup", {}).get(tool)
+        if not old or not old.get("seconds"):
+            continue
+        change = result["seconds"] / old["seconds"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  SLOWER"
+        lines.append("%-30s %14.3f %14.3f %+8.1f%%%s" %(tool, result["seconds"], old["seconds"], change * 100, flag))
+    return lines
+
+def main():
+    import json
+    args = CheckArgs()
+    report = runBenchmarks(args.dataDirectory, args.benchmarks, args.repeats, {"seed" : args.seed, "lines" : args.lines, "calls" : args.calls}, args.importTime)
+    outputFile = open(args.output, 'w')
+    json.dump(report, outputFile, indent = 1, sort_keys = True)
+    outputFile.close()
+    print("%-30s %8s %14s %10s %10s" %("benchmark", "seconds", "lines/s", "MB/s", "RSS MB"))
+    for name in args.benchmarks:
+        result = report["results"][name]
+        if result["status"]:
+            print("%-30s failed (status %s)" %(name, result["status"]))
+        else:
+            print("%-30s %8.2f %14.1f %10.2f %10.1f" %(name, result["seconds"], result.get("linesPerSecond", 0), result.get("megabytesPerSecond", 0), result["peakRSSMegabytes"]))
+        if "imports" in result and result["imports"]["importSeconds"] is not None:
+            print("%-30s imports took %.3fs, slowest: %s" %("", result["imports"]["importSeconds"], ", ".join(["%s %.3fs" %(module, seconds) for module, seconds in result["imports"]["slowestImports"]])))
+    print("%-30s %8s %10s  %s" %("startup", "seconds", "imports", "slowest imports"))
+    for tool in startupTools:
+        result = report["startup"][tool]
+        if result["importSeconds"] is None:
+            print("%-30s %8.3f %10s" %(tool, result["seconds"], "n/a"))
+        else:
+            print("%-30s %8.3f %10.3f  %s" %(tool, result["seconds"], result["importSeconds"], ", ".join(["%s %.3fs" %(module, seconds) for module, seconds in result["slowestImports"][:3]])))
+    for check, matched in sorted(report["outputChecks"].items()):
+        if matched:
+            print("%-48s same output" %(check))
+        else:
+            print("%-48s DIFFERENT OUTPUT" %(check))
+    if args.compare:
+        previousFile = open(args.compare, 'r')
+        previous = json.load(previousFile)
+        previousFile.close()
+        for line in compareReports(report, previous, args.threshold):
+            print(line)
+
+if __name__ == "__main__":
+    main()
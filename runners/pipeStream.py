@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+
+streamPlaceholder = "{stream}"
+
+class CheckArgs(object):
+
+    def __init__(self):
+        import argparse
+        parser = argparse.ArgumentParser(description = "Runs a producer command and tees its output through named pipes into one or more consumer commands.  Consumers should use %s where they would take the input file name." %(streamPlaceholder))
+        parser.add_argument("-s", "--source", help = "Command producing the stream on stdout", required = True)
+        parser.add_argument("-c", "--consumer", help = "Command consuming the stream (can be given more than once)", action = "append", required = True)
+        parser.add_argument("-k", "--keepCopy", help = "Also write the stream to this file")
+        parser.add_argument("-b", "--bufferSize", help = "Size of reads from the source in bytes", type = int, default = 1048576)
+        parser.add_argument("-v", "--verbose", help = "Verbose mode", action = 'store_true')
+        rawArgs = parser.parse_args()
+        self.source = rawArgs.source
+        self.consumers = rawArgs.consumer
+        for consumer in self.consumers:
+            if not streamPlaceholder in consumer:
+                raise RuntimeError("Consumer command does not contain the stream placeholder %s: %s" %(streamPlaceholder, consumer))
+        self.keepCopy = rawArgs.keepCopy
+        self.bufferSize = rawArgs.bufferSize
+        if self.bufferSize < 1:
+            raise RuntimeError("Buffer size must be a positive integer.")
+        self.verbose = rawArgs.verbose
+
+class StreamProcessGroup(object):
+
+    def __init__(self, source, consumers, keepCopy = False, bufferSize = 1048576, verbose = False):
+        import tempfile
+        self.source = source
+        self.consumers = consumers
+        self.keepCopy = keepCopy
+        self.bufferSize = bufferSize
+        self.verbose = verbose
+        self.fifoDirectory = tempfile.mkdtemp(prefix = ".pipeStream")
+        self.fifos = []
+        self.consumerProcesses = []
+        self.sourceProcess = None
+        self.failures = []
+        self.stopped = set()
+
+    def report(self, message):
+        import sys
+        if self.verbose:
+            print(message, file = sys.stderr)
+
+    def start(self):
+        import os
+        import subprocess
+        for index, consumer in enumerate(self.consumers):
+            fifo = self.fifoDirectory + os.sep + "stream%s" %(index)
+            os.mkfifo(fifo)
+            self.fifos.append(fifo)
+            command = consumer.replace(streamPlaceholder, fifo)
+            self.report("Starting consumer: %s" %(command))
+            self.consumerProcesses.append(subprocess.Popen(command, shell = True, start_new_session = True))  #own process group so anything the shell starts can be killed with it
+        self.report("Starting source: %s" %(self.source))
+        self.sourceProcess = subprocess.Popen(self.source, shell = True, stdout = subprocess.PIPE, start_new_session = True)
+
+    def recordStatus(self, command, process, status):
+        if status != 0 and not process.pid in self.stopped and not command in [failure[0] for failure in self.failures]:
+            self.failures.append((command, status))
+
+    def checkConsumers(self):
+        for consumer, process in zip(self.consumers, self.consumerProcesses):
+            status = process.poll()
+            if status is not None:
+                self.recordStatus(consumer, process, status)
+        return not self.failures
+
+    def tee(self):
+        #opening a fifo for writing blocks until its consumer opens it for reading, so a consumer that dies before opening its input gets caught by the polling here
+        import fcntl
+        import os
+        import time
+        outputs = []
+        for fifo, process in zip(self.fifos, self.consumerProcesses):
+            descriptor = None
+            while descriptor is None:
+                try:
+                    descriptor = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+                except OSError:  #nobody reading yet
+                    if not self.checkConsumers():
+                        return False
+                    time.sleep(0.1)
+            fcntl.fcntl(descriptor, fcntl.F_SETFL, fcntl.fcntl(descriptor, fcntl.F_GETFL) & ~os.O_NONBLOCK)  #only needed nonblocking to open
+            outputs.append(descriptor)
+        copyFile = None
+        if self.keepCopy:
+            copyFile = open(self.keepCopy, 'wb')
+        bytesStreamed = 0
+        try:
+            chunk = self.sourceProcess.stdout.read(self.bufferSize)
+            while chunk:
+                for descriptor in outputs:
+                    view = memoryview(chunk)
+                    while view:
+                        written = os.write(descriptor, view)
+                        view = view[written:]
+                if copyFile:
+                    copyFile.write(chunk)
+                bytesStreamed += len(chunk)
+                chunk = self.sourceProcess.stdout.read(self.bufferSize)
+        except BrokenPipeError:  #a consumer closed its input early, which we count as a failure below
+            self.checkConsumers()
+            if not self.failures:
+                self.failures.append(("a consumer closed its input before the stream ended", "broken pipe"))
+            return False
+        finally:
+            for descriptor in outputs:
+                try:
+                    os.close(descriptor)
+                except OSError:
+                    pass
+            if copyFile:
+                copyFile.close()
+        self.report("Streamed %s bytes to %s consumers" %(bytesStreamed, len(outputs)))
+        return True
+
+    def killAll(self):
+        #steps killed here are not reported as failures themselves, they were stopped because something else failed
+        import os
+        import signal
+        for process in [self.sourceProcess] + self.consumerProcesses:
+            if process and process.poll() is None:
+                self.stopped.add(process.pid)
+                try:
+                    os.killpg(process.pid, signal.SIGKILL)
+                except OSError:  #already gone
+                    pass
+        for process in [self.sourceProcess] + self.consumerProcesses:
+            if process:
+                process.wait()
+
+    def run(self):
+        import shutil
+        self.start()
+        try:
+            streamed = self.tee()
+            if not streamed:
+                self.killAll()
+            sourceStatus = self.sourceProcess.wait()
+            self.recordStatus(self.source, self.sourceProcess, sourceStatus)
+            if self.failures:
+                self.killAll()
+            for consumer, process in zip(self.consumers, self.consumerProcesses):
+                self.recordStatus(consumer, process, process.wait())
+        except BaseException:
+            self.killAll()
+            raise
+        finally:
+            shutil.rmtree(self.fifoDirectory, ignore_errors = True)
+        return not self.failures
+
+def main():
+    import sys
+    args = CheckArgs()
+    processGroup = StreamProcessGroup(args.source, args.consumers, args.keepCopy, args.bufferSize, args.verbose)
+    if not processGroup.run():
+        for command, status in processGroup.failures:
+            print("Stream step failed with status %s: %s" %(status, command), file = sys.stderr)
+        sys.exit(1)  #any failure fails the whole job so the array wrapper clocks it out as failed
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,8 @@ programPaths = {"bwa" : runnerRoot + "/bin/bwa-0.7.15/bwa",
                 "samtools" : "/u/local/apps/samtools/1.2/gcc-4.4.7/bin/samtools",
                 "extractVariants" : runnerRoot + "/analysisScripts/extractVariants.py",
                 "combineVariants" : runnerRoot + "/analysisScripts/combineExtractedVariants.py",
+                "extractVariantsPaired" : runnerRoot + "/analysisScripts/extractVariantsPaired.py",
+                "pipeStream" : runnerRoot + "/runners/pipeStream.py",
                 "python3" : "/u/local/apps/python/3.4.3/bin/python3",                
                 "bgzip" : runnerRoot + "/bin/tabix/tabix-0.2.6/bgzip",
                 "tabix" : runnerRoot + "/bin/tabix/tabix-0.2.6/tabix",
@@ -225,13 +227,19 @@ class BWAmem(object):
 
 class MPileup(object):
     
-    def __init__(self, sampleName, bamFile, refGenomeFasta, disablePerBaseAlignmentQuality = False, minBaseQuality = False, maxDepth = False, countOrphans = False, gzip = False, bgzip = False, clobber = False, outputDirectory = ""):
+    def __init__(self, sampleName, bamFile, refGenomeFasta, disablePerBaseAlignmentQuality = False, minBaseQuality = False, maxDepth = False, countOrphans = False, gzip = False, bgzip = False, clobber = False, outputDirectory = "", stream = False, tabix = False):
         import runnerSupport
         self.sampleName = sampleName
         self.bgzip = bgzip
         self.gzip = gzip
+        self.stream = stream
+        self.tabix = tabix
+        if tabix and not bgzip:
+            raise RuntimeError("Only a bgzipped pileup can be indexed with tabix.")
         if bgzip and gzip:
             raise RuntimeError("Both bgzip and gzip cannot be set to true.")
+        if stream and (bgzip or gzip):
+            raise RuntimeError("A streamed pileup is passed uncompressed to its consumers.  Do not set gzip or bgzip with stream.")
         if not outputDirectory:
             self.outputDirectory = ""
         else:
@@ -265,6 +273,11 @@ class MPileup(object):
         #Done sanity checking
         self.makeAndCheckOutputFileNames()
         self.mPileupCommand = self.createSamtoolsCommand()
+        if self.tabix:  #index right after the pileup is written so the normal can be read at just the tumor targets
+            tabix = Tabix(self.sampleName, self.mPileupOut, clobber = self.clobber, checkInput = False)
+            self.clobber = tabix.clobber
+            self.tabixOut = tabix.indexOut
+            self.mPileupCommand += " && " + tabix.tabixCommand
         
     def makeAndCheckOutputFileNames(self):
         import runnerSupport
@@ -273,7 +286,8 @@ class MPileup(object):
             self.mPileupOut += ".bgz"
         elif self.gzip:
             self.mPileupOut += ".gz"
-        self.clobber = runnerSupport.checkForOverwriteRisk(self.mPileupOut, self.sampleName, self.clobber)
+        if not self.stream:  #a streamed pileup is only written if it is kept, and gets checked when the stream command is made
+            self.clobber = runnerSupport.checkForOverwriteRisk(self.mPileupOut, self.sampleName, self.clobber)
         
     def createSamtoolsCommand(self):
         import runnerSupport
@@ -282,7 +296,9 @@ class MPileup(object):
                       "-d" : self.maxDepth,
                       "-A" : self.countOrphans,
                       "-f" : self.refGenomeFasta}
-        if self.bgzip:
+        if self.stream:  #output goes to stdout for pipeStream to pass along
+            outputTee = ""
+        elif self.bgzip:
             outputTee = " | " + programPaths["bgzip"] + " -c > " + self.mPileupOut
         elif self.gzip:
             outputTee = " | " + " gzip " + " -c > " + self.mPileupOut
@@ -293,12 +309,45 @@ class MPileup(object):
         samtoolsCommand = argumentFormatter.argumentString
         return samtoolsCommand
     
+    def createStreamCommand(self, consumerCommands, keepPileup = False):
+        #consumers are built as though they were reading mPileupOut (using streamedInput so they do not look for it), here that file name gets swapped for the pipe each one will read from
+        import shlex
+        import runnerSupport
+        if not self.stream:
+            raise RuntimeError("Stream commands can only be made for an MPileup runner created with stream set.")
+        if not consumerCommands:
+            raise RuntimeError("At least one consumer command is needed to stream a pileup.")
+        streamConsumers = []
+        for consumerCommand in consumerCommands:
+            if not self.mPileupOut in consumerCommand:
+                raise RuntimeError("Consumer command does not read from this pileup (%s): %s" %(self.mPileupOut, consumerCommand))
+            streamConsumers.append(shlex.quote(consumerCommand.replace(self.mPileupOut, "{stream}")))
+        flagValues = {"-s" : shlex.quote(self.mPileupCommand),
+                      "FLAGGEDLIST" : ["-c", streamConsumers]}
+        if keepPileup:
+            self.clobber = runnerSupport.checkForOverwriteRisk(self.mPileupOut, self.sampleName, self.clobber)
+            flagValues["-k"] = self.mPileupOut
+        streamArgs = [programPaths["python3"], programPaths["pipeStream"], flagValues]
+        argumentFormatter = runnerSupport.ArgumentFormatter(streamArgs)
+        streamCommand = argumentFormatter.argumentString
+        return streamCommand
+    
+def variantsExtension(outputFormat):
+    if outputFormat == "text":
+        return ".variants"
+    elif outputFormat == "columnar":
+        return ".variantColumns"
+    else:
+        raise RuntimeError("Extracted variant output format must be either 'text' or 'columnar'")
+    
 class ExtractVariantsTumor(object):
     
-    def __init__(self, sampleName, pileupInput, clobber = False, minSupport = 0, requireDoubleStranded = False, outputDirectory = ""):
+    def __init__(self, sampleName, pileupInput, clobber = False, minSupport = 0, requireDoubleStranded = False, outputDirectory = "", workers = 1, streamedInput = False, outputFormat = "text"):
         import runnerSupport
         self.sampleName = sampleName
+        self.outputFormat = outputFormat
         self.requireDoubleStranded = requireDoubleStranded
+        self.workers = workers
         if not outputDirectory:
             self.outputDirectory = ""
         else:
@@ -314,14 +363,17 @@ class ExtractVariantsTumor(object):
         #sanity checking
         if not type(self.pileupInput) == str:
             raise RuntimeError("Input VCF file name must be passed as a string. Passed: %s" %(self.pileupInput))
-        runnerSupport.checkForRequiredFile(self.pileupInput, "VCF input file")
+        if not streamedInput:
+            runnerSupport.checkForRequiredFile(self.pileupInput, "VCF input file")
+        elif workers > 1:
+            raise RuntimeError("A streamed pileup cannot be split between workers.")
         #done sanity checking
         self.makeAndCheckOutputFileNames()
         self.extractCommand = self.createPileupToVCFCommand()    
     
     def makeAndCheckOutputFileNames(self):
         import runnerSupport
-        self.variantsOut = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.pileupInput) + ".variants"
+        self.variantsOut = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.pileupInput) + variantsExtension(self.outputFormat)
         self.targetList = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.pileupInput) + ".targets"
         self.clobber = runnerSupport.checkForOverwriteRisk(self.variantsOut, self.sampleName, self.clobber)
         self.clobber = runnerSupport.checkForOverwriteRisk(self.targetList, self.sampleName, self.clobber)
@@ -332,7 +384,9 @@ class ExtractVariantsTumor(object):
                       "-o" : self.variantsOut,
                       "-n" : self.minSupport,
                       "-t" : self.targetList,
-                      "-d" : self.requireDoubleStranded}
+                      "-d" : self.requireDoubleStranded,
+                      "-w" : self.workers,
+                      "-c" : self.outputFormat == "columnar"}
         pileupCommandArgs = [programPaths["python3"], programPaths["extractVariants"], flagValues]
         argumentFormatter = runnerSupport.ArgumentFormatter(pileupCommandArgs)
         pileupCommand = argumentFormatter.argumentString
@@ -340,10 +394,13 @@ class ExtractVariantsTumor(object):
     
 class ExtractVariantsNormal(object):
     
-    def __init__(self, sampleName, pileupInput, targetList, comparison, minSupport = 0, clobber = False, outputDirectory = ""):
+    def __init__(self, sampleName, pileupInput, targetList, comparison, minSupport = 0, clobber = False, outputDirectory = "", workers = 1, streamedInput = False, targetsOnly = False, outputFormat = "text"):
         import runnerSupport
         self.sampleName = sampleName
+        self.outputFormat = outputFormat
         self.minSupport = minSupport
+        self.workers = workers
+        self.targetsOnly = targetsOnly
         if not outputDirectory:
             self.outputDirectory = ""
         else:
@@ -363,7 +420,10 @@ class ExtractVariantsNormal(object):
         #sanity checking
         if not type(self.pileupInput) == str:
             raise RuntimeError("Input VCF file name must be passed as a string. Passed: %s" %(self.pileupInput))
-        runnerSupport.checkForRequiredFile(self.pileupInput, "VCF input file")
+        if not streamedInput:
+            runnerSupport.checkForRequiredFile(self.pileupInput, "VCF input file")
+        elif workers > 1:
+            raise RuntimeError("A streamed pileup cannot be split between workers.")
         runnerSupport.checkForRequiredFile(self.targetList, "List of targets from tumor to do ")
         #done sanity checking
         self.makeAndCheckOutputFileNames()
@@ -371,7 +431,7 @@ class ExtractVariantsNormal(object):
     
     def makeAndCheckOutputFileNames(self):
         import runnerSupport
-        self.variantsOut = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.pileupInput) + self.comparison + ".variants"
+        self.variantsOut = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.pileupInput) + self.comparison + variantsExtension(self.outputFormat)
         self.clobber = runnerSupport.checkForOverwriteRisk(self.variantsOut, self.sampleName, self.clobber)
     
     def createPileupToVCFCommand(self):
@@ -379,7 +439,10 @@ class ExtractVariantsNormal(object):
         flagValues = {"-f" : self.pileupInput,
                       "-o" : self.variantsOut,
                       "-n" : self.minSupport,
-                      "-m" : self.targetList}
+                      "-m" : self.targetList,
+                      "-w" : self.workers,
+                      "-x" : self.targetsOnly,
+                      "-c" : self.outputFormat == "columnar"}
         pileupCommandArgs = [programPaths["python3"], programPaths["extractVariants"], flagValues]
         argumentFormatter = runnerSupport.ArgumentFormatter(pileupCommandArgs)
         pileupCommand = argumentFormatter.argumentString
@@ -428,38 +491,98 @@ class CombineExtractedVariants(object):
         combineCommand = argumentFormatter.argumentString
         return combineCommand
 
+class ExtractVariantsPaired(object):
+    
+    def __init__(self, sampleName, tumorPileup, normalPileup, comparison, refGenomeFasta = False, minSupport = 0, requireDoubleStranded = False, clobber = False, outputDirectory = "", streamedInput = False):
+        import runnerSupport
+        self.sampleName = sampleName
+        if not outputDirectory:
+            self.outputDirectory = ""
+        else:
+            if not os.path.isdir(outputDirectory):
+                raise RuntimeError("Output directory %s does not exist.  Please make the directory before creating jobs." %(outputDirectory))
+            if not outputDirectory.endswith(os.sep):
+                self.outputDirectory = outputDirectory + os.sep
+            else:
+                self.outputDirectory = outputDirectory
+        if not comparison:
+            self.comparison = ""
+        else:
+            self.comparison = "." + comparison
+        self.tumorPileup = tumorPileup
+        self.normalPileup = normalPileup
+        self.refGenomeFasta = refGenomeFasta
+        self.minSupport = minSupport
+        self.requireDoubleStranded = requireDoubleStranded
+        self.clobber = clobber
+        #sanity checking
+        if not type(self.tumorPileup) == str or not type(self.normalPileup) == str:
+            raise RuntimeError("Tumor and normal pileup file names must be passed as strings. Passed: %s and %s" %(self.tumorPileup, self.normalPileup))
+        if streamedInput:  #only the tumor can be streamed, the normal is read alongside it
+            if not self.refGenomeFasta:
+                raise RuntimeError("A reference genome is needed for the contig order when extracting from a streamed pileup.")
+        else:
+            runnerSupport.checkForRequiredFile(self.tumorPileup, "Tumor mPileup file")
+        runnerSupport.checkForRequiredFile(self.normalPileup, "Normal mPileup file")
+        if self.refGenomeFasta:
+            runnerSupport.checkForRequiredFile(self.refGenomeFasta + ".fai", "reference genome fasta index file", "Please move the index file to this location or create one using samtools faidx.")
+        #done sanity checking
+        self.makeAndCheckOutputFileNames()
+        self.extractCommand = self.createExtractPairedCommand()
+    
+    def makeAndCheckOutputFileNames(self):
+        import runnerSupport
+        self.vcfOut = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.normalPileup) + self.comparison + ".vcf"
+        self.clobber = runnerSupport.checkForOverwriteRisk(self.vcfOut, self.sampleName, self.clobber)
+    
+    def createExtractPairedCommand(self):
+        import runnerSupport
+        flagValues = {"-t" : self.tumorPileup,
+                      "-n" : self.normalPileup,
+                      "-o" : self.vcfOut,
+                      "-s" : self.minSupport,
+                      "-d" : self.requireDoubleStranded}
+        if self.refGenomeFasta:
+            flagValues["-r"] = self.refGenomeFasta
+        extractCommandArgs = [programPaths["python3"], programPaths["extractVariantsPaired"], flagValues]
+        argumentFormatter = runnerSupport.ArgumentFormatter(extractCommandArgs)
+        extractCommand = argumentFormatter.argumentString
+        return extractCommand
+
 class Tabix(object):
     
-    def __init__(self, sampleName, pileupIn, sequenceColumn = 1, beginColumn = 2, endColumn = 2, clobber = False, outputDirectory = ""):
+    def __init__(self, sampleName, pileupIn, sequenceColumn = 1, beginColumn = 2, endColumn = 2, clobber = False, outputDirectory = "", checkInput = True):  #tabix always writes the index next to its input, so outputDirectory is not used
         import runnerSupport
         self.sampleName = sampleName
         self.pileupIn = pileupIn
         self.sequenceColumn = sequenceColumn
         self.beginColumn = beginColumn
         self.endColumn = endColumn
+        self.clobber = clobber
         #SANITY TEST ALL THE THINGS
-        runnerSupport.checkForRequiredFile(self.bamIn, "BAM file for depth check")
         if not type(self.sequenceColumn) == int:
             raise RuntimeError("Sequence column must be an integer.")
         if not type(self.beginColumn) == int:
             raise RuntimeError("Begin column must be an integer.")
         if not type(self.endColumn) == int:
             raise RuntimeError("End column must be an integer.")
-        runnerSupport.checkForRequiredFile(self.pileupIn, "Pileup file to index")
+        if checkInput:  #not set when the pileup is made by an earlier part of the same command
+            runnerSupport.checkForRequiredFile(self.pileupIn, "Pileup file to index")
         #DONE SANITY CHECKING. FOR NOW.
         self.makeAndCheckOutputFileNames()
         self.tabixCommand = self.createTabixCommand()
         
     def makeAndCheckOutputFileNames(self):
         import runnerSupport
-        self.indexOut = self.outputDirectory + runnerSupport.stripDirectoryAndExtension(self.pileupIn) + ".bgz.tbi" 
+        self.indexOut = self.pileupIn + ".tbi"
         self.clobber = runnerSupport.checkForOverwriteRisk(self.indexOut, self.sampleName, self.clobber)
         
     def createTabixCommand(self):
         import runnerSupport
         flagValues = {"-s" : self.sequenceColumn,
                       "-b" : self.beginColumn,
-                      "-e" : self.endColumn}
+                      "-e" : self.endColumn,
+                      "-f" : True}  #forced because the collision check leaves a placeholder where the index goes
         gatkArgs = [programPaths["tabix"], flagValues, self.pileupIn]
         argumentFormatter = runnerSupport.ArgumentFormatter(gatkArgs)
         depthCommand = argumentFormatter.argumentString
@@ -1036,7 +1159,7 @@ class GetRNASupportVCF(object):
     
 class GetRNASupportMPileup(object):
     
-    def __init__(self, sampleName, somaticVariantPickle, rnaMPileup, minDifference = 10, outputFormat = "pickle", clobber = False, outputDirectory = ""):
+    def __init__(self, sampleName, somaticVariantPickle, rnaMPileup, minDifference = 10, outputFormat = "pickle", clobber = False, outputDirectory = "", streamedInput = False):
         import runnerSupport
         self.somaticVariantPickle = somaticVariantPickle
         self.rnaMPileup = rnaMPileup
@@ -1055,7 +1178,8 @@ class GetRNASupportMPileup(object):
                 self.outputDirectory = outputDirectory
         #SANITY TEST ALL THE THINGS
         runnerSupport.checkForRequiredFile(somaticVariantPickle, "Pickle of filtered somatic variants")
-        runnerSupport.checkForRequiredFile(rnaMPileup, "MPileup of observed RNA variants")
+        if not streamedInput:
+            runnerSupport.checkForRequiredFile(rnaMPileup, "MPileup of observed RNA variants")
         runnerSupport.checkTypes(minDifference, (bool, int))
         #DONE SANITY CHECKING. FOR NOW.
         self.makeAndCheckOutputFileNames()
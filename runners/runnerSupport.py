@@ -30,7 +30,7 @@ def directory(fileName):
     return os.sep.join(fileName.split(os.sep)[:-1])
 
 def stripExtension(fileName, zipDoubleExtension = True):
-    zipExtensions = ["gz", "bz", "zip"]
+    zipExtensions = ["gz", "bgz", "bz", "zip"]
     fileName = fileName.split(".")
     if len(fileName) < 3 or not fileName[-1] in zipExtensions or not zipDoubleExtension:
         return ".".join(fileName[:-1])
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 
 __all__ = ["dataViewer",
+           "fisherExact",
            "getPolypeptides",
            "getRNASupportMPileup",
            "hlaReader",
@@ -20,6 +21,7 @@ __all__ = ["dataViewer",
            "vcfReader"]
 
 from . import dataViewer
+from . import fisherExact
 from . import getPolypeptides
 from . import getRNASupportMPileup
 from . import hlaReader
@@ -3,11 +3,10 @@
 def openVariantsPickle(fileName):
     if not fileName:
         raise RuntimeError("File name has to be set")
-    import pickle
-    file = open(fileName, 'rb')
-    data = pickle.load(file)
-    file.close()
-    return data
+    import variantStore
+    if variantStore.isVariantStore(fileName):
+        return variantStore.exportLayout(fileName)
+    return variantStore.loadPickle(fileName)
 
 if __name__ == "__main__":
     fileName = "LB2907_DNA.acceptedSomatics.mPileupRNASupport.pkl"
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+
+#Two-sided Fisher's exact test for 2x2 tables, giving the same odds ratios and p-values as scipy.stats.fisher_exact.  Whole lists of tables are done at
+#once in numpy, and results are kept in a least recently used cache keyed on the four counts since the same low depth and recurrent tables come up over
+#and over.  Each table's probabilities are worked out relative to the most likely one as running products of the ratio between neighbouring tables, which
+#stays accurate at high depths where differences of log factorials lose too many digits.  The rare probabilities too close to the observed one to call that
+#way (ties, mostly) are compared exactly with integers.  Small batches are done the same way in plain python, since a few tests are over before numpy would
+#even finish importing.
+
+class FisherCache(object):
+
+    def __init__(self, maxSize=65536):
+        import collections
+        self.maxSize = maxSize
+        self.results = collections.OrderedDict()
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        self.results.move_to_end(key)
+        if len(self.results) > self.maxSize:
+            self.results.popitem(last=False)
+
+    def clear(self):
+        self.results.clear()
+
+
+cache = FisherCache()
+maxBatchCells = 1048576  # limits the (tables x possible values) grid worked on at once
+gamma = 1 + 1e-14  # same relative tolerance scipy uses to call two probabilities equal
+closeCall = 1e-15  # each ratio multiplied in adds well under this much relative error, so probabilities closer than this times the table width get checked exactly
+negligible = 1e-20  # relative to the most likely table; ties between tables this unlikely cannot move a p-value enough to matter
+pythonCellLimit = 10000  # batches with fewer (table, possible value) pairs than this skip numpy
+
+
+def tableCounts(table):
+    (a, b), (c, d) = table
+    a, b, c, d = int(a), int(b), int(c), int(d)
+    if a < 0 or b < 0 or c < 0 or d < 0:
+        raise RuntimeError("All values in a Fisher's exact test table must be nonnegative.  Got %s" % ([[a, b], [c, d]]))
+    return (a, b, c, d)
+
+
+def exactWeights(rowOne, rowTwo, columnOne, start, end):
+    # each table's probability from start to end relative to the one at start, as exact (numerator, denominator) pairs of integers
+    weights = [(1, 1)]
+    numerator = 1
+    denominator = 1
+    for value in range(start, end):
+        numerator *= (rowOne - value) * (columnOne - value)
+        denominator *= (value + 1) * (rowTwo - columnOne + value + 1)
+        weights.append((numerator, denominator))
+    return weights
+
+
+def settleCloseCalls(counted, nearValues, a, rowOne, rowTwo, columnOne, lowest, mode):
+    # redoes one table's tie decisions for the values whose probabilities are too close to the observed one to trust, comparing them exactly with integers.
+    # Returns whether the observed table ties with the mode (a p-value of 1).
+    inQuestion = [value for value in nearValues if (value > mode if a < mode else value < mode)]  # values across the mode from the observed one
+    start = min([a, mode] + inQuestion)
+    weights = exactWeights(rowOne, rowTwo, columnOne, start, max([a, mode] + inQuestion))
+    observedNumerator, observedDenominator = weights[a - start]
+    modeNumerator, modeDenominator = weights[mode - start]
+    if abs(observedNumerator * modeDenominator - modeNumerator * observedDenominator) * 10 ** 14 <= max(observedNumerator * modeDenominator, modeNumerator * observedDenominator):
+        return True
+    for value in inQuestion:
+        numerator, denominator = weights[value - start]
+        scaled = numerator * observedDenominator * 10 ** 14
+        limit = observedNumerator * denominator * (10 ** 14 + 1)
+        if a < mode:
+            counted[value - lowest] = scaled < limit
+        else:
+            counted[value - lowest] = scaled <= limit
+    return False
+
+
+def fisherExactArrays(a, b, c, d):
+    # odds ratios and p-values (as numpy arrays) for the tables [[a, b], [c, d]] given as four equal length integer arrays
+    import numpy
+    a, b, c, d = [numpy.asarray(counts, dtype=numpy.int64) for counts in (a, b, c, d)]
+    rowOne = a + b
+    rowTwo = c + d
+    columnOne = a + c
+    oddsRatios = numpy.full(len(a), numpy.inf)
+    finiteOdds = (b > 0) & (c > 0)
+    oddsRatios[finiteOdds] = (a * d)[finiteOdds] / (b * c)[finiteOdds]
+    pvalues = numpy.ones(len(a))
+    degenerate = (rowOne == 0) | (rowTwo == 0) | (columnOne == 0) | (b + d == 0)  # a row or column with nothing in it
+    oddsRatios[degenerate] = numpy.nan
+    tables = numpy.flatnonzero(~degenerate)
+    lowest = numpy.maximum(0, columnOne - rowTwo)
+    widths = numpy.minimum(columnOne, rowOne) - lowest + 1
+    tables = tables[numpy.argsort(widths[tables], kind="stable")]  # similar widths together so the padded grids stay small
+    start = 0
+    while start < len(tables):
+        end = start + 1
+        while end < len(tables) and (end - start + 1) * widths[tables[end]] <= maxBatchCells:
+            end += 1
+        batch = tables[start:end]
+        pvalues[batch] = twoSidedPValues(a[batch], rowOne[batch], rowTwo[batch], columnOne[batch], lowest[batch], widths[batch])
+        start = end
+    return (oddsRatios, pvalues)
+
+
+def twoSidedPValues(a, rowOne, rowTwo, columnOne, lowest, widths):
+    # every possible value of the top left cell for each table is laid out in one padded grid
+    import numpy
+    values = lowest[:, None] + numpy.arange(widths.max())[None, :]
+    inSupport = values < (lowest + widths)[:, None]
+    values = numpy.where(inSupport, values, lowest[:, None])
+    mode = numpy.floor((columnOne + 1) * (rowOne + 1) / (rowOne + rowTwo + 2)).astype(numpy.int64)[:, None]
+    aboveMode = (values >= mode) & inSupport
+    belowMode = (values < mode) & inSupport
+    rowOne = rowOne[:, None]
+    columnOne = columnOne[:, None]
+    shortfall = (rowTwo[:, None] - columnOne).astype(float)
+    values = values.astype(float)
+    nextRatios = numpy.where(aboveMode, (rowOne - values) * (columnOne - values), 1.0) / numpy.where(aboveMode, (values + 1) * (shortfall + values + 1), 1.0)  # P(x + 1) / P(x) from the mode up
+    previousRatios = numpy.where(belowMode, (values + 1) * (shortfall + values + 1), 1.0) / numpy.where(belowMode, (rowOne - values) * (columnOne - values), 1.0)  # P(x) / P(x + 1) below the mode
+    upward = numpy.cumprod(nextRatios, axis=1)
+    probabilities = numpy.ones(values.shape)
+    probabilities[:, 1:] = upward[:, :-1]
+    downward = numpy.cumprod(previousRatios[:, ::-1], axis=1)[:, ::-1]
+    probabilities = numpy.where(values < mode, downward, probabilities)  # each probability relative to the one at the mode
+    probabilities[~inSupport] = 0.0
+    rows = numpy.arange(len(a))
+    observedIndex = a - lowest
+    observed = probabilities[rows, observedIndex]
+    threshold = (observed * gamma)[:, None]
+    values = values.astype(numpy.int64)
+    leftOfMode = (a[:, None] < mode)
+    counted = numpy.where(leftOfMode, ((values <= a[:, None]) & inSupport) | ((values > mode) & inSupport & (probabilities < threshold)), ((values >= a[:, None]) & inSupport) | (belowMode & (probabilities <= threshold)))
+    atMode = a == mode[:, 0]
+    tolerance = (1e-12 + closeCall * widths) * observed
+    nearObserved = (numpy.abs(probabilities - observed[:, None]) <= tolerance[:, None]) & inSupport
+    nearObserved[rows, observedIndex] = False
+    tooClose = (nearObserved.any(axis=1) | (numpy.abs(observed - 1.0) <= tolerance)) & ~atMode & (observed > negligible)
+    for row in numpy.flatnonzero(tooClose).tolist():
+        if settleCloseCalls(counted[row], (lowest[row] + numpy.flatnonzero(nearObserved[row])).tolist(), int(a[row]), int(rowOne[row, 0]), int(rowTwo[row]), int(columnOne[row, 0]), int(lowest[row]), int(mode[row, 0])):
+            atMode[row] = True
+    pvalues = numpy.minimum(numpy.where(counted, probabilities, 0.0).sum(axis=1) / probabilities.sum(axis=1), 1.0)
+    pvalues[atMode] = 1.0
+    return pvalues
+
+
+def pythonFisherExact(a, b, c, d):
+    # the same calculation as fisherExactArrays and twoSidedPValues for a single table, without numpy
+    rowOne = a + b
+    rowTwo = c + d
+    columnOne = a + c
+    if not rowOne or not rowTwo or not columnOne or not b + d:
+        return (float("nan"), 1.0)
+    if b and c:
+        oddsRatio = a * d / (b * c)
+    else:
+        oddsRatio = float("inf")
+    lowest = max(0, columnOne - rowTwo)
+    width = min(columnOne, rowOne) - lowest + 1
+    mode = int((columnOne + 1) * (rowOne + 1) / (rowOne + rowTwo + 2))
+    if a == mode:
+        return (oddsRatio, 1.0)
+    probabilities = [0.0] * width
+    probabilities[mode - lowest] = 1.0
+    probability = 1.0
+    for value in range(mode, lowest + width - 1):
+        probability *= (rowOne - value) * (columnOne - value) / ((value + 1) * (rowTwo - columnOne + value + 1))
+        probabilities[value + 1 - lowest] = probability
+    probability = 1.0
+    for value in range(mode - 1, lowest - 1, -1):
+        probability *= (value + 1) * (rowTwo - columnOne + value + 1) / ((rowOne - value) * (columnOne - value))
+        probabilities[value - lowest] = probability
+    observed = probabilities[a - lowest]
+    threshold = observed * gamma
+    if a < mode:
+        counted = [value <= a or (value > mode and probability < threshold) for value, probability in enumerate(probabilities, lowest)]
+    else:
+        counted = [value >= a or (value < mode and probability <= threshold) for value, probability in enumerate(probabilities, lowest)]
+    tolerance = (1e-12 + closeCall * width) * observed
+    nearValues = [value for value, probability in enumerate(probabilities, lowest) if value != a and abs(probability - observed) <= tolerance]
+    if (nearValues or abs(observed - 1.0) <= tolerance) and observed > negligible:
+        if settleCloseCalls(counted, nearValues, a, rowOne, rowTwo, columnOne, lowest, mode):
+            return (oddsRatio, 1.0)
+    return (oddsRatio, min(sum([probability for probability, count in zip(probabilities, counted) if count]) / sum(probabilities), 1.0))
+
+
+def fisherExactMany(tables):
+    # (oddsRatio, pvalue) for each [[a, b], [c, d]] table, working out only the ones not already cached and all of those in one go
+    counts = [tableCounts(table) for table in tables]
+    results = [cache.get(key) for key in counts]
+    missing = {}
+    for key, result in zip(counts, results):
+        if result is None:
+            missing[key] = None
+    if missing:
+        keys = list(missing.keys())
+        if sum([min(a + c, a + b) - max(0, a - d) + 1 for a, b, c, d in keys]) < pythonCellLimit:
+            computed = [pythonFisherExact(*key) for key in keys]
+        else:
+            oddsRatios, pvalues = fisherExactArrays(*zip(*keys))
+            computed = zip(oddsRatios.tolist(), pvalues.tolist())
+        for key, (oddsRatio, pvalue) in zip(keys, computed):
+            missing[key] = (oddsRatio, pvalue)
+            cache.put(key, (oddsRatio, pvalue))
+        results = [result if result is not None else missing[key] for key, result in zip(counts, results)]
+    return results
+
+
+def fisherExact(table):
+    # drop-in for scipy.stats.fisher_exact(table) (two-sided), returning (oddsRatio, pvalue)
+    return fisherExactMany([table])[0]
@@ -138,24 +138,17 @@ def getPeptides(proteinSequencePickle, proteinChangeDict, peptideSizes = [8,9,10
         peptideListDict["mutant"][variant] = currentPeptideList
     return peptideListDict
 
-def getVariantPickle(variantPickleFileName):
-    import pickle
-    variantPickleFile = open(variantPickleFileName, 'rb')
-    variantPickle = pickle.load(variantPickleFile)
-    variantPickleFile.close()
-    return variantPickle
+def getVariantPickle(variantPickleFileName, sections = None):
+    import variantStore
+    return variantStore.loadLayout(variantPickleFileName, sections)
 
 def main():
     args = CheckArgs()
-    import pickle
-    variantPickle = getVariantPickle(args.variantPickle)
+    import variantStore
+    variantPickle = getVariantPickle(args.variantPickle, ["fused/proteinChanges"])
     peptideChanges = variantPickle["fused"]["proteinChanges"]
     peptideListDict = getPeptides(args.proteinSequencePickle, peptideChanges, args.sizeList)
-    variantPickle["fused"]["wildtype"] = peptideListDict["wildtype"]
-    variantPickle["fused"]["neoepitopes"] = peptideListDict["mutant"]
-    outputFile = open(args.outputPickle, 'wb')
-    pickle.dump(variantPickle, outputFile)
-    outputFile.close()
+    variantStore.saveSections(args.variantPickle, args.outputPickle, {"fused/wildtype" : peptideListDict["wildtype"], "fused/neoepitopes" : peptideListDict["mutant"]}, variantPickle)
     quit()
     
 if __name__ == '__main__':
@@ -9,17 +9,19 @@ class CheckArgs():  # class that checks arguments and ultimately returns a valid
         parser = argparse.ArgumentParser()
         parser.add_argument("-f", "--mpileupFile", help="RNA mPileup", required=True)
         parser.add_argument("-s", "--somaticVariants", help="Pickle containing somatic variant analysis from DNA", required=True)
-        parser.add_argument("-o", "--output", help="Output pickle file name")
+        parser.add_argument("-o", "--output", help="Output pickle file name.  Ending it with .db adds the RNA support to a variant store (see variantStore) instead.")
         parser.add_argument("-m", "--minDiff", help="Minimum percent difference in expression vs. DNA mutant/wild-type ratios to consider worth scoring", default=10, type=int)
         parser.add_argument("-v", "--verbose", help="Verbose output mode", action='store_true')
         parser.add_argument("-p", "--noParallelChromosomes", help="Do not run chromosomes in parallel", action='store_true')
         parser.add_argument("--chromosome", help="Specifies the chromosome for analysis.  Should only be used manually for debug.")
+        parser.add_argument("-e", "--executor", help="How to run the per-chromosome jobs: a local process pool or qsub jobs", choices=["local", "qsub"], default="local")
+        parser.add_argument("-w", "--workers", help="Number of worker processes for the local executor (defaults to the number of CPUs)", type=int)
         parser.add_argument("--clockoutFile", help="Clockout file for scatter/gather jobs")
-        parser.add_argument("--mock", help="Do not actually submit jobs to queue", action='store_true')
+        parser.add_argument("--mock", help="Do not actually submit jobs to queue (qsub executor only)", action='store_true')
         parser.add_argument("--noCleanup", help="Do not cleanup temporary directory when completed", action = 'store_true')
         rawArgs = parser.parse_args()
         mpileupFile = rawArgs.mpileupFile
-        if not os.path.isfile(mpileupFile):
+        if not os.path.exists(mpileupFile):  #exists rather than isfile so that a named pipe from a pileup stream can be read
             raise FileNotFoundError("Unable to find file %s" % mpileupFile)
         self.mpileupFile = mpileupFile
         somaticVariants = rawArgs.somaticVariants
@@ -35,16 +37,16 @@ class CheckArgs():  # class that checks arguments and ultimately returns a valid
         self.parallelChromosomes = not rawArgs.noParallelChromosomes
         if rawArgs.chromosome:
             self.parallelChromosomes = False
-        chromosome = rawArgs.chromosome
-        if chromosome and "," in chromosome:
-            self.chromosome, jumpLines = chromosome.split(",")
-            try:
-                self.jumpLines = int(jumpLines)
-            except ValueError:
-                raise ValueError("Value of lines to jump must be an integer.")
-        else:
-            self.chromosome = chromosome
-            self.jumpLines = None
+        if not os.path.isfile(mpileupFile):  #a stream can only be read once, so no scattering by chromosome
+            self.parallelChromosomes = False
+        self.chromosome = rawArgs.chromosome
+        self.executor = rawArgs.executor
+        workers = rawArgs.workers
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 1:
+            raise RuntimeError("Workers must be a positive integer.")
+        self.workers = workers
         self.clockoutFile = rawArgs.clockoutFile
         self.mock = rawArgs.mock
         self.noCleanup = rawArgs.noCleanup
@@ -55,37 +57,84 @@ class ChromosomeIndex(object):
     def __init__(self, chromosome, index):
         self.chromosome = chromosome
         self.index = index
-        self.argument = "%s,%s" % (self.chromosome, self.index)
+        self.argument = self.chromosome  # jobs find their chromosome through the pileup's index rather than skipping lines
 
     def __str__(self):
         return self.argument
 
 
 class ScatterJob(object):
+    # one chromosome's slice of the somatic variants
 
-    def __init__(self, chromosome, workingDirectory, args):
-        import os
+    def __init__(self, chromosome, somaticVariantTable):
         self.chromosome = chromosome
-        self.workingDirectory = workingDirectory
-        self.outputFile = workingDirectory + os.sep + chromosome.chromosome + ".pkl"
-        self.clockoutFile = workingDirectory + os.sep + chromosome.chromosome + ".done"
-        self.args = args
-        self.completed = False
+        self.somaticVariantTable = somaticVariantTable
+
+
+def runChromosomeJob(job):
+    mpileupFile, chromosome, somaticVariantTable, minDiff = job
+    return addRNASupport(mpileupFile, somaticVariantTable, minDiff, chromosome=chromosome)
 
-    def submit(self, args, tempdir):
+
+class LocalExecutor(object):
+    # runs the chromosome jobs in a local process pool, handing each worker only its chromosome's variants and getting the results straight back
+
+    def __init__(self, workers, verbose=False):
+        self.workers = workers
+        self.verbose = verbose
+
+    def run(self, scatterJobs, args):
+        import variantDataHandler
+        jobs = [(args.mpileupFile, job.chromosome.chromosome, job.somaticVariantTable, args.minDiff) for job in scatterJobs]
+        partialTables = []
+        if self.workers == 1 or len(jobs) <= 1:
+            results = map(runChromosomeJob, jobs)
+            pool = None
+        else:
+            import multiprocessing
+            pool = multiprocessing.Pool(min(self.workers, len(jobs)))
+            results = pool.imap_unordered(runChromosomeJob, jobs)
+        for completedJobs, partialData in enumerate(results):
+            partialTables.append(partialData)
+            if self.verbose:
+                print("Awaiting %s of %s jobs       " % (len(jobs) - completedJobs - 1, len(jobs)), end="\r")
+        if pool:
+            pool.close()
+            pool.join()
+        if self.verbose:
+            print("\nDONE!")
+        return variantDataHandler.mergeVariantTables(partialTables)
+
+
+class QsubExecutor(object):
+    # submits each chromosome as its own qsub job on a pickle of just its variants, then waits for them to clock out
+
+    def __init__(self, mock=False, verbose=False, cleanup=True):
+        self.mock = mock
+        self.verbose = verbose
+        self.cleanup = cleanup
+
+    def submit(self, job, args, workingDirectory):
         import os
         import sys
-        tempdir = os.path.abspath(tempdir)
+        import pickle
+        chromosome = job.chromosome.chromosome
+        somaticsFile = workingDirectory + os.sep + chromosome + ".somatic.pkl"
+        job.outputFile = workingDirectory + os.sep + chromosome + ".pkl"
+        job.clockoutFile = workingDirectory + os.sep + chromosome + ".done"
+        outputFile = open(somaticsFile, 'wb')
+        pickle.dump(job.somaticVariantTable, outputFile)
+        outputFile.close()
         pythonInterpreter = sys.executable
         thisScript = os.path.abspath(__file__)
-        mPileupCommand = [pythonInterpreter, thisScript, "--mpileupFile", args.mpileupFile, "--somaticVariants", args.somaticVariants, "--output", self.outputFile, "--minDiff", args.minDiff, "--chromosome", self.chromosome.argument, "--clockoutFile", self.clockoutFile]
+        mPileupCommand = [pythonInterpreter, thisScript, "--mpileupFile", args.mpileupFile, "--somaticVariants", somaticsFile, "--output", job.outputFile, "--minDiff", args.minDiff, "--chromosome", job.chromosome.argument, "--clockoutFile", job.clockoutFile]
         mPileupCommand = [str(item) for item in mPileupCommand]
         mPileupCommand = " ".join(mPileupCommand)
-        qsubCommand = "qsub -cwd -V -N mpsub%s -l h_data=8G,time=24:00:00 -m a -o %s -e %s" % (self.chromosome.chromosome, tempdir, tempdir)
+        qsubCommand = "qsub -cwd -V -N mpsub%s -l h_data=8G,time=24:00:00 -m a -o %s -e %s" % (chromosome, workingDirectory, workingDirectory)
         fullCommand = 'echo "%s" | %s' % (mPileupCommand, qsubCommand)
         submitted = False
         attempts = 0
-        if args.mock:
+        if self.mock:
             print("Mock submit:")
             print(fullCommand)
         else:
@@ -96,13 +145,36 @@ class ScatterJob(object):
             if not submitted:
                 raise RuntimeError("Unable to submit job successfully")
 
-    def checkCompletion(self):
+    def run(self, scatterJobs, args):
         import os
-        if os.path.isfile(self.clockoutFile):
-            self.completed = True
-            return True
-        else:
-            return False
+        import time
+        import pickle
+        import variantDataHandler
+        outputDirectory = os.path.split(os.path.abspath(args.output))[0] + os.sep
+        workingDirectory = os.path.abspath(createTempDir(outputDirectory, args))
+        for job in scatterJobs:
+            self.submit(job, args, workingDirectory)
+        if self.mock:
+            return {}
+        pending = list(scatterJobs)
+        while pending:
+            pending = [job for job in pending if not os.path.isfile(job.clockoutFile)]
+            if self.verbose:
+                print("Awaiting %s of %s jobs       " % (len(pending), len(scatterJobs)), end="\r")
+            if pending:
+                time.sleep(5)
+        if self.verbose:
+            print("\nDONE!")
+        partialTables = []
+        for job in scatterJobs:
+            inputFile = open(job.outputFile, 'rb')
+            partialTables.append(pickle.load(inputFile))
+            inputFile.close()
+        if self.cleanup:
+            import shutil
+            print("All jobs completed, removing working directory at %s" %workingDirectory)
+            shutil.rmtree(workingDirectory)
+        return variantDataHandler.mergeVariantTables(partialTables)
 
 
 def createTempDir(workingFolder, args=False):  # makes a temporary directory for this run.  Completions will clock out here and results will be reported back to it.
@@ -128,103 +200,123 @@ def createTempDir(workingFolder, args=False):  # makes a temporary directory for
     return tempdir
 
 
-def runScatterJobs(args):
-    import os
-    import time
-    chromosomeIndex = createChromosomeIndex(args.mpileupFile)
+def runScatterJobs(args, somaticVariantTable, executor):
+    import variantDataHandler
+    chromosomeIndex = createChromosomeIndex(args.mpileupFile)  # also builds and saves the pileup's bin index if needed, so every job just loads it
+    variantsByChromosome = variantDataHandler.splitByContig(somaticVariantTable)
     scatterJobs = []
-    outputDirectory = os.path.split(os.path.abspath(args.output))[0] + os.sep
-    workingDirectory = createTempDir(outputDirectory, args)
     for chromosome in chromosomeIndex:
-        scatterJobs.append(ScatterJob(chromosome, workingDirectory, args))
-    for job in scatterJobs:
-        job.submit(args, workingDirectory)
-    completed = False
-    while not completed:
-        completed = True
-        for job in scatterJobs:
-            if not job.completed:
-                if not job.checkCompletion():
-                    completed = False
-        if args.verbose:
-            completedJobs = 0
-            for job in scatterJobs:
-                if job.completed:
-                    completedJobs += 1
-            print("Awaiting %s of %s jobs       " % (len(scatterJobs) - completedJobs, len(scatterJobs)), end="\r")
-        time.sleep(5)
-    if args.verbose:
-        print("\nDONE!")
-    return (scatterJobs, workingDirectory)
-
-
-def gatherResults(scatterJobs):
-    import pickle
-    rnaSupportTable = {}
-    for job in scatterJobs:
-        inputFile = open(job.outputFile, 'rb')
-        partialData = pickle.load(inputFile)
-        inputFile.close()
-        rnaSupportTable.update(partialData)
-    return rnaSupportTable
-
-
-def openMPileupFile(filename):
-    if filename.endswith(".gz"):
-        import gzip
-        return gzip.open(filename, 'rt')
-    else:
-        return open(filename, 'r')
+        if chromosome.chromosome in variantsByChromosome:
+            scatterJobs.append(ScatterJob(chromosome, variantsByChromosome[chromosome.chromosome]))
+    return executor.run(scatterJobs, args)
 
 
 def createChromosomeIndex(mpileupFile):
-    import re
-    currentLine = 0
-    chromosomeList = []
-    mpileup = openMPileupFile(mpileupFile)
-    lastContig = None
-    contigRegex = re.compile("^(.+?)\t")
-    print("Creating contig index")
-    for line in mpileup:
-        chrGrab = re.match(contigRegex, line)
-        chromosome = chrGrab.group(1)
-        if not chromosome == lastContig:
-            print("Found contig %s" %chromosome)
-            lastContig = chromosome
-            chromosomeList.append(ChromosomeIndex(chromosome, currentLine))
-        currentLine += 1
-    mpileup.close()
-    for line in chromosomeList:
-        print(line)
-    return chromosomeList
-
-
-def checkMPileupForRNASupport(mpileupFile, somaticVariants, somaticVariantTable, minDiff, verbose=False, chromosomeRestriction=False, jumpLines=False):
+    # byte offsets of each contig from the index saved next to the pileup (see pileupIndex.pileupContigRanges), built with large block reads the first time
+    addAnalysisScriptsPath()
+    import pileupIndex
+    return [ChromosomeIndex(contigRange.contig, contigRange.start) for contigRange in pileupIndex.pileupContigRanges(mpileupFile)]
+
+
+def addAnalysisScriptsPath():  #the shared pileup parser lives with the analysis scripts
+    import os
+    import sys
+    analysisScripts = os.sep.join(os.path.abspath(__file__).split(os.sep)[:-3] + ["analysisScripts"])
+    if not analysisScripts in sys.path:
+        sys.path.append(analysisScripts)
+
+
+def indexSomaticLoci(somaticVariants):
+    # a set of position strings for each contig to check pileup lines against without converting millions of positions, and the variant hashes at each locus
+    positionsOfInterest = {}
+    variantsAtLocus = {}
+    for variant in somaticVariants:
+        contig = variant[0]
+        position = str(variant[1])
+        if not contig in positionsOfInterest:
+            positionsOfInterest[contig] = set()
+        positionsOfInterest[contig].add(position)
+        if not (contig, position) in variantsAtLocus:
+            variantsAtLocus[(contig, position)] = []
+        variantsAtLocus[(contig, position)].append(variant)
+    return (positionsOfInterest, variantsAtLocus)
+
+
+def scoreRNASupport(candidates, variantsAtLocus, tumorCounts, minDiff, supportData):
+    # candidates are (contig, position, ref, depth, reads) for pileup lines at somatic loci, with the read bases for all of them counted together
     import variantDataHandler
-    import scipy.stats
-    import re
+    import fisherExact
+    import pileupParser
+    if not candidates:
+        return
+    fisherTests = []  # (variant hash, RNA supporting reads, RNA depth, expression/DNA ratio) for the loci that need a Fisher's exact test, all done together at the end
+    baseCountTable = pileupParser.countBases([candidate[4] for candidate in candidates], [candidate[2] for candidate in candidates])[0].tolist()  # reads for each base at each locus, with indel sequences, read starts and ends already taken out
+    for (contig, position, ref, depth, reads), baseCounts in zip(candidates, baseCountTable):
+        foundHashesAtSite = variantsAtLocus[(contig, position)]
+        totalDepthRNA = int(depth)
+        for foundHash in foundHashesAtSite:
+            if not (len(foundHash[2]) == 1 and len(foundHash[3]) == 1):  # indel catcher
+                continue
+            altAllele = foundHash[3].upper()
+            if altAllele in pileupParser.baseOrder:
+                supportingDepthRNA = baseCounts[pileupParser.baseOrder.index(altAllele)]
+            else:
+                supportingDepthRNA = 0
+            totalDepthDNA, supportingDepthDNA = tumorCounts[foundHash]
+            if not supportingDepthRNA:  # also covers loci with no RNA reads at all, so check before dividing by the depth
+                supportData[foundHash] = variantDataHandler.RNASupportData(1, supportingDepthRNA, totalDepthRNA, None)
+                continue
+            expressionDNARatio = (supportingDepthRNA / totalDepthRNA) / (supportingDepthDNA / totalDepthDNA)
+            if totalDepthRNA < 10 or supportingDepthRNA < 3:
+                supportData[foundHash] = variantDataHandler.RNASupportData(2, supportingDepthRNA, totalDepthRNA, None)
+                continue
+            if expressionDNARatio > (1 - minDiff / 100) and expressionDNARatio < (1 + minDiff / 100):  # anything not greater or less than minDiff percent off expected will be called as not significantly different
+                supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, None)
+                continue
+            fisherTests.append((foundHash, supportingDepthRNA, totalDepthRNA, expressionDNARatio, [[supportingDepthRNA, totalDepthRNA], [supportingDepthDNA, totalDepthDNA]]))
+    results = fisherExact.fisherExactMany([test[4] for test in fisherTests])
+    for (foundHash, supportingDepthRNA, totalDepthRNA, expressionDNARatio, table), (oddsRatio, pvalue) in zip(fisherTests, results):
+        if pvalue > 0.05:
+            supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, pvalue, oddsRatio)
+        elif expressionDNARatio > 1:
+            supportData[foundHash] = variantDataHandler.RNASupportData(5, supportingDepthRNA, totalDepthRNA, pvalue, oddsRatio)
+        else:
+            supportData[foundHash] = variantDataHandler.RNASupportData(3, supportingDepthRNA, totalDepthRNA, pvalue, oddsRatio)
+
+
+def readSomaticLociLines(mpileupFile, positionsOfInterest, chromosomeRestriction=False):
+    # pileup lines from just the parts of the pileup holding somatic loci (see pileupIndex.readLociLineBlocks), or every line if it cannot be indexed
+    import pileupIndex
+    targetPositions = {}
+    for contig in positionsOfInterest:
+        if not chromosomeRestriction or contig == chromosomeRestriction:
+            targetPositions[contig] = [int(position) for position in positionsOfInterest[contig]]
+    for block in pileupIndex.readLociLineBlocks(mpileupFile, targetPositions):
+        for line in block.decode().split("\n")[:-1]:  # blocks always end in a newline
+            yield line
+
+
+def checkMPileupForRNASupport(mpileupFile, somaticVariants, somaticVariantTable, minDiff, verbose=False, chromosomeRestriction=False, batchSize=5000):
+    import variantDataHandler
+    addAnalysisScriptsPath()
     contig = None #initializing this for display in progress reporter
-    nonBaseRegex = re.compile("[^ATGC]", re.IGNORECASE)  # compiling this regex now so it only needs to be compiled once
-    plusBaseRegex = re.compile("\+\d+[ATGC]+", re.IGNORECASE)
-    contigRegex = re.compile("^(.+?)\t")
-    mpileup = openMPileupFile(mpileupFile)
     supportData = {}
-    lociOfInterest = [(item[0], str(item[1])) for item in somaticVariants]  # using a string of the position to improve performance, will convert hundreds of times now instead of converting millions of times during mpileup reading
+    positionsOfInterest, variantsAtLocus = indexSomaticLoci(somaticVariants)
+    tumorCounts = variantDataHandler.combinedTumorCounts(somaticVariantTable)
+    candidates = []
     progress = 0
     startedRegionOfInterest = False
     #print("ChrRest: %s" % chromosomeRestriction)
-    if jumpLines:
-        for i in range(jumpLines):
-            progress += 1
-            throwaway = mpileup.readline()
-    for line in mpileup:
+    for line in readSomaticLociLines(mpileupFile, positionsOfInterest, chromosomeRestriction):
         if verbose:
             if progress % 10000 == 0:
                 print("Processed %s lines. Currently on %s" %(progress, contig), end="\r")
             progress += 1
+        # just the contig and position get pulled out until the line turns out to be at a somatic locus
+        contigEnd = line.find("\t")
+        positionEnd = line.find("\t", contigEnd + 1)
+        contig = line[:contigEnd]
         if chromosomeRestriction:
-            chrGrab = re.match(contigRegex, line)
-            contig = chrGrab.group(1)
             inRegionOfInterest = contig == chromosomeRestriction
             #print("In region: %s" %inRegionOfInterest)
             if not inRegionOfInterest:
@@ -235,6 +327,9 @@ def checkMPileupForRNASupport(mpileupFile, somaticVariants, somaticVariantTable,
                     break
             else:
                 startedRegionOfInterest = True
+        contigPositions = positionsOfInterest.get(contig)
+        if not contigPositions or not line[contigEnd + 1 : positionEnd] in contigPositions:
+            continue  # not a locus with a somatic change (comment lines and blank lines end up here too)
         line = line.strip()
         if not line:
             continue
@@ -245,49 +340,26 @@ def checkMPileupForRNASupport(mpileupFile, somaticVariants, somaticVariantTable,
                 contig, position, ref, depth, reads, quality = line.split()
             except ValueError:  # when lines with no reads are included, we get 4 columns (reads and qualities are missing)
                 continue
-            locus = (contig, position)
-            if not locus in lociOfInterest:
-                continue  # if we read past this, we know we are looking at a locus with a somatic change
-            position = int(position)
-            totalDepthRNA = int(depth)
-            reads = reads.upper().replace(".", ref).replace(",", ref)
-            reads = re.sub(plusBaseRegex, "", reads)  # get rid of any plus (digit)(base) reads here, otherwise the base will remain as an alt
-            reads = re.sub(nonBaseRegex, "", reads)  # get rid of anything not a base (we have already replaced the periods and commas)
-            foundHashesAtSite = []
-            for variant in somaticVariants:
-                if contig == variant[0] and position == variant[1]:
-                    foundHashesAtSite.append(variant)
-            for foundHash in foundHashesAtSite:
-                if not (len(foundHash[2]) == 1 and len(foundHash[3]) == 1):  # indel catcher
-                    continue
-                altAllele = foundHash[3]
-                supportingDepthRNA = reads.count(altAllele)
-                totalDepthDNA = somaticVariantTable[foundHash]["combined"].tumorDepth
-                supportingDepthDNA = somaticVariantTable[foundHash]["combined"].tumorSupporting
-                expressionDNARatio = (supportingDepthRNA / totalDepthRNA) / (supportingDepthDNA / totalDepthDNA)
-                if not supportingDepthRNA:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(1, supportingDepthRNA, totalDepthRNA, None)
-                    continue
-                if totalDepthRNA < 10 or supportingDepthRNA < 3:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(2, supportingDepthRNA, totalDepthRNA, None)
-                    continue
-                if expressionDNARatio > (1 - minDiff / 100) and expressionDNARatio < (1 + minDiff / 100):  # anything not greater or less than minDiff percent off expected will be called as not significantly different
-                    supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, None)
-                    continue
-                oddsRatio, pvalue = scipy.stats.fisher_exact(
-                    [[supportingDepthRNA, totalDepthRNA], [supportingDepthDNA, totalDepthDNA]])
-                if pvalue > 0.05:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, pvalue, oddsRatio)
-                elif expressionDNARatio > 1:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(5, supportingDepthRNA, totalDepthRNA, pvalue, oddsRatio)
-                else:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(3, supportingDepthRNA, totalDepthRNA, pvalue, oddsRatio)
+            candidates.append((contig, position, ref, depth, reads))
+            if len(candidates) >= batchSize:
+                scoreRNASupport(candidates, variantsAtLocus, tumorCounts, minDiff, supportData)
+                candidates = []
+    scoreRNASupport(candidates, variantsAtLocus, tumorCounts, minDiff, supportData)
     if verbose:
         print("Processed %s lines" % progress)
-    mpileup.close()
     return supportData
 
 
+def addRNASupport(mpileupFile, somaticVariantTable, minDiff, verbose=False, chromosome=False):
+    # the variant table (just the chromosome's variants if one is given) with RNA support filled in for each variant.  Takes either a VariantTable or per-variant dictionaries.
+    import variantDataHandler
+    if chromosome:
+        somaticVariantTable = variantDataHandler.variantsOnContig(somaticVariantTable, chromosome)
+    somaticVariants = list(somaticVariantTable.keys())
+    rnaSupportTable = checkMPileupForRNASupport(mpileupFile, somaticVariants, somaticVariantTable, minDiff, verbose, chromosome)
+    return variantDataHandler.addRNASupportData(somaticVariantTable, rnaSupportTable)
+
+
 def createOutputTextTable(sortedAcceptedVariantInfoTuples, variantDicts):
     sources = sorted(list(variantDicts[sortedAcceptedVariantInfoTuples[0]].keys()))
     sources.remove("hits")
@@ -312,49 +384,24 @@ def createOutputTextTable(sortedAcceptedVariantInfoTuples, variantDicts):
     return outputTable
 
 
-def sortVariantDataTuples(variantDataTupleList):
-    import operator
-    import variantSupport
-    # goal is to have variants sorted first by contig in the standard order, then by position within the contig.  This will be done by first sorting on position and then on contig using a function that specifies the order.
-    variantDataTupleList.sort(key=operator.itemgetter(1))
-    variantDataTupleList.sort(key=variantSupport.contigSortValueFromSomaticTuple)
-
-
 def main():
     args = CheckArgs()
-    import pickle
     import variantDataHandler
+    import variantStore
+    somaticVariantTable = variantStore.loadVariants(args.somaticVariants)
     if args.parallelChromosomes:
-        scatterJobs, tempdir = runScatterJobs(args)
-        somaticVariantTable = gatherResults(scatterJobs)
-        somaticVariants = list(somaticVariantTable.keys())
-        if not args.noCleanup:
-            import shutil
-            print("All jobs completed, removing working directory at %s" %tempdir)
-            shutil.rmtree(tempdir)
+        if args.executor == "qsub":
+            executor = QsubExecutor(args.mock, args.verbose, not args.noCleanup)
+        else:
+            executor = LocalExecutor(args.workers, args.verbose)
+        somaticVariantTable = runScatterJobs(args, somaticVariantTable, executor)
     else:
-        somaticsFile = open(args.somaticVariants, 'rb')
-        somaticVariantTable = pickle.load(somaticsFile)
-        somaticsFile.close()
-        somaticVariants = list(somaticVariantTable.keys())
-        for key in somaticVariants:
-            somaticVariantTable[key]["RNASupport"] = variantDataHandler.RNASupportData(0, 0, 0)
-        rnaSupportTable = checkMPileupForRNASupport(args.mpileupFile, somaticVariants, somaticVariantTable, args.minDiff, args.verbose, args.chromosome, args.jumpLines)
-        for key in list(rnaSupportTable.keys()):
-            somaticVariantTable[key]["RNASupport"] = rnaSupportTable[key]
-        if args.chromosome:
-            removalList = []
-            for key in somaticVariantTable:
-                if not key[0] == args.chromosome:
-                    removalList.append(key)
-            for key in removalList:
-                del somaticVariantTable[key]
-    if args.output.upper().endswith(".PKL"):
-        outputFile = open(args.output, 'wb')
-        pickle.dump(somaticVariantTable, outputFile)
-        outputFile.close()
+        somaticVariantTable = addRNASupport(args.mpileupFile, somaticVariantTable, args.minDiff, args.verbose, args.chromosome)
+    somaticVariants = list(somaticVariantTable.keys())
+    if args.output.upper().endswith(".PKL") or variantStore.writesStore(args.somaticVariants, args.output):
+        variantStore.saveVariants(args.somaticVariants, args.output, somaticVariantTable)
     else:
-        sortVariantDataTuples(somaticVariants)
+        variantDataHandler.sortVariantDataTuples(somaticVariants)
         outputTable = createOutputTextTable(somaticVariants, somaticVariantTable)
         outputFile = open(args.output, 'w')
         for line in outputTable:
@@ -9,7 +9,7 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
         parser.add_argument("-v", "--vcf", help = "RNA Variant call file path", required = True)
         parser.add_argument("-s", "--somaticVariants", help = "Pickle containing somatic variant analysis from DNA", required = True)
         parser.add_argument("-r", "--rna", help = "Tumor RNA variant column name", required = True)
-        parser.add_argument("-o", "--output", help = "Output pickle file name")
+        parser.add_argument("-o", "--output", help = "Output pickle file name.  Ending it with .db adds the RNA support to a variant store (see variantStore) instead.")
         parser.add_argument("-m", "--minDiff", help = "Minimum percent difference in expression vs. DNA mutant/wild-type ratios to consider worth scoring", default = 10, type = int)
         rawArgs = parser.parse_args()
         vcf = rawArgs.vcf
@@ -30,9 +30,11 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
 def checkVCFForRNASupport(vcfPath, somaticVariants, somaticVariantTable, rnaSampleName, minDiff):
     import vcfReader
     import variantDataHandler
-    import scipy.stats
+    import fisherExact
     vcf = open(vcfPath, 'r')
     supportData = {}
+    tumorCounts = variantDataHandler.combinedTumorCounts(somaticVariantTable)
+    fisherTests = []  #the variants that need a Fisher's exact test, all done together once the whole VCF has been read
     for line in vcf:
         line = line.strip()
         if not line:
@@ -41,11 +43,12 @@ def checkVCFForRNASupport(vcfPath, somaticVariants, somaticVariantTable, rnaSamp
             continue
         elif line.startswith("#"):
             header = vcfReader.VCFColumnHeader(line)
+            sampleColumns = header.sampleColumns([rnaSampleName])
             continue
         else:
             if not header:
                 raise RuntimeError("Hit what appears to be a line of data before finding a valid column header line. Line:\n%s" %line)
-            data = vcfReader.VCFDataLine(line, header, somaticVariants)
+            data = vcfReader.VCFDataLine(line, header, somaticVariants, sampleColumns = sampleColumns)
             if not data.inHashList:
                 continue
             for foundHash in data.inHashList:
@@ -54,8 +57,7 @@ def checkVCFForRNASupport(vcfPath, somaticVariants, somaticVariantTable, rnaSamp
                 altAllele = foundHash[3]
                 totalDepthRNA = data.lineArray[header[rnaSampleName]].depth
                 supportingDepthRNA = data.lineArray[header[rnaSampleName]].alleleDepthTable[altAllele]
-                totalDepthDNA = somaticVariantTable[foundHash]["combined"].tumorDepth
-                supportingDepthDNA = somaticVariantTable[foundHash]["combined"].tumorSupporting
+                totalDepthDNA, supportingDepthDNA = tumorCounts[foundHash]
                 expressionDNARatio = (supportingDepthRNA/totalDepthRNA) / (supportingDepthDNA/totalDepthDNA)
                 if not supportingDepthRNA:
                     supportData[foundHash] = variantDataHandler.RNASupportData(1, supportingDepthRNA, totalDepthRNA, None)
@@ -66,14 +68,16 @@ def checkVCFForRNASupport(vcfPath, somaticVariants, somaticVariantTable, rnaSamp
                 if expressionDNARatio > (1 - minDiff/100) and expressionDNARatio < (1 + minDiff/100): #anything not greater or less than minDiff percent off expected will be called as not significantly different
                     supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, None)
                     continue
-                oddsRatio, pvalue = scipy.stats.fisher_exact([[supportingDepthRNA, totalDepthRNA], [supportingDepthDNA, totalDepthDNA]])
-                if pvalue > 0.05:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, pvalue)
-                elif expressionDNARatio > 1:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(5, supportingDepthRNA, totalDepthRNA, pvalue)
-                else:
-                    supportData[foundHash] = variantDataHandler.RNASupportData(3, supportingDepthRNA, totalDepthRNA, pvalue)
+                fisherTests.append((foundHash, supportingDepthRNA, totalDepthRNA, expressionDNARatio, [[supportingDepthRNA, totalDepthRNA], [supportingDepthDNA, totalDepthDNA]]))
     vcf.close()
+    results = fisherExact.fisherExactMany([test[4] for test in fisherTests])
+    for (foundHash, supportingDepthRNA, totalDepthRNA, expressionDNARatio, table), (oddsRatio, pvalue) in zip(fisherTests, results):
+        if pvalue > 0.05:
+            supportData[foundHash] = variantDataHandler.RNASupportData(4, supportingDepthRNA, totalDepthRNA, pvalue)
+        elif expressionDNARatio > 1:
+            supportData[foundHash] = variantDataHandler.RNASupportData(5, supportingDepthRNA, totalDepthRNA, pvalue)
+        else:
+            supportData[foundHash] = variantDataHandler.RNASupportData(3, supportingDepthRNA, totalDepthRNA, pvalue)
     return supportData
                
 def createOutputTextTable(sortedAcceptedVariantInfoTuples, variantDicts):
@@ -99,31 +103,17 @@ def createOutputTextTable(sortedAcceptedVariantInfoTuples, variantDicts):
         outputTable.append(outputLine)
     return outputTable
 
-def sortVariantDataTuples(variantDataTupleList):
-    import operator
-    import variantSupport
-    #goal is to have variants sorted first by contig in the standard order, then by position within the contig.  This will be done by first sorting on position and then on contig using a function that specifies the order.
-    variantDataTupleList.sort(key = operator.itemgetter(1))
-    variantDataTupleList.sort(key = variantSupport.contigSortValueFromSomaticTuple)
-    
 def main():
     args = CheckArgs()
-    import pickle
     import variantDataHandler
-    somaticsFile = open(args.somaticVariants, 'rb')
-    somaticVariantTable = pickle.load(somaticsFile)
-    somaticsFile.close()
-    somaticVariants = list(somaticVariantTable.keys())
-    for key in somaticVariants:
-        somaticVariantTable[key]["RNASupport"] = variantDataHandler.RNASupportData(0, 0, 0)
-    rnaSupportTable = checkVCFForRNASupport(args.vcf, somaticVariants, somaticVariantTable, args.rna, args.minDiff)
-    for key in list(rnaSupportTable.keys()):
-        somaticVariantTable[key]["RNASupport"] = rnaSupportTable[key]
-    sortVariantDataTuples(somaticVariants)
-    if args.output.upper().endswith(".PKL"):
-        outputFile = open(args.output, 'wb')
-        pickle.dump(somaticVariantTable, outputFile)
-        outputFile.close()
+    import variantStore
+    somaticVariantTable = variantStore.loadVariants(args.somaticVariants)
+    somaticVariants = list(somaticVariantTable.keys())  #the pickle can hold either a VariantTable or per-variant dictionaries
+    rnaSupportTable = checkVCFForRNASupport(args.vcf, set(somaticVariants), somaticVariantTable, args.rna, args.minDiff)  #a set, since every alt allele on every line gets looked up in it
+    somaticVariantTable = variantDataHandler.addRNASupportData(somaticVariantTable, rnaSupportTable)
+    variantDataHandler.sortVariantDataTuples(somaticVariants)
+    if args.output.upper().endswith(".PKL") or variantStore.writesStore(args.somaticVariants, args.output):
+        variantStore.saveVariants(args.somaticVariants, args.output, somaticVariantTable)
     else:
         outputTable = createOutputTextTable(somaticVariants, somaticVariantTable)
         outputFile = open(args.output, 'w')
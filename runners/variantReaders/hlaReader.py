@@ -73,21 +73,16 @@ def readHLATypesFromAthlatesOutput(athlatesOutputFile):
                 return list(topAlleles)
             
 def main():
-    import pickle
+    import variantStore
     args = CheckArgs()
-    variantPickleFile = open(args.variantsFile, 'rb')
-    variantPickle = pickle.load(variantPickleFile)
-    variantPickleFile.close()
+    variantPickle = variantStore.loadLayout(args.variantsFile, ["hla"])
     if "hla" in variantPickle:
         raise RuntimeError("HLA calls appear to already be present in this variant pickle.")
     hlaMolecules = list(args.hlaCallFiles.keys())
     hlaCalls = {}
     for molecule in hlaMolecules:
         hlaCalls[molecule] = readHLATypesFromAthlatesOutput(args.hlaCallFiles[molecule])
-    variantPickle["hla"] = hlaCalls.copy()
-    outputFile = open(args.output, 'wb')
-    pickle.dump(variantPickle, outputFile)
-    outputFile.close()
+    variantStore.saveSections(args.variantsFile, args.output, {"hla" : hlaCalls.copy()}, variantPickle)
     
 if __name__ == '__main__':
     main()
@@ -31,10 +31,8 @@ def makeOutputForOncotator(variantDict, delimiter = "\t"):
     
 if __name__ == '__main__':
     args = CheckArgs()
-    import pickle
-    variantPickleFile = open(args.variantPickleFile, 'rb')
-    variantDict = pickle.load(variantPickleFile)
-    variantPickleFile.close()
+    import variantStore
+    variantDict = variantStore.loadLayout(args.variantPickleFile, ["fused/variants"])
     fusedVariants = variantDict["fused"]["variants"]
     outputFile = open(args.outputVariantFile, 'w')
     outputFile.write(makeOutputForOncotator(fusedVariants))
@@ -142,12 +142,11 @@ class PeptideListMakerArgs(object):
         self.variantsFile = variantsFile
         self.output = output
 
-def loadVariantPickle(variantPickleFile):
-    import pickle
-    file = open(variantPickleFile, 'rb')
-    data = pickle.load(file)
-    file.close()
-    return data
+def loadVariantPickle(variantPickleFile, sections = None):
+    import variantStore
+    return variantStore.loadLayout(variantPickleFile, sections)
+
+outputTableSections = ["hla", "fused/oncotatorClassCounts", "fused/oncotatorTypeCounts", "fused/variants", "fused/oncotatorData", "fused/neoepitopes", "fused/wildtype", "fused/RNASupport"]  #what createOutputTable reads from a variant store
 
 def formatDictionaryForOutput(dictionary, delimiter = ", "):
     keys = sorted(list(dictionary.keys()))
@@ -167,7 +166,7 @@ def createOutputTable(variantPickle):
     commentLines.append(hlaLine)
     commentLines.append("Mutation class counts: " + formatDictionaryForOutput(variantPickle["fused"]["oncotatorClassCounts"]))
     commentLines.append("Mutation type counts: " + formatDictionaryForOutput(variantPickle["fused"]["oncotatorTypeCounts"]))
-    usingRNA = "RNASupport" in variantPickle
+    usingRNA = "RNASupport" in variantPickle["fused"]  #tandemVariantCombine puts fused RNA support in whenever there is any
     headerLine = ["#chrom", "pos", "ref", "alt", "variantType", "variantClass", "gene", "description",  "genomeChange", "transcriptID", "cDNAChange", "exon", "proteinChange", "HLA", "altPeptide",  "alt1-log50k(aff)", "altAffinity(nM)", "altPercentRank", "refPeptide", "ref1-log50k(aff)", "refAffinity", "refPercentRank", "logRatio", "affinityRatio", "deltaPercent", "tumorSupportPercent", "tumorSupportReads", "tumorDepth", "normalSupportPercent", "normalSupportReads", "normalDepth"]
     rnaColumns = ["tumorRNASupportScore", "tumorRNASupportPercent", "tumorRNASupport", "tumorRNADepth", "tumorRNApValue", "tumorRNAOddsRatio"]
     if usingRNA:
@@ -230,12 +229,13 @@ def runNetMHC():
     import variantDataHandler
     import peptideListMaker
     import netMHCReader
+    import variantStore
     import sys
     args = CheckArgs()
     peptideListMakerArgs = PeptideListMakerArgs(args.inputVariantFile, args.output)
     peptideListDict = peptideListMaker.makePeptideList(peptideListMakerArgs)
     setEnvironmentVariables(args.tempdir)
-    variantPickle = loadVariantPickle(args.inputVariantFile)
+    variantPickle = loadVariantPickle(args.inputVariantFile, outputTableSections)
     hlaList = getFormattedHLAList(variantPickle["hla"])
     peptideLengthList = list(peptideListDict.keys())
     permittedAlleles = getAlleleList()
@@ -259,6 +259,8 @@ def runNetMHC():
                 print("NetMHC exited with non-zero status: %s" %returnCode)
                 sys.exit(1)
     variantPickle["fused"]["netMHC"] = netMHCReader.getPredictionTable(rawNetMHCOutput)
+    if variantStore.isVariantStore(args.inputVariantFile):
+        variantStore.addSections(args.inputVariantFile, args.inputVariantFile, {"fused/netMHC" : variantPickle["fused"]["netMHC"]})
     commentLines, headerLine, outputData = createOutputTable(variantPickle)
     outputTableString = formatOutputTableString(outputData)
     headerLineString = "\t".join(headerLine)
@@ -183,17 +183,12 @@ def analyzeOncotatorOutput(fileName, skipNonsense = True):
     return (peptideChangeCollector, oncotatorDataCollector, oncotatorClassCounts, oncotatorTypeCounts)
 
 if __name__ == '__main__':
-    import pickle
+    import variantStore
     args = CheckArgs()
     peptideChanges, oncotatorData, oncotatorClassCounts, oncotatorTypeCounts = analyzeOncotatorOutput(args.file)
     print("Found %s peptide changes.  Adding to variant pickle." %len(peptideChanges))
-    variantPickleFile = open(args.variantPickle, 'rb')
-    variantPickle = pickle.load(variantPickleFile)
-    variantPickleFile.close()
-    variantPickle["fused"]["proteinChanges"] = peptideChanges
-    variantPickle["fused"]["oncotatorData"] = oncotatorData
-    variantPickle["fused"]["oncotatorClassCounts"] = oncotatorClassCounts
-    variantPickle["fused"]["oncotatorTypeCounts"] = oncotatorTypeCounts
-    output = open(args.output, 'wb')
-    pickle.dump(variantPickle, output)
-    output.close()
\ No newline at end of file
+    oncotatorSections = {"fused/proteinChanges" : peptideChanges,
+                         "fused/oncotatorData" : oncotatorData,
+                         "fused/oncotatorClassCounts" : oncotatorClassCounts,
+                         "fused/oncotatorTypeCounts" : oncotatorTypeCounts}
+    variantStore.saveSections(args.variantPickle, args.output, oncotatorSections)
\ No newline at end of file
@@ -27,15 +27,12 @@ def makePeptideDict(fusedVariantDict):
     return (peptideDict, list(peptideDict.keys()))
              
 def makePeptideList(args):
-    import pickle
-    variantPickleFile = open(args.variantsFile, 'rb')
-    variantPickle = pickle.load(variantPickleFile)
-    variantPickleFile.close()
+    import variantStore
+    variantPickle = variantStore.loadLayout(args.variantsFile, ["fused/neoepitopes", "fused/wildtype"])
     peptideDict, determinedLengths = makePeptideDict(variantPickle["fused"])  #length list appears to not load properly on the cluster.  Not sure why, same file loads properly locally with the correct length list.  Made sure variantDataHandler version were identical and MD5 values match between pickles.  Potentially a bug somewhere?
     peptideLengths = sorted(list(peptideDict.keys()))
     if not peptideLengths:
         peptideLengths = sorted(determinedLengths)
-    variantPickle["peptideLengths"] = peptideLengths
     peptideFileDict = {}
     for length in peptideLengths:
         outputFileName = args.output + ".%s.pep" %length
@@ -43,9 +40,7 @@ def makePeptideList(args):
         outputFile = open(outputFileName, 'w')
         outputFile.write("\n".join(list(peptideDict[length])))
         outputFile.close()
-    variantPickleOutput = open(args.variantsFile, 'wb')
-    pickle.dump(variantPickle, variantPickleOutput)
-    variantPickleOutput.close()
+    variantStore.saveSections(args.variantsFile, args.variantsFile, {"peptideLengths" : peptideLengths}, variantPickle)  #a store just gets the section added, a pickle is rewritten in place
     return peptideFileDict
     
 if __name__ == '__main__':
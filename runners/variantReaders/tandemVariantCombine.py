@@ -7,7 +7,7 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
         import os
         parser = argparse.ArgumentParser()
         parser.add_argument("-f", "--variantPickleFile", help = "Input pickle of unfused, sorted variants.", required = True)
-        parser.add_argument("-o", "--outputVariantFile", help = "Output file name", required = True)
+        parser.add_argument("-o", "--outputVariantFile", help = "Output file name.  Ending it with .db adds the fused variants to a variant store (see variantStore).", required = True)
         parser.add_argument("-m", "--maxFusionLength", help = "Maximum number of bases to fuse into a single variant (value of 1 will give max fusions of length 2, 3 will give 2, etc.  Value of 0 will set no maximum length.)", type = int, default = 0)
         parser.add_argument("-p", "--maxDifferencePercent" , help = "Maximum percent difference in variant read percentage between one locus and the next before it is rejected as a tandem. Enter values as a whole number (10 for 10 percent, 100 to not check at all).", type = int, default = 10)
         rawArgs = parser.parse_args()
@@ -41,10 +41,9 @@ def makeCombinedAndRNAEntries(variantDict):
     return variantDict
         
 def collectTandemSNVSites(variantDict, maxDifferenceInPercentage = 0.10, maxFusionLength = 0):
-    import operator
+    import variantDataHandler
     variantHashList = list(variantDict["combined"].keys())
-    variantHashList.sort(key = operator.itemgetter(1))
-    variantHashList.sort(key = operator.itemgetter(0))
+    variantDataHandler.sortVariantDataTuples(variantHashList)  #only neighbours on the same contig matter here, so the standard contig order does as well as the reference's
     tandemSiteTable = {}
     currentIndex = 0
     while currentIndex < len(variantHashList):
@@ -87,7 +86,7 @@ def collectTandemSNVSites(variantDict, maxDifferenceInPercentage = 0.10, maxFusi
             
 def fuseTandemSites(tandemSiteHashDict, unfusedVariantDict):
     import variantDataHandler
-    import scipy.stats
+    import fisherExact
     unfusedVariantDict["fused"] = {}
     unfusedVariantDict["fused"]["variants"] = unfusedVariantDict['combined'].copy()
     if "RNASupport" in unfusedVariantDict:
@@ -99,6 +98,7 @@ def fuseTandemSites(tandemSiteHashDict, unfusedVariantDict):
     sitesToFuse = list(tandemSiteHashDict.keys())
     for siteToFuse in sitesToFuse:
         newSiteData = unfusedVariantDict["combined"][siteToFuse] #using the existing site as a base
+        newSiteData.keepDerivedFields()  #the fused site keeps the hash, percents and indel flag of the site it was built on
         if usingRNA:
             newSiteRNAData = unfusedVariantDict["RNASupport"][siteToFuse]
         tandemSites = tandemSiteHashDict[siteToFuse]
@@ -123,7 +123,7 @@ def fuseTandemSites(tandemSiteHashDict, unfusedVariantDict):
             newSiteRNAData.score = round(newSiteRNAData.score / len(tandemSites))
             newSiteRNAData.supportingReads = round(newSiteRNAData.supportingReads / len(tandemSites))
             newSiteRNAData.totalDepth = round(newSiteRNAData.totalDepth / len(tandemSites))
-            newSiteRNAData.oddsRatio, newSiteRNAData.pvalue = scipy.stats.fisher_exact([[newSiteRNAData.supportingReads, newSiteRNAData.totalDepth],[newSiteData.tumorSupporting, newSiteData.tumorDepth]])
+            newSiteRNAData.oddsRatio, newSiteRNAData.pvalue = fisherExact.fisherExact([[newSiteRNAData.supportingReads, newSiteRNAData.totalDepth],[newSiteData.tumorSupporting, newSiteData.tumorDepth]])
         newSiteData.fusedSNV = True
         unfusedVariantDict["fused"]["variants"][siteToFuse] = newSiteData
         if usingRNA:
@@ -161,15 +161,19 @@ def moveRawVariantData(variantDict):
 
 def main():
     import pickle
+    import variantDataHandler
+    import variantStore
     args = CheckArgs()
-    variantDictFile = open(args.variantPickleFile, 'rb')
-    variantDict = pickle.load(variantDictFile)
-    variantDictFile.close()
+    variantDict = variantStore.loadVariants(args.variantPickleFile)
+    if isinstance(variantDict, variantDataHandler.VariantTable):  #fusing changes the variants in place, so this works on the per-variant dictionaries
+        variantDict = variantDict.toVariantDict()
     variantDict = makeCombinedAndRNAEntries(variantDict)
     tandemSiteTable = collectTandemSNVSites(variantDict, args.maxDifferencePercent, args.maxFusionLength)
     variantDict = fuseTandemSites(tandemSiteTable, variantDict)
     variantDict = moveRawVariantData(variantDict)
-    if args.outputVariantFile.endswith(".pkl"):
+    if variantStore.writesStore(args.variantPickleFile, args.outputVariantFile):
+        variantStore.createStore(args.outputVariantFile, variantStore.splitLayout(variantDict))  #everything a pre-fusion store held is in rawVariants, combined and RNASupport now
+    elif args.outputVariantFile.endswith(".pkl"):
         outputFile = open(args.outputVariantFile, 'wb')
         pickle.dump(variantDict, outputFile)
         outputFile.close()
@@ -9,7 +9,9 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
         parser.add_argument("-v", "--variants", help = "Pickles of somatic variant dictionaries. Can be comma-separated into source, SNP/INDEL, path.  source and SNP/INDEL are optional, but a source is needed if SNP/INDEL is given.", dest = "variantFiles", action = "append", required = True)
         parser.add_argument("-m", "--minHits", help = "Minimum hits required across the variant info files to be included in output", type = int)
         parser.add_argument("-x", "--maxHits", help = "Maximum hits allowed for a file to be included in the output", type = int)
-        parser.add_argument("-o", "--output", help = "Output file name", required = True)
+        parser.add_argument("-o", "--output", help = "Output file name.  Ending it with .db writes a variant store (see variantStore) instead of a pickle.", required = True)
+        parser.add_argument("-r", "--reference", help = "Reference genome fasta (with a .fai or .dict next to it) or its index, to sort contigs in the reference's order instead of the standard human one")
+        parser.add_argument("-t", "--variantTable", help = "Write the output pickle as a columnar VariantTable instead of a dictionary of variants (getRNASupport and tandemVariantCombine take either)", action = 'store_true')
         rawArgs = parser.parse_args()
         variantFiles = rawArgs.variantFiles
         self.variantFiles = [VariantPickleFile(fileData) for fileData in variantFiles]
@@ -35,6 +37,8 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
         self.maxHits = maxHits
         output = rawArgs.output
         self.output = output
+        self.variantTable = rawArgs.variantTable
+        self.reference = rawArgs.reference
         
 class VariantPickleFile(object):
     
@@ -77,36 +81,6 @@ def countSources(variantFiles):
         count += noneCount - 1 #subtracting the one for the one file with a None source that contributed to the set
     return count
 
-def dictionaryHitCount(dictionaryList):
-    if type(dictionaryList) in (list, tuple):
-        keyLists = [list(dictionary.keys()) for dictionary in dictionaryList]
-    if type(dictionaryList) == dict:
-        keyLists = []
-        for key in list(dictionaryList.keys()):
-            keyLists.append(list(dictionaryList[key].keys()))
-    collector = {}
-    for keyList in keyLists:
-        for key in keyList:
-            if not key in collector:
-                collector[key] = 1
-            else:
-                collector[key] += 1
-    return collector
-
-def dictionaryHitFilter(dictionaryList, minimumHits = None, maximumHits = None):
-    hitCounts = dictionaryHitCount(dictionaryList)
-    accepted = []
-    for key in list(hitCounts.keys()):
-        count = hitCounts[key]
-        if not type(minimumHits) == type(None):
-            if count < minimumHits:
-                continue
-        if not type(maximumHits) == type(None):
-            if count > maximumHits:
-                continue
-        accepted.append(key)
-    return accepted
-
 # def sortVariantDataTuples(variantDataTupleList):
 #     import operator
 #     import variantSupport
@@ -170,42 +144,18 @@ def createOutputTextTable(sortedAcceptedVariantInfoTuples, variantDicts):
         outputTable.append(outputLine)
     return outputTable
 
-def roundedAverage(data):
-    return round(sum(data)/len(data))
-
-def createOutputPickleTable(sortedAcceptedVariantInfoTuples, variantDicts):
+def combineVariantTable(variantDicts, minimumHits = None, maximumHits = None, contigOrder = None):  #the variants found by enough callers, sorted, with counts averaged across the callers that found them and Fisher's exact tests on those
     import variantDataHandler
-    sources = list(variantDicts.keys())
-    genericEntryDict = {"hits" : 0}
-    for source in sources:
-        genericEntryDict[source] = False
-    outputTable = {}
-    for variant in sortedAcceptedVariantInfoTuples:
-        normalDepth = []
-        normalSupporting = []
-        tumorDepth = []
-        tumorSupporting = []
-        outputTable[variant] = genericEntryDict.copy()
-        for source in sources:
-            if variant in variantDicts[source]:
-                outputTable[variant][source] = variantDicts[source][variant]
-                outputTable[variant]["hits"] += 1
-                normalDepth.append(variantDicts[source][variant].normalDepth)
-                normalSupporting.append(variantDicts[source][variant].normalSupporting)
-                tumorDepth.append(variantDicts[source][variant].tumorDepth)
-                tumorSupporting.append(variantDicts[source][variant].tumorSupporting)
-        normalDepth = roundedAverage(normalDepth)
-        normalSupporting = roundedAverage(normalSupporting)
-        tumorDepth = roundedAverage(tumorDepth)
-        tumorSupporting = roundedAverage(tumorSupporting)
-        contig, position, ref, alt = variant
-        outputTable[variant]["combined"] = variantDataHandler.SomaticVariantData(contig, position, ref, alt, normalDepth, normalSupporting, tumorDepth, tumorSupporting)
-        pvalue = outputTable[variant]["combined"].fisherTest()
-    return outputTable
+    variantTable = variantDataHandler.makeVariantTable(variantDicts)
+    variantTable = variantTable.filter(variantTable.hitMask(minimumHits, maximumHits)).sortByLocus(contigOrder)
+    variantTable.combineCallers()
+    variantTable.fisherTestAll()
+    return variantTable
 
 def main():
     import pickle
     import variantDataHandler
+    import variantStore
     args = CheckArgs()
     variantFileDict = sortVariantFiles(args.variantFiles)
     variantDicts = {}
@@ -224,15 +174,25 @@ def main():
             variantDicts[source] = combineIndelAndSNP(indelData, snpData)
         else:
             raise RuntimeError("Got a source with inappropriate variant types %s\nDict: %s" %(source, variantFileDict[source]))
-    filteredVariants = dictionaryHitFilter(variantDicts, args.minHits, args.maxHits)
-    variantDataHandler.sortVariantDataTuples(filteredVariants)
-    if args.output.upper().endswith(".PKL"):
-        outputTable = createOutputPickleTable(filteredVariants, variantDicts)
-        outputFile = open(args.output, 'wb')
-        pickle.dump(outputTable, outputFile)
-        outputFile.close()
+    contigOrder = None
+    if args.reference:
+        variantDataHandler.addAnalysisScriptsPath()
+        import genomeCoordinates
+        contigOrder = genomeCoordinates.readContigOrder(args.reference)
+    variantTable = combineVariantTable(variantDicts, args.minHits, args.maxHits, contigOrder)
+    if args.output.upper().endswith(".PKL") or variantStore.isStoreName(args.output):
+        if args.variantTable:
+            outputTable = variantTable
+        else:
+            outputTable = variantTable.toVariantDict()
+        if variantStore.isStoreName(args.output):
+            variantStore.createStore(args.output, {"variants" : outputTable})
+        else:
+            outputFile = open(args.output, 'wb')
+            pickle.dump(outputTable, outputFile)
+            outputFile.close()
     else:
-        outputTable = createOutputTextTable(filteredVariants, variantDicts)
+        outputTable = createOutputTextTable(variantTable.keys(), variantDicts)
         outputFile = open(args.output, 'w')
         for line in outputTable:
             print("\t".join(line), file = outputFile)
@@ -1,21 +1,68 @@
 #!/usr/bin/env python3
 
+#The record classes below use __slots__ and pickle as plain tuples of their own fields, since hundreds of thousands of them go through every pickle in the
+#pipeline.  Fields derived from others (isIndel, the supporting percents, readCountString, hashValue) are not pickled and get worked out when they are
+#asked for, unless keepDerivedFields was called to hold on to them before the record was changed.  Pickles from before this still load, as __setstate__
+#takes the old attribute dictionaries too.
+
+def setFromDictionary(record, state, derivedNames = ()):  #restores a record from an old pickle's attribute dictionary
+    for name in record.__slots__:
+        if name in state:
+            setattr(record, name, state[name])
+    if derivedNames:
+        record.derivedFields = None
+        derivedFields = tuple([state[name] for name in derivedNames])
+        if derivedFields != record.deriveFields():  #the record was changed after they were set
+            record.derivedFields = derivedFields
+
 class VariantData(object):
+    __slots__ = ("contig", "position", "ref", "alt", "depth", "supporting", "fusedSNV", "derivedFields")
     
     def __init__(self, contig, position, ref, alt, readDepth, supportingReads):
         self.contig = contig
         self.position = int(position)
         self.ref = ref
         self.alt = alt
-        self.isIndel = len(self.ref) > 1 or len(self.alt) > 1 or "*" in alt
         self.depth = int(readDepth)
         self.supporting = int(supportingReads)
+        self.fusedSNV = False
+        self.derivedFields = None
+
+    @property
+    def isIndel(self):
+        if self.derivedFields:
+            return self.derivedFields[0]
+        return len(self.ref) > 1 or len(self.alt) > 1 or "*" in self.alt
+
+    @property
+    def supportingPercent(self):
+        if self.derivedFields:
+            return self.derivedFields[1]
         if self.depth:
-            self.supportingPercent = self.supporting / self.depth
+            return self.supporting / self.depth
+        return 0
+
+    @property
+    def hashValue(self):
+        if self.derivedFields:
+            return self.derivedFields[2]
+        return (self.contig, self.position, self.ref, self.alt)
+
+    def deriveFields(self):
+        return (self.isIndel, self.supportingPercent, self.hashValue)
+
+    def keepDerivedFields(self):  #holds on to the derived fields as they are now, so they stay the same if the record is changed afterwards
+        self.derivedFields = self.deriveFields()
+
+    def __reduce__(self):
+        import copyreg
+        return (copyreg.__newobj__, (VariantData,), (self.contig, self.position, self.ref, self.alt, self.depth, self.supporting, self.fusedSNV, self.derivedFields))
+
+    def __setstate__(self, state):
+        if type(state) == dict:
+            setFromDictionary(self, state, ("isIndel", "supportingPercent", "hashValue"))
         else:
-            self.supportingPercent = 0
-        self.hashValue = (self.contig, self.position, self.ref, self.alt)
-        self.fusedSNV = False
+            self.contig, self.position, self.ref, self.alt, self.depth, self.supporting, self.fusedSNV, self.derivedFields = state
     
     def __hash__(self):
         return hash(self.hashValue)
@@ -29,41 +76,87 @@ class VariantData(object):
         return not self.__eq__(other)
             
 class SomaticVariantData(object):
+    __slots__ = ("contig", "position", "ref", "alt", "normalDepth", "normalSupporting", "tumorDepth", "tumorSupporting", "pvalue", "oddsRatio", "fusedSNV", "derivedFields")
     
     def __init__(self, contig, position, ref, alt, normalReadDepth, normalSupportingReads, tumorReadDepth, tumorSupportingReads):
         self.contig = contig
         self.position = int(position)
         self.ref = ref
         self.alt = alt
-        self.isIndel = len(self.ref) > 1 or len(self.alt) > 1 or "*" in alt
         self.normalDepth = int(normalReadDepth)
         self.normalSupporting = int(normalSupportingReads)
-        if self.normalDepth:
-            self.normalSupportingPercent = self.normalSupporting / self.normalDepth
-        else:
-            self.normalSupportingPercent = 0
         self.tumorDepth = int(tumorReadDepth)
         self.tumorSupporting = int(tumorSupportingReads)
-        self.readCountString = "%s,%s,%s,%s" %(self.tumorSupporting, self.tumorDepth, self.normalSupporting, self.normalDepth)
-        if self.tumorDepth:
-            self.tumorSupportingPercent = self.tumorSupporting / self.tumorDepth
-        else:
-            self.tumorSupportingPercent = 0
         self.pvalue = None
-        self.hashValue = (self.contig, self.position, self.ref, self.alt)
+        self.oddsRatio = None
         self.fusedSNV = False
+        self.derivedFields = None
+
+    @property
+    def isIndel(self):
+        if self.derivedFields:
+            return self.derivedFields[0]
+        return len(self.ref) > 1 or len(self.alt) > 1 or "*" in self.alt
+
+    @property
+    def normalSupportingPercent(self):
+        if self.derivedFields:
+            return self.derivedFields[1]
+        if self.normalDepth:
+            return self.normalSupporting / self.normalDepth
+        return 0
+
+    @property
+    def tumorSupportingPercent(self):
+        if self.derivedFields:
+            return self.derivedFields[2]
+        if self.tumorDepth:
+            return self.tumorSupporting / self.tumorDepth
+        return 0
+
+    @property
+    def readCountString(self):
+        if self.derivedFields:
+            return self.derivedFields[3]
+        return "%s,%s,%s,%s" %(self.tumorSupporting, self.tumorDepth, self.normalSupporting, self.normalDepth)
+
+    @property
+    def hashValue(self):
+        if self.derivedFields:
+            return self.derivedFields[4]
+        return (self.contig, self.position, self.ref, self.alt)
+
+    def deriveFields(self):
+        return (self.isIndel, self.normalSupportingPercent, self.tumorSupportingPercent, self.readCountString, self.hashValue)
+
+    def keepDerivedFields(self):  #holds on to the derived fields as they are now, so they stay the same if the record is changed afterwards (fused sites)
+        self.derivedFields = self.deriveFields()
+
+    def __reduce__(self):
+        import copyreg
+        return (copyreg.__newobj__, (SomaticVariantData,), (self.contig, self.position, self.ref, self.alt, self.normalDepth, self.normalSupporting, self.tumorDepth, self.tumorSupporting, self.pvalue, self.oddsRatio, self.fusedSNV, self.derivedFields))
+
+    def __setstate__(self, state):
+        if type(state) == dict:
+            self.oddsRatio = None
+            setFromDictionary(self, state, ("isIndel", "normalSupportingPercent", "tumorSupportingPercent", "readCountString", "hashValue"))
+        else:
+            self.contig, self.position, self.ref, self.alt, self.normalDepth, self.normalSupporting, self.tumorDepth, self.tumorSupporting, self.pvalue, self.oddsRatio, self.fusedSNV, self.derivedFields = state
+
+    def fisherTable(self):
+        '''
+                supporting  depth
+        normal  counts      counts
+        tumor   counts      counts
+        '''
+        return [[self.normalSupporting, self.normalDepth], [self.tumorSupporting, self.tumorDepth]]
 
     def fisherTest(self):
         if self.pvalue:
             return self.pvalue
         else:
-            import scipy.stats
-            '''
-                    supporting  depth
-            normal  counts      counts
-            tumor   counts      counts
-            '''
-            self.oddsRatio, self.pvalue = scipy.stats.fisher_exact([[self.normalSupporting, self.normalDepth], [self.tumorSupporting, self.tumorDepth]])
+            import fisherExact
+            self.oddsRatio, self.pvalue = fisherExact.fisherExact(self.fisherTable())
             return self.pvalue
     
     def __hash__(self):
@@ -89,6 +182,7 @@ class SomaticVariantData(object):
         return delimiter.join(lineItems)
     
 class RNASupportData(object):
+    __slots__ = ("score", "supportingReads", "totalDepth", "pvalue", "oddsRatio")
     
     def __init__(self, score, supportingReads, totalDepth, pvalue = None, oddsRatio = None):
         self.score = score
@@ -96,6 +190,17 @@ class RNASupportData(object):
         self.totalDepth = totalDepth
         self.pvalue = pvalue
         self.oddsRatio = oddsRatio
+
+    def __reduce__(self):
+        import copyreg
+        return (copyreg.__newobj__, (RNASupportData,), (self.score, self.supportingReads, self.totalDepth, self.pvalue, self.oddsRatio))
+
+    def __setstate__(self, state):
+        if type(state) == dict:
+            self.oddsRatio = None
+            setFromDictionary(self, state)
+        else:
+            self.score, self.supportingReads, self.totalDepth, self.pvalue, self.oddsRatio = state
     
     def __str__(self):
         printItems = [self.score, self.supportingReads, self.totalDepth, self.pvalue]
@@ -106,14 +211,27 @@ class RNASupportData(object):
         return bool(self.totalDepth)
 
 class ProteinChange(object):
+    __slots__ = ("gene", "enst", "changes")
     
     def __init__(self, gene, enst, changeTupleList):
         self.gene = gene
         self.enst = enst
         self.changes = changeTupleList
-        self.polypeptideChange = len(changeTupleList) > 1
+
+    polypeptideChange = property(lambda self: len(self.changes) > 1)
+
+    def __reduce__(self):
+        import copyreg
+        return (copyreg.__newobj__, (ProteinChange,), (self.gene, self.enst, self.changes))
+
+    def __setstate__(self, state):
+        if type(state) == dict:
+            setFromDictionary(self, state)
+        else:
+            self.gene, self.enst, self.changes = state
         
 class OncotatorData(object):
+    __slots__ = ("gene", "transcript", "description", "variantClassification", "variantType", "genomeChange", "exon", "cDNAChange", "proteinChange")
     
     def __init__(self, gene, transcript, description, variantClassification, variantType, genomeChange, exon, cDNAChange, proteinChange):
         self.gene = gene
@@ -125,8 +243,20 @@ class OncotatorData(object):
         self.exon = exon
         self.cDNAChange = cDNAChange
         self.proteinChange = proteinChange
+
+    def __reduce__(self):
+        import copyreg
+        return (copyreg.__newobj__, (OncotatorData,), tuple([getattr(self, name) for name in OncotatorData.__slots__]))
+
+    def __setstate__(self, state):
+        if type(state) == dict:
+            setFromDictionary(self, state)
+        else:
+            for name, value in zip(OncotatorData.__slots__, state):
+                setattr(self, name, value)
         
 class NetMHCPrediction(object):
+    __slots__ = ("bindingFlag", "pos", "hla", "peptide", "core", "offset", "ipos", "ilen", "dpos", "dlen", "icore", "identity", "log", "affinity", "rank")
     
     def __init__(self, predictionLine):
         self.bindingFlag = None
@@ -159,29 +289,417 @@ class NetMHCPrediction(object):
         self.log = float(predictionLine.pop(0))
         self.affinity = float(predictionLine.pop(0))
         self.rank = float(predictionLine.pop(0))
+
+    def __reduce__(self):
+        import copyreg
+        return (copyreg.__newobj__, (NetMHCPrediction,), tuple([getattr(self, name) for name in NetMHCPrediction.__slots__]))
+
+    def __setstate__(self, state):
+        if type(state) == dict:
+            setFromDictionary(self, state)
+        else:
+            for name, value in zip(NetMHCPrediction.__slots__, state):
+                setattr(self, name, value)
         
-def sortVariantDataTuples(variantDataTupleList):
+def fisherTestAll(somaticVariantDataList):  #runs fisherTest on a whole list of SomaticVariantData objects in one batch
+    import fisherExact
+    untested = [somaticVariant for somaticVariant in somaticVariantDataList if not somaticVariant.pvalue]
+    results = fisherExact.fisherExactMany([somaticVariant.fisherTable() for somaticVariant in untested])
+    for somaticVariant, (oddsRatio, pvalue) in zip(untested, results):
+        somaticVariant.oddsRatio, somaticVariant.pvalue = oddsRatio, pvalue
+
+def addAnalysisScriptsPath():  #the shared genome coordinate module lives with the analysis scripts
+    import os
+    import sys
+    analysisScripts = os.sep.join(os.path.abspath(__file__).split(os.sep)[:-3] + ["analysisScripts"])
+    if not analysisScripts in sys.path:
+        sys.path.append(analysisScripts)
+
+def sortVariantDataTuples(variantDataTupleList, contigOrder = None):  #sorts variant hashes in place by contig (in the reference's order if given a genomeCoordinates.ContigOrder, the standard human order if not) and then position
     if not type(variantDataTupleList) == list:
         raise RuntimeError("Variant data tuple list must be passed as a list type.")
-    import operator
-    def contigSortValue(rawContig, highestNumber = 99):
-        import re
-        digits = len(str(highestNumber))
-        contig = re.sub("chr", "", rawContig.strip(), flags=re.IGNORECASE)
-        sortOrder = "1,2,3,4,5,6,7,8,9,10,11,12,13,14,15,16,17,18,19,20,21,22,X,Y,M,MT".split(",")
-        sortingTable = {}
-        for index, contigName in enumerate(sortOrder):
-            sortingTable[contigName] = str(index)
-        if not contig in sortingTable:
-            return rawContig
+    addAnalysisScriptsPath()
+    import genomeCoordinates
+    if contigOrder is None:
+        contigOrder = genomeCoordinates.standardContigOrder()
+    contigOrder.sortLoci(variantDataTupleList)
+
+def internStrings(strings, codes, values):  #an integer code for each string, adding new strings to the codes dictionary and the values list
+    codeList = []
+    for string in strings:
+        code = codes.get(string)
+        if code is None:
+            code = len(values)
+            codes[string] = code
+            values.append(string)
+        codeList.append(code)
+    return codeList
+
+def notTested(value):  #NaN stands in for None in the VariantTable's float columns
+    return value != value
+
+class VariantTable(object):
+    #Somatic calls kept column by column: interned contig and allele codes, int32 positions, and a count column for each caller, plus the averaged
+    #"combined" counts with their Fisher's exact test results and the RNA support once those have been worked out.  Rows are looked up by the usual
+    #(contig, position, ref, alt) hash, and indexing the table with one gives the same per-variant dictionary variantCombine has always written, so code
+    #written for those keeps working.  Filtering, sorting, averaging and testing work on whole columns at once.
+    countFields = ("normalDepth", "normalSupporting", "tumorDepth", "tumorSupporting")
+    rnaFields = ("score", "supportingReads", "totalDepth", "pvalue", "oddsRatio")
+    rowColumns = ("contigCodes", "positions", "refCodes", "altCodes", "calledBy", "sourcePvalues", "sourceOddsRatios", "pvalues", "oddsRatios")
+    columnGroups = ("sourceCounts", "combinedCounts", "rnaSupport")
+
+    def __init__(self, sources = ()):
+        import numpy
+        self.sources = list(sources)
+        self.contigs = []
+        self.alleles = []
+        self.contigCodes = numpy.zeros(0, dtype = numpy.int32)
+        self.positions = numpy.zeros(0, dtype = numpy.int32)
+        self.refCodes = numpy.zeros(0, dtype = numpy.int32)
+        self.altCodes = numpy.zeros(0, dtype = numpy.int32)
+        self.calledBy = numpy.zeros((0, len(self.sources)), dtype = bool)
+        self.sourceCounts = dict([(field, numpy.zeros((0, len(self.sources)), dtype = numpy.int32)) for field in VariantTable.countFields])
+        self.sourcePvalues = None  #only kept if some caller's records came with Fisher's exact tests
+        self.sourceOddsRatios = None
+        self.combinedCounts = None  #set by combineCallers
+        self.pvalues = None
+        self.oddsRatios = None
+        self.rnaSupport = None  #set by setRNASupport
+        self.keyIndex = None
+
+    def setKeys(self, keys):  #the contig, position and allele columns for a list of variant hashes
+        import numpy
+        if keys:
+            contigs, positions, refs, alts = zip(*keys)
         else:
-            returnValue = sortingTable[contig]
-            if returnValue.isdigit():
-                return returnValue.zfill(digits)
+            contigs, positions, refs, alts = ((), (), (), ())
+        self.contigs = []
+        self.alleles = []
+        alleleCodes = {}
+        self.contigCodes = numpy.array(internStrings(contigs, {}, self.contigs), dtype = numpy.int32)
+        self.positions = numpy.array(positions, dtype = numpy.int32)
+        self.refCodes = numpy.array(internStrings(refs, alleleCodes, self.alleles), dtype = numpy.int32)
+        self.altCodes = numpy.array(internStrings(alts, alleleCodes, self.alleles), dtype = numpy.int32)
+        self.keyIndex = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["keyIndex"] = None
+        return state
+
+    def __len__(self):
+        return len(self.positions)
+
+    def rowKeys(self, rows = None):  #the variant hashes for the given rows (all of them by default)
+        if rows is None:
+            rows = slice(None)
+        contigs = [self.contigs[code] for code in self.contigCodes[rows].tolist()]
+        refs = [self.alleles[code] for code in self.refCodes[rows].tolist()]
+        alts = [self.alleles[code] for code in self.altCodes[rows].tolist()]
+        return list(zip(contigs, self.positions[rows].tolist(), refs, alts))
+
+    def keys(self):
+        return self.rowKeys()
+
+    def __iter__(self):
+        return iter(self.rowKeys())
+
+    def rowIndex(self):
+        if self.keyIndex is None:
+            self.keyIndex = dict([(key, row) for row, key in enumerate(self.rowKeys())])
+        return self.keyIndex
+
+    def __contains__(self, key):
+        return key in self.rowIndex()
+
+    def rowsFor(self, keys):  #joins a list of hashes to the table, giving the row for each (-1 where the table does not have it)
+        import numpy
+        rowIndex = self.rowIndex()
+        return numpy.array([rowIndex.get(key, -1) for key in keys], dtype = numpy.int64)
+
+    def __getitem__(self, key):
+        return self.variantEntries([self.rowIndex()[key]])[0]
+
+    def values(self):
+        import numpy
+        return self.variantEntries(numpy.arange(len(self)))
+
+    def items(self):
+        return list(zip(self.rowKeys(), self.values()))
+
+    def toVariantDict(self):  #the per-variant dictionaries variantCombine writes without a VariantTable, for code that changes them in place
+        return dict(self.items())
+
+    def variantEntries(self, rows):  #per-variant dictionaries ({"hits" : count, source : SomaticVariantData or False, ..., "combined" : SomaticVariantData, "RNASupport" : RNASupportData}) for a list of rows
+        import numpy
+        rows = numpy.asarray(rows, dtype = numpy.int64)
+        keys = self.rowKeys(rows)
+        calledBy = self.calledBy[rows]
+        hits = calledBy.sum(axis = 1).tolist()
+        calledBy = calledBy.tolist()
+        sourceCounts = list(zip(*[self.sourceCounts[field][rows].tolist() for field in VariantTable.countFields]))
+        if self.sourcePvalues is not None:
+            sourcePvalues = self.sourcePvalues[rows].tolist()
+            sourceOddsRatios = self.sourceOddsRatios[rows].tolist()
+        else:
+            sourcePvalues = sourceOddsRatios = [[numpy.nan] * len(self.sources)] * len(keys)
+        if self.combinedCounts is not None:
+            combinedCounts = list(zip(*[self.combinedCounts[field][rows].tolist() for field in VariantTable.countFields]))
+            pvalues = self.pvalues[rows].tolist()
+            oddsRatios = self.oddsRatios[rows].tolist()
+        if self.rnaSupport is not None:
+            rnaSupport = list(zip(*[self.rnaSupport[field][rows].tolist() for field in VariantTable.rnaFields]))
+        entries = []
+        for index, key in enumerate(keys):
+            entry = {"hits" : hits[index]}
+            for column, source in enumerate(self.sources):
+                if calledBy[index][column]:
+                    entry[source] = somaticRecord(key, [counts[column] for counts in sourceCounts[index]], sourcePvalues[index][column], sourceOddsRatios[index][column])
+                else:
+                    entry[source] = False
+            if self.combinedCounts is not None:
+                entry["combined"] = somaticRecord(key, combinedCounts[index], pvalues[index], oddsRatios[index])
+            if self.rnaSupport is not None:
+                score, supportingReads, totalDepth, pvalue, oddsRatio = rnaSupport[index]
+                if notTested(pvalue):
+                    pvalue = None
+                if notTested(oddsRatio):
+                    oddsRatio = None
+                entry["RNASupport"] = RNASupportData(score, supportingReads, totalDepth, pvalue, oddsRatio)
+            entries.append(entry)
+        return entries
+
+    def mapColumns(self, function):  #a new table made by applying function to each column (each array with a value for every row)
+        table = VariantTable(self.sources)
+        table.contigs = list(self.contigs)
+        table.alleles = list(self.alleles)
+        for name in VariantTable.rowColumns:
+            column = getattr(self, name)
+            if column is not None:
+                setattr(table, name, function(column))
+        for name in VariantTable.columnGroups:
+            columns = getattr(self, name)
+            if columns is not None:
+                setattr(table, name, dict([(field, function(column)) for field, column in columns.items()]))
+        return table
+
+    def take(self, rows):  #a new table of just the given rows, in the given order
+        import numpy
+        rows = numpy.asarray(rows, dtype = numpy.int64)
+        return self.mapColumns(lambda column: column[rows])
+
+    def filter(self, mask):
+        import numpy
+        return self.take(numpy.flatnonzero(mask))
+
+    def contigMask(self, contig):
+        import numpy
+        if not contig in self.contigs:
+            return numpy.zeros(len(self), dtype = bool)
+        return self.contigCodes == self.contigs.index(contig)
+
+    def hitCounts(self):  #how many callers found each variant
+        return self.calledBy.sum(axis = 1)
+
+    def hitMask(self, minimumHits = None, maximumHits = None):
+        import numpy
+        hits = self.hitCounts()
+        mask = numpy.ones(len(self), dtype = bool)
+        if not minimumHits is None:
+            mask &= hits >= minimumHits
+        if not maximumHits is None:
+            mask &= hits <= maximumHits
+        return mask
+
+    def sortByLocus(self, contigOrder = None):  #a copy sorted in the same order as sortVariantDataTuples would put the hashes in
+        import numpy
+        addAnalysisScriptsPath()
+        import genomeCoordinates
+        if contigOrder is None:
+            contigOrder = genomeCoordinates.standardContigOrder()
+        ranks = contigOrder.rankAll(self.contigs)
+        contigRanks = numpy.array([ranks[contig] for contig in self.contigs], dtype = numpy.int64)
+        locusKeys = (contigRanks[self.contigCodes] << genomeCoordinates.positionBits) | self.positions
+        return self.take(numpy.argsort(locusKeys, kind = "stable"))  #stable, so variants at the same locus keep their order
+
+    def groupByContig(self):  #a table for each contig with variants, in the order the contigs first came up
+        import numpy
+        groups = {}
+        for code, contig in enumerate(self.contigs):
+            rows = numpy.flatnonzero(self.contigCodes == code)
+            if len(rows):
+                groups[contig] = self.take(rows)
+        return groups
+
+    def combineCallers(self):  #each combined count is the average over the callers that found the variant, rounded the same way round() does
+        import numpy
+        hits = self.hitCounts()
+        if (hits == 0).any():
+            raise RuntimeError("Unable to combine counts for variants no caller found.")
+        self.combinedCounts = {}
+        for field in VariantTable.countFields:
+            totals = numpy.where(self.calledBy, self.sourceCounts[field], 0).sum(axis = 1)
+            self.combinedCounts[field] = numpy.rint(totals / hits).astype(numpy.int32)
+        self.pvalues = numpy.full(len(self), numpy.nan)
+        self.oddsRatios = numpy.full(len(self), numpy.nan)
+
+    def fisherTestAll(self):  #Fisher's exact tests on the combined counts of every variant not already tested, all in one batch
+        import numpy
+        import fisherExact
+        if self.combinedCounts is None:
+            raise RuntimeError("Combined counts are needed for Fisher's exact tests.  Run combineCallers first.")
+        rows = numpy.flatnonzero(numpy.isnan(self.pvalues))
+        normal = zip(self.combinedCounts["normalSupporting"][rows].tolist(), self.combinedCounts["normalDepth"][rows].tolist())
+        tumor = zip(self.combinedCounts["tumorSupporting"][rows].tolist(), self.combinedCounts["tumorDepth"][rows].tolist())
+        results = fisherExact.fisherExactMany(list(zip(normal, tumor)))
+        if results:
+            oddsRatios, pvalues = zip(*results)
+            self.oddsRatios[rows] = oddsRatios
+            self.pvalues[rows] = pvalues
+
+    def setRNASupport(self, rnaSupportTable):  #RNA support for each variant from a dictionary of RNASupportData by hash, with no support (0, 0, 0) for any missing from it
+        import numpy
+        keys = list(rnaSupportTable.keys())
+        rows = self.rowsFor(keys)
+        if (rows < 0).any():
+            raise RuntimeError("Got RNA support for variants that are not in the table, such as %s" %(keys[numpy.flatnonzero(rows < 0)[0]],))
+        self.rnaSupport = {}
+        for field in VariantTable.rnaFields:
+            values = [getattr(rnaSupportTable[key], field) for key in keys]
+            if field in ("pvalue", "oddsRatio"):
+                self.rnaSupport[field] = numpy.full(len(self), numpy.nan)
+                values = [numpy.nan if value is None else value for value in values]
             else:
-                return returnValue
-    def contigSortValueFromSomaticTuple(somaticTuple, highestNumber = 99):
-        return contigSortValue(somaticTuple[0], highestNumber)
-    #goal is to have variants sorted first by contig in the standard order, then by position within the contig.  This will be done by first sorting on position and then on contig using a function that specifies the order.
-    variantDataTupleList.sort(key = operator.itemgetter(1))  #sort first on position
-    variantDataTupleList.sort(key = contigSortValueFromSomaticTuple)
+                self.rnaSupport[field] = numpy.zeros(len(self), dtype = numpy.int32)
+            self.rnaSupport[field][rows] = values
+
+def somaticRecord(key, counts, pvalue, oddsRatio):  #a SomaticVariantData from a VariantTable row
+    contig, position, ref, alt = key
+    normalDepth, normalSupporting, tumorDepth, tumorSupporting = counts
+    record = SomaticVariantData(contig, position, ref, alt, normalDepth, normalSupporting, tumorDepth, tumorSupporting)
+    if not notTested(pvalue):
+        record.pvalue = pvalue
+        record.oddsRatio = oddsRatio
+    return record
+
+def makeVariantTable(callerDicts, keys = None):  #a VariantTable joining each caller's dictionary of SomaticVariantData by hash, with a row for every variant any of them found (in the order given by keys, if given)
+    import numpy
+    sources = list(callerDicts.keys())
+    if keys is None:
+        rowIndex = {}
+        for source in sources:
+            for key in callerDicts[source]:
+                if not key in rowIndex:
+                    rowIndex[key] = len(rowIndex)
+        keys = list(rowIndex.keys())
+    else:
+        rowIndex = dict([(key, row) for row, key in enumerate(keys)])
+    table = VariantTable(sources)
+    table.setKeys(keys)
+    table.keyIndex = rowIndex
+    shape = (len(keys), len(sources))
+    table.calledBy = numpy.zeros(shape, dtype = bool)
+    table.sourceCounts = dict([(field, numpy.zeros(shape, dtype = numpy.int32)) for field in VariantTable.countFields])
+    for column, source in enumerate(sources):
+        records = list(callerDicts[source].values())
+        rows = [rowIndex[key] for key in callerDicts[source]]
+        table.calledBy[rows, column] = True
+        for field in VariantTable.countFields:
+            table.sourceCounts[field][rows, column] = [getattr(record, field) for record in records]
+        testedRecords = [(row, record) for row, record in zip(rows, records) if not record.pvalue is None]
+        if testedRecords:
+            if table.sourcePvalues is None:
+                table.sourcePvalues = numpy.full(shape, numpy.nan)
+                table.sourceOddsRatios = numpy.full(shape, numpy.nan)
+            testedRows = [row for row, record in testedRecords]
+            table.sourcePvalues[testedRows, column] = [record.pvalue for row, record in testedRecords]
+            table.sourceOddsRatios[testedRows, column] = [record.oddsRatio for row, record in testedRecords]
+    return table
+
+def variantTableFromDict(variantDict):  #a VariantTable from the per-variant dictionaries variantCombine has always written (with RNASupport too if it has been added)
+    import numpy
+    keys = list(variantDict.keys())
+    if not keys:
+        return VariantTable()
+    firstEntry = variantDict[keys[0]]
+    sources = [name for name in firstEntry if not name in ("hits", "combined", "RNASupport")]
+    callerDicts = dict([(source, {}) for source in sources])
+    for key in keys:
+        entry = variantDict[key]
+        for source in sources:
+            if entry[source]:
+                callerDicts[source][key] = entry[source]
+    table = makeVariantTable(callerDicts, keys)
+    if "combined" in firstEntry:
+        records = [variantDict[key]["combined"] for key in keys]
+        table.combinedCounts = dict([(field, numpy.array([getattr(record, field) for record in records], dtype = numpy.int32)) for field in VariantTable.countFields])
+        table.pvalues = numpy.array([numpy.nan if record.pvalue is None else record.pvalue for record in records], dtype = float)
+        table.oddsRatios = numpy.array([numpy.nan if record.pvalue is None else record.oddsRatio for record in records], dtype = float)
+    if "RNASupport" in firstEntry:
+        table.setRNASupport(dict([(key, variantDict[key]["RNASupport"]) for key in keys]))
+    return table
+
+def concatenateVariantTables(tables):  #one table with the rows of each in turn.  They need the same callers and the same combined and RNA support columns.
+    import numpy
+    if not tables:
+        return VariantTable()
+    first = tables[0]
+    for table in tables[1:]:
+        if table.sources != first.sources:
+            raise RuntimeError("Unable to put together VariantTables with different callers: %s and %s" %(first.sources, table.sources))
+        if (table.combinedCounts is None) != (first.combinedCounts is None) or (table.rnaSupport is None) != (first.rnaSupport is None):
+            raise RuntimeError("Unable to put together VariantTables where only some have combined counts or RNA support.")
+    result = VariantTable(first.sources)
+    keys = []
+    for table in tables:
+        keys.extend(table.rowKeys())
+    result.setKeys(keys)
+    for name in ("calledBy", "sourcePvalues", "sourceOddsRatios", "pvalues", "oddsRatios"):
+        columns = [getattr(table, name) for table in tables]
+        if any([column is not None for column in columns]):
+            columns = [numpy.full((len(table), len(table.sources)), numpy.nan) if column is None else column for table, column in zip(tables, columns)]  #only happens for the callers' test results
+            setattr(result, name, numpy.concatenate(columns))
+    for name in VariantTable.columnGroups:
+        if getattr(first, name) is not None:
+            setattr(result, name, dict([(field, numpy.concatenate([getattr(table, name)[field] for table in tables])) for field in getattr(first, name)]))
+    return result
+
+#These work on either a VariantTable or a dictionary of per-variant dictionaries, so the RNA support steps can take whichever variantCombine wrote.
+
+def combinedTumorCounts(somaticVariantTable):  #(tumorDepth, tumorSupporting) from the combined counts for each variant hash
+    if isinstance(somaticVariantTable, VariantTable):
+        return dict(zip(somaticVariantTable.rowKeys(), zip(somaticVariantTable.combinedCounts["tumorDepth"].tolist(), somaticVariantTable.combinedCounts["tumorSupporting"].tolist())))
+    return dict([(key, (entry["combined"].tumorDepth, entry["combined"].tumorSupporting)) for key, entry in somaticVariantTable.items()])
+
+def variantsOnContig(somaticVariantTable, contig):
+    if isinstance(somaticVariantTable, VariantTable):
+        return somaticVariantTable.filter(somaticVariantTable.contigMask(contig))
+    return dict([(key, value) for key, value in somaticVariantTable.items() if key[0] == contig])
+
+def splitByContig(somaticVariantTable):
+    if isinstance(somaticVariantTable, VariantTable):
+        return somaticVariantTable.groupByContig()
+    variantsByContig = {}
+    for key in somaticVariantTable:
+        if not key[0] in variantsByContig:
+            variantsByContig[key[0]] = {}
+        variantsByContig[key[0]][key] = somaticVariantTable[key]
+    return variantsByContig
+
+def mergeVariantTables(partialTables):  #puts tables split up by splitByContig back together
+    if partialTables and isinstance(partialTables[0], VariantTable):
+        return concatenateVariantTables(partialTables)
+    merged = {}
+    for partialTable in partialTables:
+        merged.update(partialTable)
+    return merged
+
+def addRNASupportData(somaticVariantTable, rnaSupportTable):  #fills in RNASupport for every variant from a dictionary of RNASupportData by hash, with no support (0, 0, 0) for any missing from it
+    if isinstance(somaticVariantTable, VariantTable):
+        somaticVariantTable.setRNASupport(rnaSupportTable)
+        return somaticVariantTable
+    for key in somaticVariantTable:
+        somaticVariantTable[key]["RNASupport"] = RNASupportData(0, 0, 0)
+    for key in rnaSupportTable:
+        somaticVariantTable[key]["RNASupport"] = rnaSupportTable[key]
+    return somaticVariantTable
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+#A sectioned variant file to pass between the post-calling stages in place of one big pickle.  It is a SQLite file with one pickled value per section, where
+#a section is one key of the old pickle layout ("hla", "rawVariants") or one key under "fused" ("fused/variants", "fused/netMHC").  Before the tandem fusion
+#step, the combined variants go in "variants" and getRNASupport adds only "rnaSupport".  Each stage reads just the sections it uses and writes just the ones
+#it adds, so nothing is reloaded or rewritten as the file grows.  Stages write a store when their output file name ends with .db, and the old pickle layout
+#can be imported or exported with this script.
+
+storeExtension = ".db"
+nestedSections = ("fused",)  #keys of the old layout whose values are split into a section per key
+preFusionSections = ("variants", "rnaSupport")  #only used until tandemVariantCombine lays the variants out in combined, fused and so on
+
+class CheckArgs():  #class that checks arguments and ultimately returns a validated set of arguments to the main program
+
+    def __init__(self):
+        import argparse
+        import os
+        parser = argparse.ArgumentParser()
+        parser.add_argument("-i", "--input", help = "Variant pickle to import or variant store to export", required = True)
+        parser.add_argument("-o", "--output", help = "Output file name.  Ending it with %s makes a variant store, anything else a pickle in the old layout." %storeExtension)
+        parser.add_argument("-l", "--list", help = "List the sections in the store (the input, or the output of an import)", action = 'store_true')
+        rawArgs = parser.parse_args()
+        input = rawArgs.input
+        if not os.path.isfile(input):
+            raise FileNotFoundError("Unable to find input file %s" %input)
+        self.input = input
+        self.output = rawArgs.output
+        self.list = rawArgs.list
+        if not (self.output or self.list):
+            raise RuntimeError("Nothing to do.  Give an output file to convert to and/or ask for a list of sections.")
+
+class VariantStore(object):
+
+    def __init__(self, fileName):
+        import sqlite3
+        self.fileName = fileName
+        self.connection = sqlite3.connect(fileName)
+        self.connection.execute("CREATE TABLE IF NOT EXISTS sections (name TEXT PRIMARY KEY, data BLOB NOT NULL)")
+        self.connection.commit()
+
+    def __contains__(self, name):
+        return self.connection.execute("SELECT 1 FROM sections WHERE name = ?", (name,)).fetchone() is not None
+
+    def sections(self):
+        return [row[0] for row in self.connection.execute("SELECT name FROM sections ORDER BY rowid")]
+
+    def read(self, name):
+        import pickle
+        row = self.connection.execute("SELECT data FROM sections WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise KeyError("No %s section in variant store %s" %(name, self.fileName))
+        return pickle.loads(row[0])
+
+    def readSections(self, names = None):  #a dictionary of section values by name for the names given (all sections if none are) that are in the store
+        if names is None:
+            names = self.sections()
+        return dict([(name, self.read(name)) for name in names if name in self])
+
+    def writeSections(self, sectionValues):  #adds or replaces the sections in one transaction, so a stage that fails part way leaves the store as it was
+        import pickle
+        with self.connection:
+            for name in sectionValues:
+                self.connection.execute("INSERT OR REPLACE INTO sections (name, data) VALUES (?, ?)", (name, pickle.dumps(sectionValues[name], pickle.HIGHEST_PROTOCOL)))
+
+    def close(self):
+        self.connection.close()
+
+def isStoreName(fileName):
+    return fileName.endswith(storeExtension)
+
+def isVariantStore(fileName):  #goes by the SQLite header rather than the name, so a store is read correctly whatever it is called
+    file = open(fileName, 'rb')
+    header = file.read(16)
+    file.close()
+    return header == b"SQLite format 3\x00"
+
+def splitLayout(layout):  #section values by name for a variant pickle in the old layout
+    import variantDataHandler
+    if isinstance(layout, variantDataHandler.VariantTable) or not "rawVariants" in layout:  #variants from variantCombine or getRNASupport, not laid out by tandemVariantCombine yet
+        return {"variants" : layout}
+    sectionValues = {}
+    for key in layout:
+        if key in nestedSections:
+            for nestedKey in layout[key]:
+                sectionValues[key + "/" + nestedKey] = layout[key][nestedKey]
+        else:
+            sectionValues[key] = layout[key]
+    return sectionValues
+
+def joinLayout(sectionValues):  #the old pickle layout for a set of section values (the inverse of splitLayout)
+    return setSections({}, dict([(name, sectionValues[name]) for name in sectionValues if not name in preFusionSections]))
+
+def setSections(layout, sectionValues):  #puts section values into their places in the old pickle layout
+    for name in sectionValues:
+        if "/" in name:
+            key, nestedKey = name.split("/", 1)
+            if not key in layout:
+                layout[key] = {}
+            layout[key][nestedKey] = sectionValues[name]
+        else:
+            layout[name] = sectionValues[name]
+    return layout
+
+def rnaSupportSection(somaticVariantTable):  #the RNASupportData for each variant by hash, from either a VariantTable or per-variant dictionaries
+    return dict([(key, entry["RNASupport"]) for key, entry in somaticVariantTable.items()])
+
+def readVariants(store):  #the combined variants of a store that has not been through tandemVariantCombine, with RNA support filled in if it has been added
+    import variantDataHandler
+    somaticVariantTable = store.read("variants")
+    if "rnaSupport" in store:
+        somaticVariantTable = variantDataHandler.addRNASupportData(somaticVariantTable, store.read("rnaSupport"))
+    return somaticVariantTable
+
+def loadPickle(fileName):
+    import pickle
+    file = open(fileName, 'rb')
+    data = pickle.load(file)
+    file.close()
+    return data
+
+def loadVariants(fileName):  #combined variants (a VariantTable or per-variant dictionaries) from either a variant pickle or a store
+    if not isVariantStore(fileName):
+        return loadPickle(fileName)
+    store = VariantStore(fileName)
+    somaticVariantTable = readVariants(store)
+    store.close()
+    return somaticVariantTable
+
+def loadLayout(fileName, sections = None):  #the old pickle layout, holding just the sections named if the file is a store (a pickle has to be read whole)
+    if not isVariantStore(fileName):
+        return loadPickle(fileName)
+    store = VariantStore(fileName)
+    layout = joinLayout(store.readSections(sections))
+    store.close()
+    return layout
+
+def exportLayout(fileName):  #everything in a store, in the layout the pickle from its last stage would have had
+    store = VariantStore(fileName)
+    if "rawVariants" in store:
+        layout = joinLayout(store.readSections())
+    else:
+        layout = readVariants(store)
+    store.close()
+    return layout
+
+def sameFile(inputFileName, outputFileName):
+    import os
+    return os.path.exists(outputFileName) and os.path.samefile(inputFileName, outputFileName)
+
+def writesStore(inputFileName, outputFileName):  #stores are written to names ending in .db, or back over a store given as the input whatever it is called
+    return isStoreName(outputFileName) or (sameFile(inputFileName, outputFileName) and isVariantStore(inputFileName))
+
+def addSections(inputFileName, outputFileName, sectionValues):  #the input (store or pickle) as a store with these sections added or replaced.  Unless the output is the input itself, the input is left as it was.
+    import shutil
+    if not sameFile(inputFileName, outputFileName):
+        if isVariantStore(inputFileName):
+            shutil.copyfile(inputFileName, outputFileName)
+        else:
+            importPickle(inputFileName, outputFileName)
+    store = VariantStore(outputFileName)
+    store.writeSections(sectionValues)
+    store.close()
+
+def savePickle(data, fileName):
+    import pickle
+    file = open(fileName, 'wb')
+    pickle.dump(data, file)
+    file.close()
+
+def saveSections(inputFileName, outputFileName, sectionValues, layout = None):  #writes a stage's new sections into a store, or the whole layout with them added into a pickle.  A layout already loaded from a pickle input is used as is rather than read again.
+    if writesStore(inputFileName, outputFileName):
+        addSections(inputFileName, outputFileName, sectionValues)
+        return
+    if layout is None or isVariantStore(inputFileName):
+        layout = loadLayout(inputFileName)
+    savePickle(setSections(layout, sectionValues), outputFileName)
+
+def saveVariants(inputFileName, outputFileName, somaticVariantTable):  #what getRNASupport writes: the RNA support section if the output is a store (starting from the input's variants), or the whole variant pickle if not
+    if writesStore(inputFileName, outputFileName):
+        addSections(inputFileName, outputFileName, {"rnaSupport" : rnaSupportSection(somaticVariantTable)})
+    else:
+        savePickle(somaticVariantTable, outputFileName)
+
+def createStore(fileName, sectionValues):  #a new store holding just these sections, replacing any file already there
+    import os
+    if os.path.exists(fileName):
+        os.remove(fileName)
+    store = VariantStore(fileName)
+    store.writeSections(sectionValues)
+    store.close()
+
+def importPickle(pickleFileName, storeFileName):
+    createStore(storeFileName, splitLayout(loadPickle(pickleFileName)))
+
+def exportPickle(storeFileName, pickleFileName):
+    savePickle(exportLayout(storeFileName), pickleFileName)
+
+def main():
+    args = CheckArgs()
+    storeFileName = args.input
+    if args.output:
+        if isStoreName(args.output):
+            if isVariantStore(args.input):
+                raise RuntimeError("%s is already a variant store." %args.input)
+            importPickle(args.input, args.output)
+            storeFileName = args.output
+        else:
+            if not isVariantStore(args.input):
+                raise RuntimeError("%s is not a variant store." %args.input)
+            exportPickle(args.input, args.output)
+    if args.list:
+        if not isVariantStore(storeFileName):
+            raise RuntimeError("%s is not a variant store." %storeFileName)
+        store = VariantStore(storeFileName)
+        for name in store.sections():
+            print(name)
+        store.close()
+    quit()
+
+if __name__ == '__main__':
+    main()
@@ -12,6 +12,7 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
         parser.add_argument("-o", "--output", help = "Output pickle file name")
         parser.add_argument("-p", "--maxPValue", help = "Maximum p-value in fisher test for variant.", default = 0.05, type = float)
         parser.add_argument("-d", "--minDepth", help = "Minimum depth of coverage in both tumor and normal.", default = 10, type = int)
+        parser.add_argument("-s", "--skipFiltered", help = "Skip lines with anything other than PASS (or .) in the FILTER column.", action = 'store_true')
         rawArgs = parser.parse_args()
         file = rawArgs.file
         if not os.path.isfile(file):
@@ -25,6 +26,7 @@ class CheckArgs():  #class that checks arguments and ultimately returns a valida
         self.output = output
         self.maxPValue = rawArgs.maxPValue
         self.minDepth = rawArgs.minDepth
+        self.skipFiltered = rawArgs.skipFiltered
         
 class VCFColumnHeader(object):
     
@@ -48,6 +50,16 @@ class VCFColumnHeader(object):
         for index, field in enumerate(self.lineArray):
             if not field.upper() in self.caseSensitives:
                 self.fieldDict[field.upper()] = index
+        self.fixedColumns = tuple([self.optionalColumn(field) for field in ("CHROM", "POS", "REF", "ALT", "FILTER", "FORMAT")])  #looked up once here instead of on every data line
+        
+    def optionalColumn(self, key):
+        try:
+            return self.getItemHandler(key)
+        except KeyError:
+            return None
+        
+    def sampleColumns(self, sampleNames):  #column indexes for the samples named, to pass to VCFDataLine so it parses only those
+        return [self.getItemHandler(sampleName) for sampleName in sampleNames]
         
     def getItemHandler(self, key):
         try:
@@ -115,6 +127,15 @@ class VCFLineFormatData(object):
         else:
             return self.getItemHandler(attr)
     
+formatDataCache = {}  #VCFLineFormatData by raw FORMAT field, since a file only has a handful of different ones
+
+def lineFormatData(rawField):
+    formatData = formatDataCache.get(rawField)
+    if formatData is None:
+        formatData = VCFLineFormatData(rawField)
+        formatDataCache[rawField] = formatData
+    return formatData
+    
 class VCFSampleData(object):
     
     def __init__(self, rawField, formatData, alleleList, minimumDepth = 10):
@@ -155,24 +176,29 @@ class VCFSampleData(object):
         
 class VCFDataLine(object):
     
-    def __init__(self, rawLine, header, hashList = False, skipIfNotInList = True):
+    def __init__(self, rawLine, header, hashList = False, skipIfNotInList = True, sampleColumns = None, skipFiltered = False):
+        #only the sample columns given (all of them if none are) are parsed into VCFSampleData, the rest stay as text.  Lines with no alternate allele,
+        #or filtered out with skipFiltered set, have no samples parsed at all.
         self.header = header
         self.rawLine = rawLine.strip()
         self.lineArray = self.rawLine.split("\t")
-        self.contig = self.lineArray[header.chrom]
-        self.position = int(self.lineArray[header.pos])
-        self.referenceAllele = self.lineArray[header.ref]
-        self.altAlleleList = self.lineArray[header.alt].split(",")
+        contigColumn, positionColumn, referenceColumn, altColumn, filterColumn, formatColumn = header.fixedColumns
+        self.contig = self.lineArray[contigColumn]
+        self.position = int(self.lineArray[positionColumn])
+        self.referenceAllele = self.lineArray[referenceColumn]
+        self.altAlleleList = self.lineArray[altColumn].split(",")
         self.alleleList = [self.referenceAllele] + self.altAlleleList
         self.hashValues = []
         for allele in self.altAlleleList:
-            self.hashValues.append((self.contig, int(self.position), self.referenceAllele, allele))
+            self.hashValues.append((self.contig, self.position, self.referenceAllele, allele))
         self.checkHashList(hashList)
-        if hashList and not self.inHashList and skipIfNotInList:
-            pass
-        else:
-            formatData = VCFLineFormatData(self.lineArray[header.format])
-            for i in range(9, len(self.lineArray)):
+        self.passedPrefilters = not self.lineArray[altColumn] == "." and not (skipFiltered and filterColumn is not None and not self.lineArray[filterColumn] in ("PASS", "."))
+        self.samplesParsed = self.passedPrefilters and not (hashList and not self.inHashList and skipIfNotInList)
+        if self.samplesParsed:
+            formatData = lineFormatData(self.lineArray[formatColumn])
+            if sampleColumns is None:
+                sampleColumns = range(9, len(self.lineArray))
+            for i in sampleColumns:
                 self.lineArray[i] = VCFSampleData(self.lineArray[i], formatData, self.alleleList)
             
     def checkHashList(self, hashList):
@@ -191,6 +217,8 @@ class VCFDataLine(object):
     
     def analyzeSomaticChanges(self, normalName, tumorName, checkDepth = 10, allowSomaticChangeToReference = False):
         import variantDataHandler
+        if not self.samplesParsed:
+            return False
         normal = self.lineArray[self.header[normalName]]
         tumor = self.lineArray[self.header[tumorName]]
         if not (tumor.called and normal.called):
@@ -211,7 +239,7 @@ class VCFDataLine(object):
                 variantDataList.append(variantData)
         return variantDataList
     
-def analyzeVCFSomatics(fileName, tumorName, normalName, maxPValue = 0.05, minDepth = 10):
+def analyzeVCFSomatics(fileName, tumorName, normalName, maxPValue = 0.05, minDepth = 10, skipFiltered = False):
     vcf = open(fileName, 'r')
     somaticCollector = {}
     for line in vcf:
@@ -222,11 +250,12 @@ def analyzeVCFSomatics(fileName, tumorName, normalName, maxPValue = 0.05, minDep
             continue
         elif line.startswith("#"):
             header = VCFColumnHeader(line)
+            sampleColumns = header.sampleColumns([tumorName, normalName])
             continue
         else:
             if not header:
                 raise RuntimeError("Hit what appears to be a line of data before finding a valid column header line. Line:\n%s" %line)
-            data = VCFDataLine(line, header)
+            data = VCFDataLine(line, header, sampleColumns = sampleColumns, skipFiltered = skipFiltered)
             somaticChanges = data.analyzeSomaticChanges(normalName, tumorName, minDepth)
             if not somaticChanges:
                 continue
@@ -240,7 +269,7 @@ def analyzeVCFSomatics(fileName, tumorName, normalName, maxPValue = 0.05, minDep
 
 if __name__ == '__main__':
     args = CheckArgs()
-    somaticList = analyzeVCFSomatics(args.file, args.tumor, args.normal, args.maxPValue, args.minDepth) #"/Users/michaelweinstein/sourceCodeRepository/testData/JMS.vcf", "JMS_scalp_022213", "JMS_Normal")
+    somaticList = analyzeVCFSomatics(args.file, args.tumor, args.normal, args.maxPValue, args.minDepth, args.skipFiltered) #"/Users/michaelweinstein/sourceCodeRepository/testData/JMS.vcf", "JMS_scalp_022213", "JMS_Normal")
     print("Found %s somatic candidates" %len(somaticList))
     output = open(args.output, 'wb')
     import pickle
@@ -968,7 +968,7 @@ class CombineVarScanHaplotypeCallerMutectSomatics(object):
         return variantCombine.jobID
     
 class MPileup(object):
-    def __init__(self, jobList, sampleName, bamFile = False, refGenomeFasta = False, gzip = False, bgzip = False, emailAddress = False, clobber = None, outputDir = "", makeBAMJob = False, mock = False):
+    def __init__(self, jobList, sampleName, bamFile = False, refGenomeFasta = False, gzip = False, bgzip = False, tabix = False, emailAddress = False, clobber = None, outputDir = "", makeBAMJob = False, mock = False):
         import houseKeeping
         import gatkRunners
         import programRunners
@@ -988,7 +988,7 @@ class MPileup(object):
         self.emailAddress = emailAddress
         self.tempDir = jobList.tempDir
         self.sampleName = sampleName
-        mPileup = programRunners.MPileup(sampleName, self.bamFile, refGenomeFasta, gzip = gzip, bgzip = bgzip, clobber = clobber, outputDirectory = outputDir)
+        mPileup = programRunners.MPileup(sampleName, self.bamFile, refGenomeFasta, gzip = gzip, bgzip = bgzip, clobber = clobber, outputDirectory = outputDir, tabix = tabix)
         self.mPileupCommandIndex = jobList.addJob(mPileup.mPileupCommand)
         mPileupJobID = self.submitCommands(mock)
         self.returnData = runnerSupport.WorkflowReturn(mPileup.mPileupOut, mPileupJobID, mPileup.clobber)
@@ -1000,6 +1000,105 @@ class MPileup(object):
         return mPileup.jobID
     
     
+class StreamMPileup(object):
+    #one samtools mpileup job teed straight into its consumers without writing the pileup out (unless keepPileup is set), data returned is the list of consumer outputs in the order variants, targets, RNA support, then the pileup itself if kept
+    def __init__(self, jobList, sampleName, bamFile = False, refGenomeFasta = False, extractTumor = True, minSupport = 0, requireDoubleStranded = False, somaticVariantPickle = False, minDifference = 10, keepPileup = False, emailAddress = False, clobber = None, outputDir = "", makeBAMJob = False, combineSomaticsJob = False, mock = False):
+        import programRunners
+        import runnerSupport
+        if not (makeBAMJob or bamFile):
+            raise RuntimeError("No BAM file passed through job info or the explicit argument.  Nothing to work on.")
+        if bamFile:
+            self.bamFile = bamFile
+        else:
+            self.bamFile = makeBAMJob.data
+        if not makeBAMJob:
+            makeBAMJob = runnerSupport.EmptyWorkflowReturn()
+        if combineSomaticsJob and not somaticVariantPickle:
+            somaticVariantPickle = combineSomaticsJob.data
+        if not combineSomaticsJob:
+            combineSomaticsJob = runnerSupport.EmptyWorkflowReturn()
+        if not (extractTumor or somaticVariantPickle):
+            raise RuntimeError("Nothing set to consume the pileup stream.")
+        self.makeBAMJob = makeBAMJob
+        self.combineSomaticsJob = combineSomaticsJob
+        clobberSet = set([clobber] + [item.clobber for item in [makeBAMJob, combineSomaticsJob]])
+        if True in clobberSet:
+            clobber = True
+        elif False  in clobberSet:
+            clobber = False
+        elif None in clobberSet:
+            clobber = None
+        self.emailAddress = emailAddress
+        self.tempDir = jobList.tempDir
+        self.sampleName = sampleName
+        mPileup = programRunners.MPileup(sampleName, self.bamFile, refGenomeFasta, clobber = clobber, outputDirectory = outputDir, stream = True)
+        clobber = mPileup.clobber
+        consumerCommands = []
+        outputs = []
+        if extractTumor:
+            extractVariants = programRunners.ExtractVariantsTumor(sampleName, mPileup.mPileupOut, clobber = clobber, minSupport = minSupport, requireDoubleStranded = requireDoubleStranded, outputDirectory = outputDir, streamedInput = True)
+            clobber = extractVariants.clobber
+            consumerCommands.append(extractVariants.extractCommand)
+            outputs += [extractVariants.variantsOut, extractVariants.targetList]
+        if somaticVariantPickle:
+            getRNASupportMPileup = programRunners.GetRNASupportMPileup(sampleName, somaticVariantPickle, mPileup.mPileupOut, minDifference = minDifference, outputFormat = "pickle", clobber = clobber, outputDirectory = outputDir, streamedInput = True)
+            clobber = getRNASupportMPileup.clobber
+            consumerCommands.append(getRNASupportMPileup.getRNASupportCommand)
+            outputs.append(getRNASupportMPileup.rnaSupportOut)
+        mPileup.clobber = clobber  #carry the consumers' answers along to the kept pileup check
+        streamCommand = mPileup.createStreamCommand(consumerCommands, keepPileup)
+        if keepPileup:
+            outputs.append(mPileup.mPileupOut)
+        self.streamCommandIndex = jobList.addJob(streamCommand)
+        streamJobID = self.submitCommands(mock)
+        self.returnData = runnerSupport.WorkflowReturn(outputs, streamJobID, mPileup.clobber)
+        
+    def submitCommands(self, mock):
+        import genericRunners
+        tempDir = self.tempDir
+        stream = genericRunners.HoffmanJob([self.makeBAMJob.jobID, self.combineSomaticsJob.jobID], self.streamCommandIndex, self.sampleName + "StreamPileup", tempDir, self.emailAddress, "a", 1, mock = mock)
+        return stream.jobID
+    
+class ExtractVariantsPaired(object):
+    
+    def __init__(self, jobList, sampleName, comparison, refGenomeFasta = False, tumorPileup = False, normalPileup = False, minSupport = 0, requireDoubleStranded = False, emailAddress = False, clobber = None, outputDir = "", tumorMPileupJob = False, normalMPileupJob = False, mock = False):
+        import programRunners
+        import runnerSupport
+        if not (tumorPileup or tumorMPileupJob):
+            raise RuntimeError("No tumor mPileup job data or tumor mPileup file passed.")
+        if not (normalPileup or normalMPileupJob):
+            raise RuntimeError("No normal mPileup job data or normal mPileup file passed.")
+        if not tumorPileup:
+            tumorPileup = tumorMPileupJob.data
+        if not normalPileup:
+            normalPileup = normalMPileupJob.data
+        if not tumorMPileupJob:
+            tumorMPileupJob = runnerSupport.EmptyWorkflowReturn()
+        if not normalMPileupJob:
+            normalMPileupJob = runnerSupport.EmptyWorkflowReturn()
+        self.tumorMPileupJob = tumorMPileupJob
+        self.normalMPileupJob = normalMPileupJob
+        clobberSet = set([clobber] + [item.clobber for item in [tumorMPileupJob, normalMPileupJob]])
+        if True in clobberSet:
+            clobber = True
+        elif False  in clobberSet:
+            clobber = False
+        elif None in clobberSet:
+            clobber = None
+        self.emailAddress = emailAddress
+        self.tempDir = jobList.tempDir
+        self.sampleName = sampleName
+        extractPaired = programRunners.ExtractVariantsPaired(sampleName, tumorPileup, normalPileup, comparison, refGenomeFasta = refGenomeFasta, minSupport = minSupport, requireDoubleStranded = requireDoubleStranded, clobber = clobber, outputDirectory = outputDir)
+        self.extractPairedCommandIndex = jobList.addJob(extractPaired.extractCommand)
+        extractPairedJobID = self.submitCommands(mock)
+        self.returnData = runnerSupport.WorkflowReturn(extractPaired.vcfOut, extractPairedJobID, extractPaired.clobber)
+        
+    def submitCommands(self, mock):
+        import genericRunners
+        tempDir = self.tempDir
+        extractPaired = genericRunners.HoffmanJob([self.tumorMPileupJob.jobID, self.normalMPileupJob.jobID], self.extractPairedCommandIndex, self.sampleName + "ExtractPaired", tempDir, self.emailAddress, "a", 1, mock = mock)
+        return extractPaired.jobID
+    
 class GetRNASupportVCF(object):
     
     def __init__(self, jobList, sampleName, rnaSampleName, somaticVariantPickle = False, rnaVariantVCF = False, minDifference = 10, emailAddress = False, clobber = None, outputDir = "", combineSomaticsJob = False, rnaVariantCallJob = False, mock = False):